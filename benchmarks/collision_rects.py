@@ -0,0 +1,55 @@
+"""
+build_rects times for every tile layer of maps in resources/tmx, with and
+without NumPy
+
+"tiles" is the number of set tiles of the layer and "rects" the number of
+rects they were merged into.  Images are not loaded, so no display is
+needed.
+
+Usage: python benchmarks/collision_rects.py [--repeat N] [map.tmx ...]
+"""
+# Standard
+import argparse
+import os
+import time
+
+# Project
+from harren import resources
+from pytmx import TiledMap, TiledTileLayer, util_pygame
+
+
+def best_of(repeat, func):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build_rects")
+    parser.add_argument("maps", nargs="*", default=["library.tmx", "harren_map.tmx"], help="Map file names")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per layer (best is reported)")
+    args = parser.parse_args()
+
+    numpy = util_pygame.np
+    print(f"{'map':<20}{'layer':<14}{'tiles':>9}{'rects':>7}{'numpy ms':>10}{'python ms':>11}")
+    for name in args.maps:
+        tmx = TiledMap(os.path.join(resources.TMX_FOLDER, name))
+        for index, layer in enumerate(tmx.layers):
+            if not isinstance(layer, TiledTileLayer):
+                continue
+            tiles = sum(1 for _, _, gid in layer.iter_data() if gid)
+            rects = len(util_pygame.build_rects(tmx, index))
+            timings = []
+            for module in (numpy, None):
+                util_pygame.np = module
+                timings.append(best_of(args.repeat, lambda: util_pygame.build_rects(tmx, index)))
+            util_pygame.np = numpy
+            print(f"{name:<20}{layer.name[:13]:<14}{tiles:>9}{rects:>7}{timings[0]:>10.1f}{timings[1]:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
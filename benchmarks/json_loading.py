@@ -0,0 +1,165 @@
+"""
+TMX (XML) vs. TMJ (Tiled JSON) load times of maps in resources/tmx
+
+Each map is converted to a TMJ file in a temporary folder first; layer data
+keeps its TMX encoding and compression, so both loads decode the same data.
+Images are not loaded, so no display is needed.
+
+Usage: python benchmarks/json_loading.py [--repeat N] [--numpy] [map.tmx ...]
+"""
+# Standard
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from xml.etree import ElementTree
+
+# Project
+from harren import resources
+from pytmx import TiledMap
+
+
+def value(text):
+    """Return an XML attribute value as the JSON number it stands for."""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def attributes(node):
+    return {k: value(v) for k, v in node.items()}
+
+
+def properties(node):
+    props = []
+    for prop in node.findall("properties/property"):
+        prop_type = prop.get("type", "string")
+        text = prop.get("value", prop.text)
+        if prop_type in ("int", "float", "object"):
+            text = value(text)
+        elif prop_type == "bool":
+            text = text == "true"
+        props.append({"name": prop.get("name"), "type": prop_type, "value": text})
+    return props
+
+
+def image(node, tmj):
+    image_node = node.find("image")
+    if image_node is not None:
+        tmj["image"] = image_node.get("source")
+        tmj["imagewidth"] = value(image_node.get("width", "0"))
+        tmj["imageheight"] = value(image_node.get("height", "0"))
+        if image_node.get("trans"):
+            tmj["transparentcolor"] = "#" + image_node.get("trans")
+
+
+def tileset(node, dirname):
+    tmj = attributes(node)
+    if "source" in tmj:
+        # the TMJ file is written elsewhere, so point at the TSX file itself
+        tmj["source"] = os.path.join(dirname, tmj["source"])
+        return tmj
+    image(node, tmj)
+    tiles = []
+    for tile in node.findall("tile"):
+        tile_tmj = attributes(tile)
+        image(tile, tile_tmj)
+        frames = [attributes(frame) for frame in tile.findall("animation/frame")]
+        if frames:
+            tile_tmj["animation"] = frames
+        if tile.find("properties") is not None:
+            tile_tmj["properties"] = properties(tile)
+        tiles.append(tile_tmj)
+    if tiles:
+        tmj["tiles"] = tiles
+    return tmj
+
+
+def tile_layer(node):
+    tmj = attributes(node)
+    tmj["type"] = "tilelayer"
+    data = node.find("data")
+    encoding = data.get("encoding")
+    if encoding == "base64":
+        tmj["encoding"] = "base64"
+        tmj["compression"] = data.get("compression", "")
+        tmj["data"] = data.text.strip()
+    elif encoding == "csv":
+        tmj["data"] = [int(gid) for gid in data.text.replace("\n", "").split(",")]
+    else:
+        tmj["data"] = [int(tile.get("gid", 0)) for tile in data.findall("tile")]
+    return tmj
+
+
+def object_group(node):
+    tmj = attributes(node)
+    tmj["type"] = "objectgroup"
+    objects = []
+    for obj in node.findall("object"):
+        obj_tmj = attributes(obj)
+        for key in ("polygon", "polyline"):
+            points = obj.find(key)
+            if points is not None:
+                obj_tmj[key] = [
+                    {"x": value(x), "y": value(y)} for x, y in (p.split(",") for p in points.get("points").split())
+                ]
+        if obj.find("properties") is not None:
+            obj_tmj["properties"] = properties(obj)
+        objects.append(obj_tmj)
+    tmj["objects"] = objects
+    return tmj
+
+
+def tmx_to_tmj(path):
+    """Return the Tiled JSON document of a TMX file."""
+    root = ElementTree.parse(path).getroot()
+    tmj = attributes(root)
+    tmj["type"] = "map"
+    tmj["infinite"] = bool(tmj.get("infinite", 0))
+    tmj["properties"] = properties(root)
+    tmj["tilesets"] = [tileset(node, os.path.dirname(path)) for node in root.findall("tileset")]
+    builders = {"layer": tile_layer, "objectgroup": object_group}
+    tmj["layers"] = [builders[node.tag](node) for node in root if node.tag in builders]
+    return tmj
+
+
+def best_of(repeat, func):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TMX vs. TMJ map loading")
+    parser.add_argument("maps", nargs="*", default=["harren_map.tmx", "library.tmx"], help="Map file names")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per map (best is reported)")
+    parser.add_argument("--numpy", action="store_true", help="Use numpy tile layer storage")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="pytmx-json-")
+    try:
+        print(f"{'map':<24}{'tmx ms':>10}{'tmj ms':>10}{'speedup':>10}")
+        for name in args.maps:
+            tmx_path = os.path.join(resources.TMX_FOLDER, name)
+            tmj_path = os.path.join(folder, os.path.splitext(name)[0] + ".tmj")
+            with open(tmj_path, "w") as f:
+                json.dump(tmx_to_tmj(tmx_path), f)
+
+            tmx_ms = best_of(args.repeat, lambda: TiledMap(tmx_path, use_numpy=args.numpy))
+            tmj_ms = best_of(args.repeat, lambda: TiledMap(tmj_path, use_numpy=args.numpy))
+            print(f"{name:<24}{tmx_ms:>10.1f}{tmj_ms:>10.1f}{tmx_ms / tmj_ms:>9.1f}x")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold vs. warm load times of every map in resources/tmx
+
+Cold loads parse the TMX file and write a compiled cache; warm loads read the
+compiled cache.  Images are not loaded unless --images is passed, and then
+headless, so no display is needed either way.
+
+Usage: python benchmarks/map_cache.py [--repeat N] [--numpy] [--images]
+"""
+# Standard
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+# Project
+from harren import resources
+from pytmx import TiledMap
+from pytmx.util_pygame import load_pygame
+
+
+def best_of(repeat, func):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled map cache")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per map (best is reported)")
+    parser.add_argument("--numpy", action="store_true", help="Use numpy tile layer storage")
+    parser.add_argument("--images", action="store_true", help="Load the images too, without converting them")
+    args = parser.parse_args()
+
+    def load(path):
+        if args.images:
+            return load_pygame(
+                path, use_cache=True, cache_dir=cache_dir, use_numpy=args.numpy, headless=True, tile_cache=None
+            )
+        return TiledMap(path, use_cache=True, cache_dir=cache_dir, use_numpy=args.numpy)
+
+    cache_dir = tempfile.mkdtemp(prefix="pytmx-cache-")
+    total_cold = total_warm = 0.0
+    try:
+        print(f"{'map':<24}{'cold ms':>10}{'warm ms':>10}{'speedup':>10}")
+        for path in sorted(glob.glob(os.path.join(resources.TMX_FOLDER, "*.tmx"))):
+            name = os.path.basename(path)
+
+            def cold():
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                load(path)
+
+            def warm():
+                load(path)
+
+            try:
+                cold_ms = best_of(args.repeat, cold)
+                warm_ms = best_of(args.repeat, warm)
+            except Exception as e:
+                print(f"{name:<24}{'failed: ' + str(e)[:40]:>30}")
+                continue
+
+            total_cold += cold_ms
+            total_warm += warm_ms
+            print(f"{name:<24}{cold_ms:>10.1f}{warm_ms:>10.1f}{cold_ms / warm_ms:>9.1f}x")
+        print(f"{'total':<24}{total_cold:>10.1f}{total_warm:>10.1f}{total_cold / total_warm:>9.1f}x")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
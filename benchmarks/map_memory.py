@@ -0,0 +1,72 @@
+"""
+Peak memory of parsing every map in resources/tmx, DOM vs. streaming
+
+Every parse runs in a fresh interpreter so the peak resident set size of one
+map does not hide the next.  The reported numbers are the growth of the peak
+RSS over the interpreter with pytmx imported.  Images are not loaded.
+
+Usage: python benchmarks/map_memory.py [--numpy]
+"""
+# Standard
+import argparse
+import glob
+import os
+import resource
+import subprocess
+import sys
+
+# Project
+from harren import resources
+
+
+def peak_rss_kb():
+    """Return the peak resident set size of this process in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(path, streaming, use_numpy):
+    """Parse one map in this process and print the peak RSS growth in KiB."""
+    from pytmx import TiledMap
+
+    baseline = peak_rss_kb()
+    TiledMap(path, streaming=streaming, use_numpy=use_numpy)
+    print(peak_rss_kb() - baseline)
+
+
+def run_child(path, streaming, use_numpy):
+    """Measure one parse in a new interpreter and return the KiB it reports."""
+    args = [sys.executable, __file__, "--child", path]
+    if streaming:
+        args.append("--streaming")
+    if use_numpy:
+        args.append("--numpy")
+    output = subprocess.run(args, check=True, capture_output=True, text=True).stdout
+    return int(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak memory of DOM and streaming map parsing")
+    parser.add_argument("--numpy", action="store_true", help="Use numpy tile layer storage")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--streaming", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child, args.streaming, args.numpy)
+        return
+
+    print(f"{'map':<24}{'dom KiB':>10}{'stream KiB':>12}")
+    for path in sorted(glob.glob(os.path.join(resources.TMX_FOLDER, "*.tmx"))):
+        name = os.path.basename(path)
+        try:
+            dom = run_child(path, False, args.numpy)
+            stream = run_child(path, True, args.numpy)
+        except subprocess.CalledProcessError:
+            print(f"{name:<24}{'failed':>22}")
+            continue
+        print(f"{name:<24}{dom:>10}{stream:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Memory held by the objects of a map, TiledObjects vs. CompactObjects
+
+The map is parsed once, then its object groups are built again from the
+already parsed XML while tracemalloc counts what they keep allocated.
+
+Usage: python benchmarks/object_memory.py [map.tmx ...]
+"""
+# Standard
+import argparse
+import gc
+import os
+import tracemalloc
+from xml.etree import ElementTree
+
+# Project
+from harren import resources
+from pytmx import TiledMap, TiledObjectGroup
+
+
+def group_bytes(tmxmap, groups):
+    """Return the bytes still allocated after building the object groups."""
+    gc.collect()
+    tracemalloc.start()
+    built = [TiledObjectGroup(tmxmap, group) for group in groups]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark object storage memory")
+    parser.add_argument("maps", nargs="*", default=["library.tmx", "harren_map.tmx"], help="Map file names")
+    args = parser.parse_args()
+
+    print(f"{'map':<24}{'objects':>10}{'plain KiB':>12}{'compact KiB':>13}{'ratio':>8}")
+    for name in args.maps:
+        path = os.path.join(resources.TMX_FOLDER, name)
+        groups = ElementTree.parse(path).getroot().findall("objectgroup")
+        count = sum(len(group.findall("object")) for group in groups)
+
+        plain = group_bytes(TiledMap(path), groups)
+        compact = group_bytes(TiledMap(path, compact_objects=True), groups)
+        print(f"{name:<24}{count:>10}{plain / 1024:>12.0f}{compact / 1024:>13.0f}{plain / compact:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
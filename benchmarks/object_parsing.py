@@ -0,0 +1,43 @@
+"""
+Objects parsed per second for a map in resources/tmx
+
+The map is parsed once, then its object groups are built again from the
+already parsed XML, so only TiledObject parsing is timed.
+
+Usage: python benchmarks/object_parsing.py [--repeat N] [map.tmx]
+"""
+# Standard
+import argparse
+import os
+import time
+from xml.etree import ElementTree
+
+# Project
+from harren import resources
+from pytmx import TiledMap, TiledObjectGroup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TiledObject parsing")
+    parser.add_argument("map", nargs="?", default="library.tmx", help="Map file name in resources/tmx")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs (best is reported)")
+    args = parser.parse_args()
+
+    path = os.path.join(resources.TMX_FOLDER, args.map)
+    tmxmap = TiledMap(path)
+    groups = ElementTree.parse(path).getroot().findall("objectgroup")
+    count = sum(len(group.findall("object")) for group in groups)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for group in groups:
+            TiledObjectGroup(tmxmap, group)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"{args.map}: {count} objects in {best * 1000:.1f} ms, {count / best:,.0f} objects/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Surfaces, memory and scroll buffer fill times of maps in resources/tmx, with
+a Surface per tile vs. atlas mode
+
+"surfaces" and "KiB" count the distinct surfaces the tile images use and
+their pixel buffers.  "redraw ms" is a full redraw of the scroll buffer of a
+pyscroll renderer set up like the levels of the game.  Tiles are not shared
+between loads, and SDL's dummy video driver is used, so no window is opened.
+
+Usage: python benchmarks/tile_atlas.py [--repeat N] [map.tmx ...]
+"""
+# Standard
+import argparse
+import os
+import time
+
+# Third Party
+import pygame
+
+# Project
+from harren import resources
+from pyscroll.data import TiledMapData
+from pyscroll.orthographic import BufferedRenderer
+from pytmx.util_pygame import AtlasTile, load_pygame, surface_bytes
+
+
+def best_of(repeat, func):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def surfaces(tmx):
+    """Return the distinct surfaces used by the tile images of a map."""
+    found = {}
+    for image in tmx.images:
+        if isinstance(image, AtlasTile):
+            image = image.surface
+        if image is not None:
+            found[id(image)] = image
+    return list(found.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark atlas tile rendering")
+    parser.add_argument("maps", nargs="*", default=["library.tmx", "nohnaim.tmx", "auria.tmx"], help="Map file names")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per map (best is reported)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((800, 608))
+
+    print(f"{'map':<24}{'mode':>7}{'surfaces':>10}{'KiB':>8}{'load ms':>10}{'redraw ms':>11}")
+    for name in args.maps:
+        path = os.path.join(resources.TMX_FOLDER, name)
+        for atlas in (False, True):
+            load_ms = best_of(args.repeat, lambda: load_pygame(path, tile_cache=None, atlas=atlas))
+            tmx = load_pygame(path, tile_cache=None, atlas=atlas)
+            used = surfaces(tmx)
+            size = sum(surface_bytes(surface) for surface in used)
+
+            renderer = BufferedRenderer(TiledMapData(tmx), (800, 608), clamp_camera=False, alpha=True)
+            renderer.zoom = 2
+            redraw_ms = best_of(args.repeat, lambda: renderer.redraw_tiles(renderer._buffer))
+            mode = "atlas" if atlas else "tiles"
+            print(f"{name:<24}{mode:>7}{len(used):>10}{size / 1024:>8.0f}{load_ms:>10.1f}{redraw_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
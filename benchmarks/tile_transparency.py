@@ -0,0 +1,63 @@
+"""
+Image load times of maps in resources/tmx by how tile transparency is found
+
+"per tile" tests every tile with a pygame mask, "per image" classifies the
+tiles of each tileset image in one NumPy pass, and "cached" uses the classes
+a compiled map cache keeps.  Tiles are not shared between loads, and SDL's
+dummy video driver is used, so no window is opened.
+
+Usage: python benchmarks/tile_transparency.py [--repeat N] [map.tmx ...]
+"""
+# Standard
+import argparse
+import os
+import time
+
+# Third Party
+import pygame
+
+# Project
+from harren import resources
+from pytmx import util_pygame
+
+
+def best_of(repeat, func, setup):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tile transparency classification")
+    parser.add_argument("maps", nargs="*", default=["library.tmx", "nohnaim.tmx", "auria.tmx"], help="Map file names")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per map (best is reported)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    numpy = util_pygame.np
+
+    print(f"{'map':<24}{'tiles':>8}{'per tile ms':>13}{'per image ms':>14}{'cached ms':>11}")
+    for name in args.maps:
+        tmx = util_pygame.load_pygame(os.path.join(resources.TMX_FOLDER, name), tile_cache=None)
+        tiles = sum(1 for image in tmx.images if image is not None)
+
+        def forget():
+            tmx.tile_transparency.clear()
+
+        util_pygame.np = None
+        per_tile = best_of(args.repeat, tmx.reload_images, forget)
+        util_pygame.np = numpy
+        per_image = best_of(args.repeat, tmx.reload_images, forget)
+        cached = best_of(args.repeat, tmx.reload_images, lambda: None)
+        print(f"{name:<24}{tiles:>8}{per_tile:>13.1f}{per_image:>14.1f}{cached:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
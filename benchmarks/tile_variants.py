@@ -0,0 +1,63 @@
+"""
+Image load times of maps in resources/tmx with flipped and rotated tiles
+created up front vs. on first use (lazy_variants)
+
+"variants" is the number of flipped and rotated tiles a map has, "drawn" is
+how many of them a lazy map created to fill the scroll buffer of a pyscroll
+renderer at the top left of the map.  Tiles are not shared between loads,
+and SDL's dummy video driver is used, so no window is opened.
+
+Usage: python benchmarks/tile_variants.py [--repeat N] [map.tmx ...]
+"""
+# Standard
+import argparse
+import os
+import time
+
+# Third Party
+import pygame
+
+# Project
+from harren import resources
+from pyscroll.data import TiledMapData
+from pyscroll.orthographic import BufferedRenderer
+from pytmx.util_pygame import load_pygame
+
+
+def best_of(repeat, func):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lazy tile variants")
+    parser.add_argument("maps", nargs="*", default=["library.tmx", "nohnaim.tmx", "auria.tmx"], help="Map file names")
+    parser.add_argument("--repeat", type=int, default=15, help="Timed runs per map (best is reported)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((800, 608))
+
+    print(f"{'map':<24}{'variants':>10}{'eager ms':>10}{'lazy ms':>10}{'drawn':>7}")
+    for name in args.maps:
+        path = os.path.join(resources.TMX_FOLDER, name)
+        tmx = load_pygame(path, tile_cache=None, compact_objects=True)
+        variants = sum(1 for gids in tmx.gidmap.values() for _, flags in gids if flags and any(flags))
+        eager = best_of(args.repeat, tmx.reload_images)
+        tmx.lazy_variants = True
+        lazy = best_of(args.repeat, tmx.reload_images)
+
+        tmx.reload_images()
+        renderer = BufferedRenderer(TiledMapData(tmx), (800, 608), clamp_camera=False, alpha=True)
+        renderer.zoom = 2
+        print(f"{name:<24}{variants:>10}{eager:>10.1f}{lazy:>10.1f}{tmx.lazy_tile_count:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+TMX load times of maps in resources/tmx with each XML parser of pytmx
+
+"read ms" is the time to read the file into an element tree, or into the
+Tiled JSON dict for expat; "load ms" is the whole TiledMap load.  lxml is
+only timed when it is installed.  Images are not loaded, so no display is
+needed.
+
+Usage: python benchmarks/xml_parsing.py [--repeat N] [map.tmx ...]
+"""
+# Standard
+import argparse
+import os
+import time
+
+# Project
+from harren import resources
+from pytmx import TiledMap, XML_PARSERS, pytmx
+
+
+def best_of(repeat, func):
+    """Return the fastest of several timed calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def reader(parser, path):
+    if parser == "expat":
+        return lambda: pytmx.tmx_to_json(path)
+    return lambda: pytmx.xml_module(parser).parse(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the XML parsers of pytmx")
+    parser.add_argument("maps", nargs="*", default=["library.tmx", "nohnaim.tmx", "auria.tmx"], help="Map file names")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per map (best is reported)")
+    args = parser.parse_args()
+
+    parsers = [name for name in XML_PARSERS if name != "auto" and (name != "lxml" or pytmx.lxml_etree is not None)]
+    print(f"{'map':<24}{'parser':>8}{'read ms':>10}{'load ms':>10}")
+    for name in args.maps:
+        path = os.path.join(resources.TMX_FOLDER, name)
+        for xml_parser in parsers:
+            read_ms = best_of(args.repeat, reader(xml_parser, path))
+            load_ms = best_of(args.repeat, lambda: TiledMap(path, xml_parser=xml_parser))
+            print(f"{name:<24}{xml_parser:>8}{read_ms:>10.1f}{load_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 from setuptools import setup, find_packages
 
-
 setup(
     name="harren-rpg",
     version="0.0.1",
@@ -12,7 +11,12 @@ setup(
     package_dir={"": "src"},
     install_requires=["log-color", "pygame", "six", "boltons", "pytoml"],
     # test_suite="unittest",
-    entry_points={"console_scripts": ["harren = harren.entry_point:main"]},
+    entry_points={
+        "console_scripts": [
+            "harren = harren.entry_point:main",
+            "harren-compile-maps = harren.compile_maps:main",
+        ]
+    },
     package_data={
         "harren": [
             "resources/*.*",
@@ -0,0 +1,198 @@
+# Standard
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Third Party
+import pytoml as toml
+from log_color import ColorFormatter
+
+# Project
+from harren import resources
+from pytmx import TiledTileLayer
+from pytmx.cache import save_cached_map
+from pytmx.util_pygame import load_pygame
+
+LOG = logging.getLogger(__name__)
+
+# Levels that are not listed in maps.toml: name -> (map file, compact_objects)
+BUILTIN_LEVELS = {
+    "game_select": ("load.tmx", True),
+    "load_screen": ("load.tmx", True),
+    "overworld": ("harren_map.tmx", False),
+}
+
+
+def level_maps():
+    """Return the map file and compact_objects option of every level by name."""
+    with open(os.path.join(resources.DATA_FOLDER, "maps.toml"), "rb") as f:
+        data = toml.load(f)
+
+    levels = dict(BUILTIN_LEVELS)
+    for name, values in data.items():
+        levels[name] = (values["filename"], True)
+    return levels
+
+
+def image_exists(path):
+    """Check an image path the way harren.utils.pg_utils.get_image resolves it."""
+    return os.path.exists(os.path.join(resources.GFX_FOLDER, path)) or os.path.exists(path)
+
+
+def compile_map(filename, compact_objects, cache_dir):
+    """
+    Parse a map, write its compiled cache and collect what needs validating.
+
+    Runs in a worker process, so only plain data is returned.  Images are
+    loaded headless, without a display, so the transparency classes of the
+    tiles are written to the cache as well.
+
+    :param filename: map file name in the tmx folder
+    :param compact_objects: load objects the way the level using it does
+    :param cache_dir: folder the compiled cache is written to
+    :rtype: dict
+    """
+    path = os.path.join(resources.TMX_FOLDER, filename)
+    start = time.perf_counter()
+    tmx_data = load_pygame(path, cache_dir=cache_dir, compact_objects=compact_objects, headless=True, tile_cache=None)
+    parse_ms = (time.perf_counter() - start) * 1000
+    cache_file = save_cached_map(tmx_data)
+
+    tiles = 0
+    gids = set()
+    for layer in tmx_data.layers:
+        if isinstance(layer, TiledTileLayer):
+            gids.update(layer.get_used_gids())
+            tiles += sum(count for gid, count in layer.gid_counts.items() if gid)
+    gids.discard(0)
+
+    portals = [
+        (obj.x, obj.y, obj.properties.get("destination"), obj.properties.get("portal"))
+        for obj in tmx_data.find_objects(("portal",), ("portal",))
+    ]
+
+    missing_assets = []
+    for obj_type, key in (("static_npc", "sprite"), ("npc", "sprite"), ("poster", "poster_image")):
+        for obj in tmx_data.get_objects_by_type(obj_type):
+            image = obj.properties.get(key)
+            if image and not image_exists(image):
+                missing_assets.append((obj.x, obj.y, key, image))
+
+    return {
+        "filename": filename,
+        "parse_ms": parse_ms,
+        "cached": cache_file is not None,
+        "tiles": tiles,
+        "objects": sum(1 for _ in tmx_data.objects),
+        "tilesets": len(tmx_data.tilesets),
+        "gids": len(gids),
+        "portal_targets": sorted({obj.name for obj in tmx_data.get_objects_by_type("portal_target")}),
+        "portals": portals,
+        "missing_assets": missing_assets,
+    }
+
+
+def validate(levels, results):
+    """
+    Return the errors found in the compiled maps.
+
+    :param levels: level name -> (map file, compact_objects)
+    :param results: (map file, compact_objects) -> compile_map result
+    :rtype: list of str
+    """
+    errors = []
+    for result in results.values():
+        filename = result["filename"]
+        for x, y, destination, target in result["portals"]:
+            if not destination:
+                errors.append(f"{filename}: portal at {x}, {y} has no destination")
+            elif destination not in levels:
+                errors.append(f"{filename}: portal at {x}, {y} leads to unknown level '{destination}'")
+            elif target:
+                destination_result = results.get(levels[destination])
+                if destination_result and target not in destination_result["portal_targets"]:
+                    errors.append(
+                        f"{filename}: portal at {x}, {y} targets '{target}', which is not in '{destination}'"
+                    )
+        for x, y, key, image in result["missing_assets"]:
+            errors.append(f"{filename}: {key} '{image}' of object at {x}, {y} not found")
+    return errors
+
+
+def compile_maps(levels, cache_dir, jobs=None):
+    """
+    Compile the maps of the levels in a process pool.
+
+    Maps that fail to load are logged and left out of the results.
+
+    :param levels: level name -> (map file, compact_objects)
+    :param cache_dir: folder the compiled caches are written to
+    :param jobs: number of worker processes; defaults to the CPU count
+    :return: ((map file, compact_objects) -> compile_map result, number of failed maps)
+    """
+    results = {}
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            key: executor.submit(compile_map, key[0], key[1], cache_dir) for key in sorted(set(levels.values()))
+        }
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                LOG.error("Unable to load map %s: %s", key[0], e)
+                failed += 1
+    return results, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile and validate the maps of Legend of Harren")
+    parser.add_argument("levels", nargs="*", help="Level names to compile; defaults to every level")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("-c", "--cache-dir", default=resources.CACHE_FOLDER, help="Folder for the compiled caches")
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        default="INFO",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"),
+        help="Logging level for command output.",
+    )
+    parsed_args = parser.parse_args()
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(ColorFormatter("%(levelname)s: %(message)s"))
+    logging.basicConfig(level=parsed_args.log_level, handlers=[handler])
+
+    levels = level_maps()
+    unknown = [name for name in parsed_args.levels if name not in levels]
+    if unknown:
+        parser.error(f"unknown levels: {', '.join(unknown)}")
+    selected = {name: levels[name] for name in parsed_args.levels or levels}
+
+    results, failed = compile_maps(selected, parsed_args.cache_dir, parsed_args.jobs)
+
+    print(f"{'map':<24}{'parse ms':>10}{'tiles':>8}{'objects':>9}{'tilesets':>10}{'gids':>6}")
+    for result in results.values():
+        print(
+            f"{result['filename']:<24}{result['parse_ms']:>10.1f}{result['tiles']:>8}"
+            f"{result['objects']:>9}{result['tilesets']:>10}{result['gids']:>6}"
+        )
+        if not result["cached"]:
+            LOG.warning("#y<No compiled cache written for %s>", result["filename"])
+
+    # Portal targets can only be checked against maps that were compiled, so
+    # destinations outside of the selected levels are only checked by name
+    errors = validate(levels, results)
+    for error in errors:
+        LOG.error("#r<%s>", error)
+
+    if failed or errors:
+        sys.exit(1)
+    LOG.info("#g<Compiled %s maps>", len(results))
+
+
+if __name__ == "__main__":
+    main()
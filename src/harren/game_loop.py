@@ -15,7 +15,7 @@ from pytmx.util_pygame import load_pygame
 
 # Project
 from harren.levels import LEVEL_MAP
-from harren.resources import CONFIG_FOLDER, DATA_FOLDER, TMX_FOLDER
+from harren.resources import CACHE_FOLDER, CONFIG_FOLDER, DATA_FOLDER, TMX_FOLDER
 from harren.utils.pg_utils import get_font
 
 LOG = logging.getLogger(__name__)
@@ -96,7 +96,14 @@ class GameState(object):
     def overworld_map(self):
         """Return the overworld map (caching on first access)"""
         map_path = os.path.join(TMX_FOLDER, "harren_map.tmx")
-        return load_pygame(map_path)
+        return load_pygame(
+            map_path,
+            use_cache=True,
+            cache_dir=CACHE_FOLDER,
+            lazy_tiles=True,
+            lazy_variants=True,
+            index_gids=True,
+        )
 
     @cachedproperty
     def quest_data(self):
@@ -93,7 +93,15 @@ class BaseLevel:
 
     @cachedproperty
     def tmx_data(self):
-        return load_pygame(self.map_path)
+        return load_pygame(
+            self.map_path,
+            use_cache=True,
+            cache_dir=resources.CACHE_FOLDER,
+            compact_objects=True,
+            lazy_tiles=True,
+            lazy_variants=True,
+            index_gids=True,
+        )
 
     @property
     def font_15(self):
@@ -246,8 +254,11 @@ class BaseLevel:
                     break
 
             if move_player:
-                for collider in colliders:
-                    if collider.colliderect(check_box):
+                # Colliders are 16x16 from the object position, so any that
+                # can touch the check box are within 16 pixels of it
+                for obj in self.tmx_data.query_objects(check_box.inflate(32, 32)):
+                    collider = colliders.get(obj)
+                    if collider and collider.colliderect(check_box):
                         self.reset_player1(orig_x, orig_y)
                         break
 
@@ -411,77 +422,86 @@ class BaseLevel:
     @cachedproperty
     def custom_objects(self):
         """
-        All important data types collected in a single iteration.
+        All important data types collected from the map object indexes.
 
-        Gathers colliders, portals, and start points.
+        Gathers colliders, portals, and start points. Each object is only
+        claimed by the first matching category, in the order below.
         """
-        colliders = []
+        tmx_data = self.tmx_data
+        claimed = set()
+
+        def claim(objects):
+            objects = [obj for obj in objects if obj not in claimed]
+            claimed.update(objects)
+            return objects
+
+        pg_rect = pg.Rect
+        colliders = {
+            obj: pg_rect(obj.x, obj.y, 16, 16) for obj in claim(tmx_data.find_objects(("blocker",), ("blocker",)))
+        }
+
         start_point = None
+        start_names = ("start_point", "start point", "starting point")
+        start_points = [obj for obj in tmx_data.find_objects(start_names, start_names) if obj not in claimed]
+        for obj in claim(start_points[:1]):
+            start_point = pg_rect(obj.x, obj.y, 16, 16)
+
+        portal_targets = [
+            {"name": obj.name, "rect": pg_rect(obj.x, obj.y, 16, 16)}
+            for obj in claim(tmx_data.get_objects_by_type("portal_target"))
+        ]
+
         portals = []
-        portal_targets = []
-        static_npcs = []
-        npcs = []
-        posters = []
-        pg_rect = pg.Rect
-        for obj in self.tmx_data.objects:
-            name = obj.name
-            asset_type = obj.type
-            if asset_type == "blocker" or name == "blocker":
-                colliders.append(pg_rect(obj.x, obj.y, 16, 16))
-            elif not start_point and any(
-                (
-                    asset_type in ("start_point", "start point", "starting point"),
-                    name in ("start_point", "start point", "starting point"),
-                )
-            ):
-                start_point = pg_rect(obj.x, obj.y, 16, 16)
-            elif asset_type == "portal_target":
-                portal_targets.append({"name": name, "rect": pg_rect(obj.x, obj.y, 16, 16)})
-            elif asset_type == "portal" or name == "portal":
-                custom_properties = obj.properties
-                destination = custom_properties.get("destination")
-                teleport_target = custom_properties.get("portal")
-                if not destination:
-                    LOG.warning("Portal at %s, %s missing destination.", obj.x, obj.y)
-                else:
-                    portals.append(
-                        {
-                            "name": name,
-                            "rect": pg_rect(obj.x, obj.y, 16, 16),
-                            "destination": destination,
-                            "teleport_target": teleport_target,
-                        }
-                    )
-            elif asset_type == "static_npc":
-                custom_properties = obj.properties
-                sprite = custom_properties.get("sprite")
-                direction = custom_properties.get("direction", "down")
-                static_npcs.append(
-                    StaticNPC(
-                        self.game_loop,
-                        sprite,
-                        pg_rect(obj.x, obj.y, 16, 16),
-                        direction=direction,
-                        dialog=dialog_from_props(custom_properties),
-                    )
-                )
-            elif asset_type == "npc":
-                custom_properties = obj.properties
-                custom_properties["name"] = name  # Add name to custom data
-                sprite = custom_properties.get("sprite")
-                npcs.append(NPC(self.game_loop, sprite, pg_rect(obj.x, obj.y, 16, 16), data=custom_properties))
-            elif asset_type == "poster":
-                custom_properties = obj.properties
-                sprite = custom_properties.get("sprite")
-                requires = custom_properties.get("requires").split(",")
-                posters.append(
+        for obj in claim(tmx_data.find_objects(("portal",), ("portal",))):
+            custom_properties = obj.properties
+            destination = custom_properties.get("destination")
+            teleport_target = custom_properties.get("portal")
+            if not destination:
+                LOG.warning("Portal at %s, %s missing destination.", obj.x, obj.y)
+            else:
+                portals.append(
                     {
-                        "image": custom_properties.get("poster_image"),
-                        "requires": [x.strip() for x in requires],
+                        "name": obj.name,
                         "rect": pg_rect(obj.x, obj.y, 16, 16),
+                        "destination": destination,
+                        "teleport_target": teleport_target,
                     }
                 )
 
+        static_npcs = []
+        for obj in claim(tmx_data.get_objects_by_type("static_npc")):
+            custom_properties = obj.properties
+            sprite = custom_properties.get("sprite")
+            direction = custom_properties.get("direction", "down")
+            static_npcs.append(
+                StaticNPC(
+                    self.game_loop,
+                    sprite,
+                    pg_rect(obj.x, obj.y, 16, 16),
+                    direction=direction,
+                    dialog=dialog_from_props(custom_properties),
+                )
+            )
+
+        npcs = []
+        for obj in claim(tmx_data.get_objects_by_type("npc")):
+            custom_properties = obj.properties
+            custom_properties["name"] = obj.name  # Add name to custom data
+            sprite = custom_properties.get("sprite")
+            npcs.append(NPC(self.game_loop, sprite, pg_rect(obj.x, obj.y, 16, 16), data=custom_properties))
+
+        posters = []
+        for obj in claim(tmx_data.get_objects_by_type("poster")):
+            custom_properties = obj.properties
+            requires = custom_properties.get("requires").split(",")
+            posters.append(
+                {
+                    "image": custom_properties.get("poster_image"),
+                    "requires": [x.strip() for x in requires],
+                    "rect": pg_rect(obj.x, obj.y, 16, 16),
+                }
+            )
+
         return {
             "colliders": colliders,
             "start_point": start_point,
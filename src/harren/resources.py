@@ -14,3 +14,4 @@ TMX_FOLDER = os.path.join(RESOURCE_FOLDER, "tmx")
 DATA_FOLDER = os.path.join(RESOURCE_FOLDER, "data")
 HOME_FOLDER = os.path.expanduser("~")
 CONFIG_FOLDER = os.path.join(HOME_FOLDER, ".harren-rpg")
+CACHE_FOLDER = os.path.join(CONFIG_FOLDER, "cache")
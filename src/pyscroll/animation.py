@@ -6,16 +6,24 @@ AnimationFrame = namedtuple("AnimationFrame", "image duration")
 
 
 class AnimationToken:
-    __slots__ = ("next", "positions", "frames", "index")
+    __slots__ = ("next", "positions", "frames", "index", "rows")
 
-    def __init__(self, positions, frames, initial_time=0):
+    def __init__(self, positions, frames, initial_time=0, seeded=False):
         """
 
         :type frames: list
         :type positions: set
         :type initial_time: int
+        :param seeded: positions are all the positions of the tile; they are
+                       kept by row in rows, and are not discovered by drawing
+        :type seeded: bool
         """
         self.positions = positions
+        self.rows = None  # y -> positions in that row, if seeded
+        if seeded:
+            self.rows = {}
+            for position in positions:
+                self.rows.setdefault(position[1], []).append(position)
         self.frames = tuple(AnimationFrame(*i) for i in frames)
         self.next = frames[0].duration + initial_time
         self.index = 0
@@ -10,8 +10,12 @@ from heapq import heappop, heappush
 from itertools import product
 from typing import Tuple
 
+# Third Party
+from pygame import SRCALPHA
+
 # Project
 from pytmx import TiledObjectGroup
+from pytmx.util_pygame import AtlasTile
 from .lib import rect_to_bb, hex_to_rgb
 from .animation import AnimationFrame, AnimationToken
 
@@ -37,6 +41,7 @@ class PyscrollDataAdapter:
     tile_size = None  # (int, int): size of each tile in pixels
     map_size = None  # (int, int): size of map in tiles
     visible_tile_layers = None  # list of visible layer integers
+    atlas = False  # bool: tile images are (surface, area) pairs, blitted with the area
 
     def __init__(self):
         self._last_time = None  # Last time map animations were updated
@@ -76,9 +81,15 @@ class PyscrollDataAdapter:
             next_frame = token.advance(self._last_time)
             heappush(self._animation_queue, token)
 
-            # Following line for when all gid positions are known
-            # for position in self._tracked_tiles & token.positions:
-            for position in token.positions.copy():
+            if token.rows is None:
+                # positions found while drawing; dropped again once off screen
+                positions = token.positions.copy()
+            else:
+                # all positions are known, so only visit the rows in view
+                rows = token.rows
+                positions = [p for y in range(tile_view.top, tile_view.bottom) for p in rows.get(y, ())]
+
+            for position in positions:
                 x, y, l = position
 
                 # If this tile is on the buffer (checked by using the tile view)
@@ -99,7 +110,7 @@ class PyscrollDataAdapter:
                                 new_tiles_append((x, y, layer, image))
 
                 # Not on screen, but was previously. Clear it.
-                else:
+                elif token.rows is None:
                     token.positions.remove(position)
 
         return new_tiles
@@ -133,29 +144,40 @@ class PyscrollDataAdapter:
         """
         self._update_time()
         self._animation_queue = []
-        self._tracked_gids = set()
+        self._tracked_gids = set()  # animated gids whose positions are found while drawing
         self._animation_map = {}
 
         for gid, frame_data in self.get_animations():
-            self._tracked_gids.add(gid)
-
             frames = []
             for frame_gid, frame_duration in frame_data:
                 image = self._get_tile_image_by_id(frame_gid)
                 frames.append(AnimationFrame(image, frame_duration))
 
-            # The following line is slow when loading maps, but avoids overhead
-            # then rendering
-            # positions = set(self.tmx.get_tile_locations_by_gid(gid))
-
             # Ideally, positions would be populated with all the known
             # locations of an animation, but searching for their locations
-            # is slow. So it will be updated as the map is drawn.
-            positions = set()
-            ani = AnimationToken(positions, frames, self._last_time)
+            # is slow unless the data keeps an index of them. Otherwise it
+            # will be updated as the map is drawn.
+            positions = self.get_animation_positions(gid)
+            if positions is None:
+                self._tracked_gids.add(gid)
+                ani = AnimationToken(set(), frames, self._last_time)
+            else:
+                ani = AnimationToken(positions, frames, self._last_time, seeded=True)
             self._animation_map[gid] = ani
             heappush(self._animation_queue, ani)
 
+    def get_animation_positions(self, gid):
+        """
+        Return all positions of an animated tile, if they are cheap to find
+
+        Positions returned here are animated from the first frame, and the
+        renderer does not have to discover them while drawing.
+
+        :param gid: ID of the animated tile
+        :return: set of (x, y, layer) tuples, or None if not known
+        """
+        return None
+
     def get_tile_image(self, x, y, l):
         """
         Get a tile image, respecting current animations
@@ -278,11 +300,35 @@ class TiledMapData(PyscrollDataAdapter):
     Use of this class requires a recent version of pytmx.
     """
 
+    # tiles around the view to keep chunks of infinite maps loaded for
+    chunk_margin = 16
+
     def __init__(self, tmx):
         super().__init__()
         self.tmx = tmx
+        self.atlas = tmx.atlas
         self.reload_animations()
 
+    def prepare_tiles(self, tiles):
+        """
+        Load the chunks of infinite maps around the tile view
+
+        Chunks within chunk_margin tiles of the view are loaded, and chunks
+        more than twice that far away are evicted.
+
+        :param tiles: reference to the tile view
+        :type tiles: pygame.Rect
+        :return:
+        """
+        if not self.tmx.infinite:
+            return
+
+        x, y, w, h = tiles
+        m = self.chunk_margin
+        self.tmx.load_chunks((x - m, y - m, w + m * 2, h + m * 2))
+        m *= 2
+        self.tmx.evict_chunks((x - m, y - m, w + m * 2, h + m * 2))
+
     def get_animations(self):
         for gid, d in self.tmx.tile_properties.items():
             try:
@@ -293,21 +339,72 @@ class TiledMapData(PyscrollDataAdapter):
             if frames:
                 yield gid, frames
 
+    def get_animation_positions(self, gid):
+        """
+        Return all positions of an animated tile from the pytmx gid index
+
+        Only available for maps loaded with index_gids, and for gids the
+        index covers: chunked layers are not indexed, so a gid that is, or
+        may be, in a chunk is found while drawing instead.
+
+        :param gid: ID of the animated tile
+        :return: set of (x, y, layer) tuples, or None if not known
+        """
+        tmx = self.tmx
+        if tmx.gid_index is None:
+            return None
+        for l in tmx.visible_tile_layers:
+            layer = tmx.layers[l]
+            if layer.chunks is not None and (not layer.decoded or gid in layer.gid_counts):
+                return None
+        return set(tmx.get_tile_locations_by_gid(gid))
+
     def convert_surfaces(self, parent, alpha=False):
         """
         Convert all images in the data to match the parent
 
+        Images that already have the pixel format of the parent are kept, so
+        tiles pytmx converted for the display, and shares between maps
+        through its tile cache, stay shared.  With alpha, that includes
+        images without per-pixel alpha: they are opaque or use a colorkey.
+
         :param parent: pygame.Surface
         :param alpha: preserve alpha channel or not
         :return: None
         """
+        bitsize = parent.get_bitsize()
+        masks = parent.get_masks()[:3]
+
+        def convert(surface):
+            if (
+                surface.get_bitsize() == bitsize
+                and surface.get_masks()[:3] == masks
+                and (alpha or not surface.get_flags() & SRCALPHA)
+            ):
+                return surface
+            if alpha:
+                return surface.convert_alpha(parent)
+            return surface.convert(parent)
+
+        if self.atlas:
+            # convert each sheet once; the tiles keep their areas
+            sheets = {}
+            images = []
+            for i in self.tmx.images:
+                if i is None:
+                    images.append(None)
+                    continue
+                sheet = sheets.get(id(i.surface))
+                if sheet is None:
+                    sheet = sheets[id(i.surface)] = convert(i.surface)
+                images.append(AtlasTile(sheet, i.area))
+            self.tmx.images = images
+            return
+
         images = []
         for i in self.tmx.images:
             try:
-                if alpha:
-                    images.append(i.convert_alpha(parent))
-                else:
-                    images.append(i.convert(parent))
+                images.append(convert(i))
             except AttributeError:
                 images.append(None)
         self.tmx.images = images
@@ -368,7 +465,7 @@ class TiledMapData(PyscrollDataAdapter):
         :param id:
         :return:
         """
-        return self.tmx.images[id]
+        return self.tmx.get_tile_image_by_gid(id)
 
     def get_tile_images_by_rect(self, rect):
         """
@@ -382,17 +479,28 @@ class TiledMapData(PyscrollDataAdapter):
                 start = 0
             return enumerate(seq[start : stop + 1], start)
 
+        def rows(layer):
+            if layer.chunks is None:
+                for y, row in rev(layer.data, y1, y2):
+                    yield y, rev(row, x1, x2)
+            else:
+                # only chunks that are resident, see prepare_tiles
+                for cx, cy, data in layer.iter_chunks((x1, y1, x2 - x1 + 1, y2 - y1 + 1)):
+                    for y, row in rev(data, y1 - cy, y2 - cy):
+                        yield y + cy, ((x + cx, gid) for x, gid in rev(row, x1 - cx, x2 - cx))
+
         x1, y1, x2, y2 = rect_to_bb(rect)
         images = self.tmx.images
+        get_image = self.tmx.get_tile_image_by_gid
         layers = self.tmx.layers
         at = self._animated_tile
         tracked_gids = self._tracked_gids
         anim_map = self._animation_map
-        track = bool(self._animation_queue)
+        track = bool(tracked_gids)
 
         for l in self.tmx.visible_tile_layers:
-            for y, row in rev(layers[l].data, y1, y2):
-                for x, gid in [i for i in rev(row, x1, x2) if i[1]]:
+            for y, row in rows(layers[l]):
+                for x, gid in [i for i in row if i[1]]:
                     # Since the tile has been queried, assume it wants to be
                     # checked for animations sometime in the future
                     if track and gid in tracked_gids:
@@ -401,5 +509,6 @@ class TiledMapData(PyscrollDataAdapter):
                         # animated, so return the correct frame
                         yield x, y, l, at[(x, y, l)]
                     except KeyError:
-                        # not animated, so return surface from data, if any
-                        yield x, y, l, images[gid]
+                        # not animated, so return surface from data; tiles
+                        # pytmx creates lazily are missing until first drawn
+                        yield x, y, l, images[gid] or get_image(gid)
@@ -371,6 +371,7 @@ class BufferedRenderer:
         left, top = self._tile_view.topleft
         hit = self._layer_quadtree.hit
         get_tile = self.data.get_tile_image
+        atlas = self.data.atlas
         tile_layers = tuple(self.data.visible_tile_layers)
         dirty = []
         dirty_append = dirty.append
@@ -406,7 +407,12 @@ class BufferedRenderer:
                                 continue
 
                         tile = get_tile(x // tw + left, y // th + top, l)
-                        tile and surface_blit(tile, (x - ox, y - oy))
+                        if not tile:
+                            continue
+                        if atlas:
+                            surface_blit(tile[0], (x - ox, y - oy), tile[1])
+                        else:
+                            surface_blit(tile, (x - ox, y - oy))
 
     def _queue_edge_tiles(self, dx, dy):
         """Queue edge tiles and clear edge areas on buffer if needed
@@ -516,6 +522,11 @@ class BufferedRenderer:
 
         self.data.prepare_tiles(self._tile_view)
 
+        if self.data.atlas:
+            for x, y, l, (image, area) in self._tile_queue:
+                surface_blit(image, (x * tw - ltw, y * th - tth), area)
+            return
+
         for x, y, l, image in self._tile_queue:
             surface_blit(image, (x * tw - ltw, y * th - tth))
 
@@ -530,5 +541,8 @@ class BufferedRenderer:
 
         self.data.prepare_tiles(self._tile_view)
 
-        blit_list = [(image, (x * tw - ltw, y * th - tth)) for x, y, l, image in self._tile_queue]
-        surface.blits(blit_list)
+        if self.data.atlas:
+            blit_list = [(image, (x * tw - ltw, y * th - tth), area) for x, y, l, (image, area) in self._tile_queue]
+        else:
+            blit_list = [(image, (x * tw - ltw, y * th - tth)) for x, y, l, image in self._tile_queue]
+        surface.blits(blit_list, False)
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled map cache for pytmx
+
+Parsing a TMX file is the expensive part of loading a map.  This module
+stores everything a parse produces, except the images, in a compact binary
+file so later loads can skip the XML, or JSON, entirely.
+
+File layout::
+
+    header    magic, format version, check length, state length
+    check     pickle of the source hash and dependency stats
+    state     pickle of the TiledMap state; layer data is stored by reference,
+              except for the chunks of infinite maps
+    payload   little-endian uint32 gids of every tile layer, 16 byte aligned
+
+The payload is memory-mapped on load.  With numpy storage the layer arrays
+are copy-on-write views of the mapping, so untouched layers cost no memory
+until they are read.
+
+A cache file is only used when the map content hash and the modification
+time and size of every referenced tileset and image file still match.
+"""
+# Standard
+import array
+import hashlib
+import io
+import logging
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from xml.etree import ElementTree
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOG = logging.getLogger(__name__)
+
+# used when a map has no cache_dir; applications should pass their own folder
+CACHE_FOLDER = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "pytmx"
+)
+CACHE_MAGIC = b"PYTMXC\x00\x00"
+CACHE_VERSION = 9
+CACHE_EXTENSION = ".tmxc"
+HEADER = struct.Struct("<8sIQQ")
+ALIGNMENT = 16
+
+# TiledMap attributes that come from the caller rather than the TMX file
+EXCLUDED_ATTRIBUTES = frozenset(
+    (
+        "filename",
+        "image_loader",
+        "images",
+        "optional_gids",
+        "load_all_tiles",
+        "lazy_tiles",
+        "lazy_tile_count",
+        "lazy_variants",
+        "_imageless_gids",
+        "atlas",
+        "lazy_layers",
+        "index_gids",
+        "gid_index",
+        "_tile_loaders",
+        "load_threads",
+        "invert_y",
+        "use_numpy",
+        "streaming",
+        "xml_parser",
+        "use_cache",
+        "cache_dir",
+        "compact_objects",
+        "allow_duplicate_names",
+        "_tileset_firstgids",
+        "_tileset_ranges",
+        "_object_index",
+        "template_cache",
+        "_tileset_sources",
+        "__weakref__",
+    )
+)
+
+
+def cache_path(tmxmap):
+    """Return the path of the cache file for a TiledMap
+
+    Options that change the parsed result are part of the file name, so maps
+    loaded with different options do not overwrite each other.
+
+    :param tmxmap: TiledMap with a filename
+    :rtype: str
+    """
+    key = f"{os.path.abspath(tmxmap.filename)}|{tmxmap.invert_y}|{tmxmap.load_all_tiles}|{tmxmap.compact_objects}"
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(tmxmap.cache_dir or CACHE_FOLDER, name + CACHE_EXTENSION)
+
+
+def source_hash(filename):
+    """Return the sha1 hex digest of a file's contents."""
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def file_stat(path):
+    """Return a (path, mtime, size) tuple; mtime and size are None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, st.st_mtime_ns, st.st_size
+
+
+def tileset_sources(filename):
+    """Return the external tileset file names of a TMX or Tiled JSON map.
+
+    :param filename: path of the map file
+    :rtype: list of str, relative to the map
+    """
+    from .pytmx import JSON_MAP_EXTENSIONS, load_json
+
+    if filename.lower().endswith(JSON_MAP_EXTENSIONS):
+        tilesets = load_json(filename).get("tilesets", ())
+    else:
+        tilesets = (node.attrib for node in ElementTree.parse(filename).getroot().findall("tileset"))
+    return [tileset["source"] for tileset in tilesets if tileset.get("source")]
+
+
+def map_dependencies(tmxmap):
+    """Return the stats of every tileset, template and image file the map references.
+
+    :param tmxmap: parsed TiledMap
+    :rtype: list of (path, mtime, size) tuples
+    """
+    from .pytmx import TiledImageLayer
+
+    dirname = os.path.dirname(os.path.abspath(tmxmap.filename))
+    paths = set()
+
+    for source in tileset_sources(tmxmap.filename):
+        paths.add(os.path.join(dirname, source))
+
+    # the images of external tilesets are relative to the TSX or TSJ file;
+    # TiledTileset prefixes them with its directory, so they are relative to
+    # the map like every other path here
+    for tileset in tmxmap.tilesets:
+        if tileset.source:
+            paths.add(os.path.join(dirname, tileset.source))
+
+    for layer in tmxmap.layers:
+        if isinstance(layer, TiledImageLayer) and layer.source:
+            paths.add(os.path.join(dirname, layer.source))
+
+    for obj in tmxmap.objects:
+        if obj.template:
+            paths.add(os.path.join(dirname, obj.template))
+
+    for props in tmxmap.tile_properties.values():
+        source = props.get("source")
+        if source:
+            paths.add(os.path.join(dirname, source))
+
+    return [file_stat(os.path.normpath(path)) for path in sorted(paths)]
+
+
+def map_state(tmxmap):
+    """Return a dict of the TiledMap attributes that are stored in the cache."""
+    state = {}
+    for cls in type(tmxmap).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name not in EXCLUDED_ATTRIBUTES and name not in state:
+                state[name] = getattr(tmxmap, name)
+    return state
+
+
+class _StatePickler(pickle.Pickler):
+    """Pickler that stores layer data in the payload instead of the pickle."""
+
+    def __init__(self, file, tmxmap):
+        from .pytmx import TiledTileLayer
+
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.tmxmap = tmxmap
+        self.payload = io.BytesIO()
+        self.layer_data = {id(l.data): l for l in tmxmap.layers if isinstance(l, TiledTileLayer) and l.chunks is None}
+
+    def persistent_id(self, obj):
+        if obj is self.tmxmap:
+            return ("map",)
+        layer = self.layer_data.get(id(obj))
+        if layer is not None and layer.data is obj:
+            offset = self.payload.tell()
+            self.payload.write(layer_bytes(obj, layer.width, layer.height))
+            self.payload.write(b"\0" * (-self.payload.tell() % ALIGNMENT))
+            return ("layer", offset, layer.height, layer.width)
+        return None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    """Unpickler that rebuilds layer data from the memory-mapped payload."""
+
+    def __init__(self, file, tmxmap, buffer, payload_offset):
+        super().__init__(file)
+        self.tmxmap = tmxmap
+        self.buffer = buffer
+        self.payload_offset = payload_offset
+
+    def persistent_load(self, pid):
+        if pid[0] == "map":
+            return self.tmxmap
+        if pid[0] == "layer":
+            _, offset, height, width = pid
+            return layer_from_buffer(self.buffer, self.payload_offset + offset, height, width, self.tmxmap.use_numpy)
+        raise pickle.UnpicklingError(f"Unknown persistent id: {pid}")
+
+
+def layer_bytes(data, width, height):
+    """Return layer data as little-endian uint32 bytes."""
+    if np is not None and isinstance(data, np.ndarray):
+        return data.astype("<u4", copy=False).tobytes()
+    gids = array.array("I")
+    for row in data:
+        gids.fromlist(row.tolist())
+    if sys.byteorder == "big":
+        gids.byteswap()
+    return gids.tobytes()
+
+
+def layer_from_buffer(buffer, offset, height, width, use_numpy):
+    """Return layer data for a region of the cache payload
+
+    With numpy storage this is a zero-copy view of the buffer, otherwise the
+    rows are copied into the array storage used by the XML parser.
+    """
+    if use_numpy:
+        return np.frombuffer(buffer, dtype="<u4", count=width * height, offset=offset).reshape(height, width)
+
+    gids = array.array("I")
+    gids.frombytes(buffer[offset : offset + width * height * 4])
+    if sys.byteorder == "big":
+        gids.byteswap()
+    return tuple(array.array("L", gids[y * width : (y + 1) * width]) for y in range(height))
+
+
+def load_cached_map(tmxmap):
+    """Restore a TiledMap from its cache file, if there is a valid one
+
+    :param tmxmap: TiledMap with filename and cache options set
+    :return: True if the map state was restored, otherwise False
+    """
+    path = cache_path(tmxmap)
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return False
+
+    try:
+        magic, version, check_length, state_length = HEADER.unpack_from(buffer, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            LOG.debug("Ignoring cache %s with an old format", path)
+            return False
+
+        offset = HEADER.size
+        check = pickle.loads(buffer[offset : offset + check_length])
+        if check["source"] != source_hash(tmxmap.filename):
+            LOG.debug("Cache %s is stale: map changed", path)
+            return False
+        if any(file_stat(dep[0]) != tuple(dep) for dep in check["dependencies"]):
+            LOG.debug("Cache %s is stale: dependency changed", path)
+            return False
+
+        offset += check_length
+        payload_offset = offset + state_length + (-(offset + state_length) % ALIGNMENT)
+        state_file = io.BytesIO(buffer[offset : offset + state_length])
+        state = _StateUnpickler(state_file, tmxmap, buffer, payload_offset).load()
+    except Exception:
+        LOG.warning("Could not read map cache %s", path, exc_info=True)
+        return False
+
+    for name, value in state.items():
+        setattr(tmxmap, name, value)
+    LOG.debug("Loaded %s from cache %s", tmxmap.filename, path)
+    return True
+
+
+def save_cached_map(tmxmap):
+    """Write the cache file of a parsed TiledMap
+
+    Errors are logged rather than raised; a missing cache only costs time.
+
+    :param tmxmap: parsed TiledMap
+    :return: path of the cache file, or None if it could not be written
+    """
+    path = cache_path(tmxmap)
+    tmp_path = None
+    try:
+        check = pickle.dumps(
+            {"source": source_hash(tmxmap.filename), "dependencies": map_dependencies(tmxmap)},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        state_file = io.BytesIO()
+        pickler = _StatePickler(state_file, tmxmap)
+        pickler.dump(map_state(tmxmap))
+        state = state_file.getvalue()
+
+        header = HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(check), len(state))
+        end = len(header) + len(check) + len(state)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=CACHE_EXTENSION)
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(check)
+            f.write(state)
+            f.write(b"\0" * (-end % ALIGNMENT))
+            f.write(pickler.payload.getvalue())
+        os.replace(tmp_path, path)
+    except Exception:
+        LOG.warning("Could not write map cache %s", path, exc_info=True)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    LOG.debug("Wrote map cache %s", path)
+    return path
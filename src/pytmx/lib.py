@@ -1,6 +1,6 @@
 # Standard
 import logging
-from typing import Callable, Union
+from typing import Callable, Dict, NamedTuple, Union
 
 LOG = logging.getLogger(__name__)
 
@@ -54,6 +54,7 @@ class DefaultORM:
     height: Callable = float
     hexsidelength: Callable = float
     id: Callable = int
+    infinite: Callable = convert_to_bool
     italic: Callable = convert_to_bool
     kerning: Callable = convert_to_bool
     margin: Callable = int
@@ -92,10 +93,25 @@ class DefaultORM:
     x: Callable = float
     y: Callable = float
 
+    @classmethod
+    def get_converters(cls) -> Dict[str, Callable]:
+        """Return the attribute name to converter table, built once per class."""
+        try:
+            return cls.__dict__["_converters"]
+        except KeyError:
+            pass
+
+        # look up on the class so plain functions are not bound as methods
+        converters = {}
+        for klass in reversed(cls.__mro__):
+            for key in getattr(klass, "__annotations__", {}):
+                converters[key] = getattr(cls, key) or str
+        cls._converters = converters
+        return converters
+
     def convert_value(self, key: str, value: str) -> Union[bool, float, int, str]:
         """Convert a value based on a mapping type."""
-        func = getattr(self, key, str) or str
-        return func(value)
+        return self.get_converters().get(key, str)(value)
 
 
 class HWIntORM(DefaultORM):
@@ -105,14 +121,48 @@ class HWIntORM(DefaultORM):
     width: Callable = int
 
 
-class TileFlags:
+# Converters of the typed custom properties Tiled writes; "class" properties
+# hold nested properties and are handled by the parser
+PROPERTY_TYPES: Dict[str, Callable] = {
+    "string": str,
+    "int": int,
+    "float": float,
+    "bool": convert_to_bool,
+    "color": str,
+    "file": str,
+    "object": int,
+}
+
+
+class TileFlags(NamedTuple):
+    """Flip and rotation flags of a tile.
+
+    Instances are immutable and hashable so they can be used in mapping keys.
+    Only eight combinations exist; use ``TILE_FLAGS`` rather than building new
+    instances when decoding large amounts of layer data.
+    """
+
+    flipped_horizontally: bool
+    flipped_vertically: bool
+    flipped_diagonally: bool
+
+    @property
+    def bits(self) -> int:
+        """Return the flags packed as a 3-bit int in Tiled's bit order."""
+        return self.flipped_horizontally << 2 | self.flipped_vertically << 1 | self.flipped_diagonally
+
+    def __reduce__(self):
+        # Unpickle onto the shared instances instead of creating new ones
+        return interned_tile_flags, (self.bits,)
+
+
+# Interned flag combinations indexed by the top three bits of a Tiled gid
+TILE_FLAGS = tuple(TileFlags(bool(i & 4), bool(i & 2), bool(i & 1)) for i in range(8))
 
-    __slots__ = ("flipped_horizontally", "flipped_vertically", "flipped_diagonally")
 
-    def __init__(self, a: bool, b: bool, c: bool):
-        self.flipped_horizontally: bool = a
-        self.flipped_vertically: bool = b
-        self.flipped_diagonally: bool = c
+def interned_tile_flags(bits: int) -> TileFlags:
+    """Return the shared TileFlags instance for a 3-bit flag value."""
+    return TILE_FLAGS[bits]
 
 
 class AnimationFrame:
@@ -19,25 +19,38 @@ along with pytmx.  If not, see <http://www.gnu.org/licenses/>.
 """
 import array
 import gzip
+import json
 import logging
 import os
 import struct
+import sys
 import zlib
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from base64 import b64decode
-from collections import defaultdict
+from collections import ChainMap, Counter, defaultdict
 from io import BytesIO
 from itertools import chain, product
-from operator import attrgetter
 from collections.abc import MutableSequence
+from xml.etree import ElementTree
+from xml.parsers import expat
 
 try:
-    from lxml import etree as et
+    from lxml import etree as lxml_etree
 except ImportError:
-    from xml.etree import ElementTree as et
-import importlib
+    lxml_etree = None
+
+# ElementTree implementation used for TSX tilesets, templates and the "auto" parser
+et = ElementTree if lxml_etree is None else lxml_etree
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Project
-from .lib import AnimationFrame, DefaultORM, TileFlags, HWIntORM
+from .cache import load_cached_map, save_cached_map
+from .lib import AnimationFrame, DefaultORM, HWIntORM, PROPERTY_TYPES, TILE_FLAGS
 
 __all__ = (
     "TiledElement",
@@ -46,8 +59,15 @@ __all__ = (
     "TiledTileLayer",
     "TiledObject",
     "TiledObjectGroup",
+    "CompactObjects",
+    "CompactObject",
     "TiledImageLayer",
+    "TiledTemplate",
+    "TemplateCache",
+    "TEMPLATE_CACHE",
+    "XML_PARSERS",
     "parse_properties",
+    "tmx_to_json",
 )
 
 LOG = logging.getLogger(__name__)
@@ -63,6 +83,20 @@ TRANS_ROT = 4
 GID_TRANS_FLIPX = 1 << 31
 GID_TRANS_FLIPY = 1 << 30
 GID_TRANS_ROT = 1 << 29
+GID_FLAGS_SHIFT = 29
+GID_MASK = ~(GID_TRANS_FLIPX | GID_TRANS_FLIPY | GID_TRANS_ROT)
+GID_BITS = GID_TRANS_ROT - 1
+NO_FLAGS = TILE_FLAGS[0]
+
+# width and height, in tiles, of the cells of the object query grid
+OBJECT_GRID_CELLS = 8
+
+# file extensions of Tiled JSON maps and tilesets
+JSON_MAP_EXTENSIONS = (".tmj", ".json")
+JSON_TILESET_EXTENSIONS = (".tsj", ".json")
+
+# values of the xml_parser option of TiledMap
+XML_PARSERS = ("auto", "etree", "lxml", "expat")
 
 
 def default_image_loader(filename, flags, **kwargs):
@@ -80,39 +114,238 @@ def decode_gid(raw_gid):
     as of 0.7.0 it determines if the tile should be flipped when rendered
     as of 0.8.0 bit 30 determines if GID is rotated
 
+    The returned flags are shared instances from ``TILE_FLAGS`` so they can
+    be compared and hashed cheaply.
+
     :param raw_gid: 32-bit number from TMX layer data
     :return: gid, flags
     """
-    flags = TileFlags(
-        raw_gid & GID_TRANS_FLIPX == GID_TRANS_FLIPX,
-        raw_gid & GID_TRANS_FLIPY == GID_TRANS_FLIPY,
-        raw_gid & GID_TRANS_ROT == GID_TRANS_ROT,
-    )
-    gid = raw_gid & ~(GID_TRANS_FLIPX | GID_TRANS_FLIPY | GID_TRANS_ROT)
-    return gid, flags
+    return raw_gid & GID_MASK, TILE_FLAGS[raw_gid >> GID_FLAGS_SHIFT & 7]
+
+
+def overlaps_bounds(bounds, x1, y1, x2, y2):
+    """Return True if an object bounding box overlaps the area x1, y1, x2, y2
+
+    Edges are exclusive, except that a box without a width or height is
+    treated as a point or line at its position.
+
+    :param bounds: (x, y, width, height) of the object
+    :rtype: bool
+    """
+    x, y, width, height = bounds
+    if not (x < x2 and (x1 < x + width if width else x1 <= x)):
+        return False
+    return y < y2 and (y1 < y + height if height else y1 <= y)
+
+
+def read_points(text):
+    """Parse a text string of float tuples and return ((x, y), ...)."""
+    return tuple(tuple(map(float, i.split(","))) for i in text.split())
+
+
+def json_points(data):
+    """Return the (points, closed) of a Tiled JSON polygon or polyline object
+
+    :param data: dict from a Tiled JSON file
+    :return: ((x, y), ...) and True for polygons; (None, None) for other shapes
+    """
+    for key, closed in (("polygon", True), ("polyline", False)):
+        points = data.get(key)
+        if points is not None:
+            return tuple((float(p["x"]), float(p["y"])) for p in points), closed
+    return None, None
+
+
+def load_json(path):
+    """Return the decoded contents of a Tiled JSON (TMJ or TSJ) file."""
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def json_color(value):
+    """Return a Tiled JSON color, like "#ff00ff", in the TMX form "ff00ff"."""
+    return value.lstrip("#") if value else None
+
+
+def parse_json_properties(properties):
+    """
+    Return a dict of the "properties" list of a Tiled JSON object
+
+    Values are converted with PROPERTY_TYPES like parse_properties does, so
+    XML and JSON maps have the same property types.  The members of "class"
+    properties are already a dict and are kept as they are.
+
+    :param properties: list of {"name", "type", "value"} dicts
+    :return: dict
+    """
+    d = {}
+    for prop in properties:
+        value = prop.get("value")
+        prop_type = prop.get("type")
+        if prop_type is not None and prop_type != "class":
+            try:
+                value = PROPERTY_TYPES[prop_type](value)
+            except KeyError:
+                LOG.info("Not a supported property type: %s. Defaulting to string.", prop_type)
+        d[prop["name"]] = value
+    return d
 
 
 def parse_properties(node):
     """
     Parse a Tiled xml node and return a dict that represents a tiled "property"
 
+    Typed properties are converted with PROPERTY_TYPES, and "class"
+    properties become dicts of their members.
+
     :param node: etree element
     :return: dict
     """
     d = {}
     for child in node.findall("properties"):
         for subnode in child.findall("property"):
-            cls = None
-            try:
-                if "type" in subnode.keys():
-                    module = importlib.import_module("builtins")
-                    cls = getattr(module, subnode.get("type"))
-            except AttributeError:
-                LOG.info("Not a built-in type. Defaulting to string-cast.")
-            d[subnode.get("name")] = cls(subnode.get("value")) if cls is not None else subnode.get("value")
+            prop_type = subnode.get("type")
+            value = subnode.get("value")
+            if prop_type == "class":
+                value = parse_properties(subnode)
+            else:
+                if value is None:
+                    # multi-line strings are stored as text
+                    value = subnode.text
+                if prop_type is not None:
+                    try:
+                        value = PROPERTY_TYPES[prop_type](value)
+                    except KeyError:
+                        LOG.info("Not a supported property type: %s. Defaulting to string.", prop_type)
+            d[subnode.get("name")] = value
     return d
 
 
+def xml_module(name):
+    """Return the ElementTree implementation of an xml_parser option
+
+    :param name: "auto", "etree" or "lxml"; "auto" picks lxml if installed
+    :return: module with parse and iterparse functions
+    """
+    if name == "etree" or lxml_etree is None:
+        return ElementTree
+    return lxml_etree
+
+
+def tmx_to_json(filename):
+    """
+    Read a TMX file with expat into the dict of its Tiled JSON form
+
+    No element tree is built; the parser callbacks fill in the map, its
+    tilesets, layers and objects the way TiledMap.parse_json expects them.
+    Attribute values are kept as the strings of the TMX file, so the ORM
+    converts them just as for parse_xml.  Group layers and other elements
+    that parse_xml does not read are skipped.
+
+    :param filename: path of the TMX file
+    :return: dict
+    """
+    doc = {"tilesets": [], "layers": []}
+    stack = [("", None)]  # (tag, dict or list that children are added to) of the open elements
+    text = []
+    encoding = None
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+
+    def start(tag, attrs):
+        nonlocal encoding
+        parent_tag, parent = stack[-1]
+        node = None
+        if parent is None:
+            if tag == "map" and len(stack) == 1:
+                doc.update(attrs)
+                node = doc
+        elif tag == "object" and parent_tag == "objectgroup":
+            node = attrs
+            parent["objects"].append(node)
+        elif tag == "property":
+            node = {"name": attrs.get("name"), "type": attrs.get("type"), "value": attrs.get("value")}
+            parent.append(node)
+            if node["value"] is None:
+                text.clear()
+                parser.CharacterDataHandler = text.append
+        elif tag == "properties":
+            # members of "class" properties are kept apart from the property value
+            node = parent["members" if parent_tag == "property" else "properties"] = []
+        elif tag == "tile":
+            if parent_tag == "tileset":
+                node = attrs
+                parent.setdefault("tiles", []).append(node)
+            elif parent_tag in ("data", "chunk"):
+                parent["data"].append(int(attrs.get("gid", 0)))
+        elif tag in ("layer", "objectgroup", "imagelayer") and parent_tag == "map":
+            node = attrs
+            node["type"] = "tilelayer" if tag == "layer" else tag
+            if tag == "objectgroup":
+                node["objects"] = []
+            parent["layers"].append(node)
+        elif tag == "tileset" and parent_tag == "map":
+            node = attrs
+            parent["tilesets"].append(node)
+        elif tag == "data" and parent_tag == "layer":
+            # CSV text and tile elements both become a list of gids, as in JSON maps
+            encoding = attrs.get("encoding")
+            if encoding == "base64":
+                parent["encoding"] = encoding
+                parent["compression"] = attrs.get("compression")
+            node = parent
+            node["data"] = []
+            text.clear()
+            parser.CharacterDataHandler = text.append
+        elif tag == "chunk" and parent_tag == "data":
+            node = {"x": attrs["x"], "y": attrs["y"], "width": attrs["width"], "height": attrs["height"], "data": []}
+            parent.pop("data", None)
+            parent.setdefault("chunks", []).append(node)
+            text.clear()
+        elif tag == "image" and parent_tag in ("tileset", "tile", "imagelayer"):
+            parent["image"] = attrs.get("source")
+            parent["imagewidth"] = attrs.get("width")
+            parent["imageheight"] = attrs.get("height")
+            parent["transparentcolor"] = attrs.get("trans")
+        elif tag == "tileoffset" and parent_tag == "tileset":
+            parent["tileoffset"] = attrs
+        elif tag == "animation" and parent_tag == "tile":
+            node = parent["animation"] = []
+        elif tag == "frame" and parent_tag == "animation":
+            parent.append(attrs)
+        elif tag in ("polygon", "polyline") and parent_tag == "object":
+            parent[tag] = [{"x": x, "y": y} for x, y in read_points(attrs["points"])]
+        stack.append((tag, node))
+
+    def end(tag):
+        node = stack.pop()[1]
+        if node is None:
+            return
+        if tag == "property":
+            parser.CharacterDataHandler = None
+            if node["type"] == "class":
+                node["value"] = parse_json_properties(node.pop("members", ()))
+            elif node["value"] is None:
+                # multi-line strings are stored as text
+                node["value"] = "".join(text) or None
+        elif tag in ("data", "chunk"):
+            if tag == "data":
+                parser.CharacterDataHandler = None
+                if "chunks" in node:
+                    return
+            if encoding == "base64":
+                node["data"] = "".join(text)
+            elif encoding == "csv":
+                node["data"] = list(map(int, "".join(text).split(",")))
+            text.clear()
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    with open(filename, "rb") as f:
+        parser.ParseFile(f)
+    return doc
+
+
 class TiledElement:
     """Base class for all pytmx types."""
 
@@ -125,6 +358,16 @@ class TiledElement:
         self.properties = {}
         self.allow_duplicate_names = False
 
+    def parse(self, node):
+        """Parse an ElementTree xml node, or a dict from a Tiled JSON file
+
+        :param node: ElementTree xml node or dict
+        :return: self
+        """
+        if isinstance(node, dict):
+            return self.parse_json(node)
+        return self.parse_xml(node)
+
     @classmethod
     def from_xml_string(cls, xml_string):
         """Return a TileElement object from a xml string
@@ -150,16 +393,49 @@ class TiledElement:
         return False
 
     def set_attributes(self, node_items, orm=DEFAULT_ORM):
+        converters = orm.get_converters()
         for key, value in node_items:
-            casted_value = orm.convert_value(key, value)
+            casted_value = converters.get(key, str)(value)
             try:
                 setattr(self, key, casted_value)
             except AttributeError:
                 LOG.warning("%s Dropping attribute %s: %s", self.__class__.__name__, key, casted_value)
                 pass
 
+    def set_json_attributes(self, data, orm=DEFAULT_ORM):
+        """Set attributes from the members of a Tiled JSON object
+
+        Only plain values this element has a slot for are set; nested
+        objects, lists and Tiled JSON bookkeeping like "type" of layers are
+        handled by the parse_json methods.
+
+        :param data: dict from a Tiled JSON file
+        :param orm: converters that give values the types of the TMX parser
+        """
+        names = self._slot_names()
+        self.set_attributes(
+            ((key, value) for key, value in data.items() if key in names and not isinstance(value, (dict, list))),
+            orm=orm,
+        )
+
+    @classmethod
+    def _slot_names(cls):
+        """Return the frozenset of slot names of this class and its bases."""
+        try:
+            return cls.__dict__["_slot_name_set"]
+        except KeyError:
+            pass
+        names = frozenset(name for klass in cls.__mro__ for name in getattr(klass, "__slots__", ()))
+        cls._slot_name_set = names
+        return names
+
+    def set_json_properties(self, data):
+        self._apply_properties(parse_json_properties(data.get("properties", ())))
+
     def set_properties(self, node):
-        properties = parse_properties(node)
+        self._apply_properties(parse_properties(node))
+
+    def _apply_properties(self, properties):
         if self._contains_invalid_property_name(properties.items()):
             raise ValueError(
                 "Reserved names and duplicate names are not allowed. Please "
@@ -168,6 +444,9 @@ class TiledElement:
         self.properties = properties
 
     def __getattr__(self, item):
+        # Guard against recursion while properties is unset, i.e. unpickling
+        if item == "properties":
+            raise AttributeError(item)
         try:
             return self.properties[item]
         except KeyError:
@@ -189,10 +468,32 @@ class TiledMap(TiledElement):
         "image_loader",
         "optional_gids",
         "load_all_tiles",
+        "lazy_tiles",
+        "lazy_tile_count",
+        "lazy_variants",
+        "_imageless_gids",
+        "atlas",
+        "lazy_layers",
+        "index_gids",
+        "gid_index",
+        "_tile_loaders",
+        "load_threads",
         "invert_y",
+        "use_numpy",
+        "streaming",
+        "xml_parser",
+        "use_cache",
+        "cache_dir",
+        "compact_objects",
         "layers",
-        "tilesets",
+        "_tilesets",
+        "_tileset_firstgids",
+        "_tileset_ranges",
+        "_object_index",
+        "template_cache",
+        "_tileset_sources",
         "tile_properties",
+        "tile_transparency",
         "layernames",
         "gidmap",
         "imagemap",
@@ -214,22 +515,53 @@ class TiledMap(TiledElement):
         "nextobjectid",
         "infinite",
         "nextlayerid",
+        "__weakref__",
     )
 
     def __init__(self, filename=None, image_loader=default_image_loader, **kwargs):
         """Create new TiledMap
 
-        :param filename: filename of tiled map to load
+        :param filename: filename of tiled map to load; .tmj and .json files
+                         are read as Tiled JSON maps (see parse_json)
         :param image_loader: function that will load images (see below)
         :param optional_gids: load specific tile image GID, even if never used
         :param invert_y: invert the y axis
         :param load_all_tiles: load all tile images, even if never used
+        :param lazy_tiles: only create images of tiles the map uses up front;
+                           other tiles are created by get_tile_image_by_gid
+        :param lazy_variants: create images of flipped and rotated tiles on
+                              the first get_tile_image_by_gid, not up front
+        :param atlas: the image_loader returns atlas tiles, (surface, area)
+                      pairs, instead of an image per tile; set by load_pygame
+        :param lazy_layers: decode tile layer data on first access (see warm)
+        :param index_gids: build an index of tile positions by gid after
+                           loading (see build_gid_index)
+        :param load_threads: number of threads used to read and decode
+                             source images; 0 loads them on this thread
         :param allow_duplicate_names: allow duplicates in objects' metatdata
+        :param use_numpy: store tile layer data as 2D numpy uint32 arrays
+        :param streaming: parse the file with iterparse (see parse_stream);
+                          ignored for Tiled JSON maps and expat
+        :param xml_parser: XML parser of TMX files, one of XML_PARSERS:
+                           "etree" for xml.etree, "lxml", "expat" to read
+                           the map without an element tree (see
+                           tmx_to_json), or "auto" for lxml if installed
+        :param use_cache: load from, and save to, a compiled map cache
+        :param cache_dir: folder for compiled map caches; defaults to
+                          pytmx.cache.CACHE_FOLDER
+        :param template_cache: TemplateCache of object templates; defaults
+                               to the process-wide TEMPLATE_CACHE
+        :param compact_objects: store the objects of object groups in
+                                CompactObjects columns instead of as
+                                TiledObjects
 
         image_loader:
           this must be a reference to a function that will accept a tuple:
           (filename of image, bounding rect of tile in image, flags)
           the function must return a reference to to the tile.
+          the map is passed to it as the 'tiledmap' keyword argument.
+          with load_threads, a 'prefetch' attribute of the returned function
+          is called from a worker thread before the function itself is used.
         """
         super().__init__()
         self.filename = filename
@@ -238,14 +570,44 @@ class TiledMap(TiledElement):
         # optional keyword arguments checked here
         self.optional_gids = kwargs.get("optional_gids", set())
         self.load_all_tiles = kwargs.get("load_all", True)
+        self.lazy_tiles = kwargs.get("lazy_tiles", False)
+        self.lazy_tile_count = 0  # number of tile images created on demand
+        self._imageless_gids = set()  # gids _load_lazy_tile found no image for
+        self.lazy_variants = kwargs.get("lazy_variants", False)
+        self.atlas = kwargs.get("atlas", False)
+        self.lazy_layers = kwargs.get("lazy_layers", False)
+        self.index_gids = kwargs.get("index_gids", False)
+        self.gid_index = None  # gid -> [(layer index, flat positions), ...]
+        self._tile_loaders = {}
+        self.load_threads = kwargs.get("load_threads", 0)
         self.invert_y = kwargs.get("invert_y", True)
+        self.use_numpy = kwargs.get("use_numpy", False)
+        if self.use_numpy and np is None:
+            LOG.warning("NumPy is not installed; tile layers will use array storage.")
+            self.use_numpy = False
+        self.streaming = kwargs.get("streaming", False)
+        self.xml_parser = kwargs.get("xml_parser", "auto")
+        if self.xml_parser not in XML_PARSERS:
+            raise ValueError(f"Unknown XML parser: {self.xml_parser}")
+        if self.xml_parser == "lxml" and lxml_etree is None:
+            LOG.warning("lxml is not installed; TMX files will be parsed with xml.etree.")
+            self.xml_parser = "etree"
+        self.use_cache = kwargs.get("use_cache", False)
+        self.cache_dir = kwargs.get("cache_dir", None)
+        self.template_cache = kwargs.get("template_cache", TEMPLATE_CACHE)
+        self.compact_objects = kwargs.get("compact_objects", False)
 
         # Allow duplicate names to be parsed and loaded
         self.allow_duplicate_names = kwargs.get("allow_duplicate_names", False)
 
         self.layers = []  # All layers in proper order
-        self.tilesets = []  # TiledTileset objects
+        self.tilesets = []  # TiledTileset objects; also resets the index below
+        self._tileset_firstgids = None  # firstgid of each tileset, ascending
+        self._tileset_ranges = None  # (firstgid, lastgid, index in tilesets) in the same order
+        self._object_index = None  # see _get_object_index
+        self._tileset_sources = {}  # absolute path of external tilesets -> firstgid
         self.tile_properties = {}  # Tiles that have properties
+        self.tile_transparency = {}  # filled in by image loaders; see util_pygame.pygame_image_loader
         self.layernames = {}
 
         # Only used tiles are actually loaded, so there will be a difference
@@ -280,7 +642,23 @@ class TiledMap(TiledElement):
         self.imagemap[(0, 0)] = 0
 
         if filename:
-            self.parse_xml(et.parse(self.filename).getroot())
+            if self.use_cache and load_cached_map(self):
+                # classes the image loader finds now are kept in memory only;
+                # save_cached_map writes them, e.g. from harren-compile-maps
+                self.reload_images()
+            else:
+                if self.filename.lower().endswith(JSON_MAP_EXTENSIONS):
+                    self.parse_json(load_json(self.filename))
+                elif self.xml_parser == "expat":
+                    self.parse_json(tmx_to_json(self.filename))
+                elif self.streaming:
+                    self.parse_stream(self.filename)
+                else:
+                    self.parse_xml(xml_module(self.xml_parser).parse(self.filename).getroot())
+                if self.use_cache:
+                    save_cached_map(self)
+            if self.index_gids:
+                self.build_gid_index()
 
     def __repr__(self):
         return f"<{self.__class__.__name__}: '{self.filename}'>"
@@ -302,6 +680,8 @@ class TiledMap(TiledElement):
             "backgroundcolor",
             self.backgroundcolor,
         )
+        for subnode in node.findall("tileset"):
+            self._add_tileset_source(subnode.attrib)
 
         # ***         do not change this load order!         *** #
         # ***    gid mapping errors will occur if changed    *** #
@@ -317,6 +697,124 @@ class TiledMap(TiledElement):
         for subnode in node.findall("tileset"):
             self.add_tileset(TiledTileset(self, subnode))
 
+        return self._finish_parse()
+
+    def parse_json(self, data):
+        """
+        Parse a map from a decoded Tiled JSON (TMJ) document
+
+        The result is the same as parse_xml gives for the TMX version of the
+        map.  Group layers are not supported, as with TMX maps.
+
+        :param data: dict from a Tiled JSON map file
+        :return: self
+        """
+        self.set_json_properties(data)
+        self.set_json_attributes(data)
+        for tileset in data.get("tilesets", ()):
+            self._add_tileset_source(tileset)
+
+        # ***         do not change this load order!         *** #
+        # ***    gid mapping errors will occur if changed    *** #
+        layers = data.get("layers", ())
+        for layer_type, cls in (
+            ("tilelayer", TiledTileLayer),
+            ("imagelayer", TiledImageLayer),
+            ("objectgroup", TiledObjectGroup),
+        ):
+            for layer in layers:
+                if layer.get("type") == layer_type:
+                    self.add_layer(cls(self, layer))
+
+        for tileset in data.get("tilesets", ()):
+            self.add_tileset(TiledTileset(self, tileset))
+
+        return self._finish_parse()
+
+    def parse_stream(self, source):
+        """
+        Parse a map from a TMX file without keeping the whole document
+
+        Layers, image layers and object groups are built as soon as their end
+        tag is read and their elements are dropped right away.  Tilesets are
+        kept and parsed last, and layers are added in the same order as
+        parse_xml adds them, so the load order constraint still holds.
+
+        :param source: filename or file object of the TMX file
+        :return: self
+        """
+        builders = {"layer": TiledTileLayer, "imagelayer": TiledImageLayer, "objectgroup": TiledObjectGroup}
+        built = {tag: [] for tag in builders}
+        tileset_nodes = []
+        root = None
+        depth = 0
+
+        for event, elem in xml_module(self.xml_parser).iterparse(source, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                    self.set_attributes(root.items())
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+            if elem.tag in builders:
+                built[elem.tag].append(builders[elem.tag](self, elem))
+                root.remove(elem)
+            elif elem.tag == "tileset":
+                self._add_tileset_source(elem.attrib)
+                tileset_nodes.append(elem)
+                root.remove(elem)
+
+        self.set_properties(root)
+        self.backgroundcolor = root.get("backgroundcolor", self.backgroundcolor)
+
+        # ***         do not change this load order!         *** #
+        # ***    gid mapping errors will occur if changed    *** #
+        for tag in ("layer", "imagelayer", "objectgroup"):
+            for layer in built[tag]:
+                self.add_layer(layer)
+
+        for subnode in tileset_nodes:
+            self.add_tileset(TiledTileset(self, subnode))
+
+        return self._finish_parse()
+
+    def _add_tileset_source(self, tileset):
+        """Remember the firstgid of an external tileset, for templates
+
+        Objects are parsed before tilesets, so tile objects from templates
+        find the firstgid of their tileset here.
+
+        :param tileset: dict of the attributes of a tileset element or object
+        """
+        source = tileset.get("source")
+        if source:
+            self._tileset_sources[self.resolve_path(source)] = int(tileset["firstgid"])
+
+    def resolve_path(self, source):
+        """Return the absolute path of a file named relative to the map
+
+        :param source: path from the map file
+        :rtype: str
+        """
+        return os.path.abspath(os.path.join(os.path.dirname(self.filename or ""), source))
+
+    def get_template(self, source):
+        """Return the object template of a path relative to the map
+
+        :param source: path of a .tx or .tj file, as written in the map
+        :rtype: TiledTemplate
+        """
+        return self.template_cache.get(self.resolve_path(source))
+
+    def _finish_parse(self):
+        """Adjust tile objects and load images once all elements are parsed
+
+        :return: self
+        """
         # "tile objects", objects with a GID, have need to have their attributes
         # set after the tileset is loaded, so this step must be performed last
         # also, this step is performed for objects to load their tiles.
@@ -351,66 +849,207 @@ class TiledMap(TiledElement):
 
         :return: None
         """
-        self.images = [None] * self.maxgid
-
-        # iterate through tilesets to get source images
-        for ts in self.tilesets:
-
-            # skip tilesets without a source
-            if ts.source is None:
-                continue
-
-            path = os.path.join(os.path.dirname(self.filename), ts.source)
-            colorkey = getattr(ts, "trans", None)
-            loader = self.image_loader(path, colorkey, tileset=ts)
-
-            p = product(
-                range(ts.margin, ts.height + ts.margin - ts.tileheight + 1, ts.tileheight + ts.spacing),
-                range(ts.margin, ts.width + ts.margin - ts.tilewidth + 1, ts.tilewidth + ts.spacing),
-            )
-
-            # iterate through the tiles
-            for real_gid, (y, x) in enumerate(p, ts.firstgid):
-                rect = (x, y, ts.tilewidth, ts.tileheight)
-                gids = self.map_gid(real_gid)
-
-                # gids is None if the tile is never used
-                # but give another chance to load the gid anyway
-                if gids is None:
+        self._tile_loaders = {}
+        self.lazy_tile_count = 0
+        self._imageless_gids = set()
+        tilesets = [ts for ts in self.tilesets if ts.source is not None]
+
+        # tiles that are never used have no gid yet, so give them one
+        # first; this way the image list only has to be sized once
+        for ts in tilesets:
+            for real_gid, rect in ts.iter_tile_rects():
+                if real_gid not in self.gidmap:
                     if self.load_all_tiles or real_gid in self.optional_gids:
                         # TODO: handle flags? - might never be an issue, though
-                        gids = [self.register_gid(real_gid, flags=0)]
+                        self.register_gid(real_gid, flags=0)
 
-                if gids:
-                    # flags might rotate/flip the image, so let the loader
-                    # handle that here
-                    for gid, flags in gids:
-                        self.images[gid] = loader(rect, flags)
-
-        # Load image layer images
+        self.images = [None] * self.maxgid
+        used_gids = self.get_used_gids() if self.lazy_tiles else None
+        dirname = os.path.dirname(self.filename)
+
+        # collect the tiles of tilesets with a source image
+        tiles = []
+        for ts in tilesets:
+            for real_gid, rect in ts.iter_tile_rects():
+                for gid, flags in self.gidmap.get(real_gid, ()):
+                    if self.lazy_variants and flags and any(flags):
+                        continue
+                    if used_gids is None or gid in used_gids:
+                        tiles.append((self._get_tile_loader(ts), gid, rect, flags))
+
+        # image layer images
+        layer_loaders = []
         for layer in (i for i in self.layers if isinstance(i, TiledImageLayer)):
             source = getattr(layer, "source", None)
             if source:
                 colorkey = getattr(layer, "trans", None)
-                real_gid = len(self.images)
-                gid = self.register_gid(real_gid)
-                layer.gid = gid
-                path = os.path.join(os.path.dirname(self.filename), source)
-                loader = self.image_loader(path, colorkey)
-                image = loader()
-                self.images.append(image)
-
-        # load images in tiles.
-        # instead of making a new gid, replace the reference to the tile that
-        # was loaded from the tileset
+                path = os.path.join(dirname, source)
+                layer_loaders.append((layer, self.image_loader(path, colorkey, tiledmap=self)))
+
+        # images in tiles
+        source_loaders = []
         for real_gid, props in self.tile_properties.items():
             source = props.get("source", None)
             if source:
                 colorkey = props.get("trans", None)
-                path = os.path.join(os.path.dirname(self.filename), source)
-                loader = self.image_loader(path, colorkey)
-                image = loader()
-                self.images[real_gid] = image
+                path = os.path.join(dirname, source)
+                source_loaders.append((real_gid, self.image_loader(path, colorkey, tiledmap=self)))
+
+        if self.load_threads:
+            loaders = list(self._tile_loaders.values())
+            loaders.extend(loader for _, loader in layer_loaders)
+            loaders.extend(loader for _, loader in source_loaders)
+            self._prefetch_images(loaders)
+
+        # flags might rotate/flip the image, so let the loader handle that here
+        for loader, gid, rect, flags in tiles:
+            self.images[gid] = loader(rect, flags)
+
+        for layer, loader in layer_loaders:
+            real_gid = len(self.images)
+            layer.gid = self.register_gid(real_gid)
+            self.images.append(loader())
+
+        # instead of making a new gid, replace the reference to the tile that
+        # was loaded from the tileset
+        for real_gid, loader in source_loaders:
+            self.images[real_gid] = loader()
+
+    def _prefetch_images(self, loaders):
+        """Read and decode the source images of loaders in a thread pool
+
+        Loaders that support this have a 'prefetch' function which only does
+        the file read and decode; anything that depends on the display, like
+        convert(), still happens when the loader is called on this thread.
+
+        :param loaders: loader functions returned by the image_loader
+        :return: None
+        """
+        prefetch = [loader.prefetch for loader in loaders if hasattr(loader, "prefetch")]
+        if not prefetch:
+            return
+        with ThreadPoolExecutor(max_workers=self.load_threads) as pool:
+            for future in [pool.submit(func) for func in prefetch]:
+                future.result()
+
+    def _get_tile_loader(self, tileset):
+        """Return the image loader of a tileset, creating it on first use
+
+        :param tileset: TiledTileset with a source image
+        :return: loader function returned by the image_loader
+        """
+        try:
+            return self._tile_loaders[tileset]
+        except KeyError:
+            path = os.path.join(os.path.dirname(self.filename), tileset.source)
+            colorkey = getattr(tileset, "trans", None)
+            loader = self.image_loader(path, colorkey, tileset=tileset, tiledmap=self)
+            self._tile_loaders[tileset] = loader
+            return loader
+
+    def _load_lazy_tile(self, gid):
+        """Create the image of a tile that reload_images skipped
+
+        :param gid: GID of image
+        :return: the tile image, or None if the gid has no tileset image
+        """
+        if gid in self._imageless_gids:
+            return None
+
+        try:
+            tiled_gid = self.tiledgidmap[gid]
+            tileset = self.get_tileset_from_gid(gid)
+        except (KeyError, ValueError):
+            self._imageless_gids.add(gid)
+            return None
+
+        rect = tileset.get_tile_rect(tiled_gid)
+        if tileset.source is None or rect is None:
+            self._imageless_gids.add(gid)
+            return None
+
+        flags = next((f for g, f in self.gidmap.get(tiled_gid, ()) if g == gid), None)
+        image = self._get_tile_loader(tileset)(rect, flags)
+        if gid >= len(self.images):
+            self.images.extend([None] * (gid + 1 - len(self.images)))
+        self.images[gid] = image
+        self.lazy_tile_count += 1
+        return image
+
+    def get_used_gids(self):
+        """Return the GIDs used by tile layers, tile objects and animations
+
+        GIDs of optional_gids are included as well.  Tile layers that are not
+        decoded yet are skipped, see warm, as are chunks that are not resident.
+
+        :rtype: set of GIDs
+        """
+        gids = set()
+        for layer in self.layers:
+            if isinstance(layer, TiledTileLayer):
+                if layer.decoded or layer.chunks is not None:
+                    gids.update(layer.get_used_gids())
+            elif isinstance(layer, TiledObjectGroup):
+                gids.update(o.gid for o in layer if o.gid)
+
+        for props in self.tile_properties.values():
+            gids.update(frame.gid for frame in props.get("frames", ()))
+
+        for real_gid in self.optional_gids:
+            gids.update(gid for gid, flags in self.gidmap.get(real_gid, ()))
+
+        gids.discard(0)
+        return gids
+
+    def _load_tile_images(self, gids):
+        """Create the missing images of tiles
+
+        Used for layers and chunks that are decoded after the map images
+        were loaded.
+
+        :param gids: iterable of pytmx gids
+        :return: None
+        """
+        if len(self.images) < self.maxgid:
+            self.images.extend([None] * (self.maxgid - len(self.images)))
+        for gid in gids:
+            if gid and self.images[gid] is None:
+                self._load_lazy_tile(gid)
+
+    def load_chunks(self, rect):
+        """Decode the chunks of chunked tile layers that overlap a rect
+
+        :param rect: (x, y, width, height) in tiles
+        :return: number of chunks decoded
+        """
+        return sum(layer.load_chunks(rect) for layer in self.layers if isinstance(layer, TiledTileLayer))
+
+    def evict_chunks(self, rect):
+        """Drop the decoded chunks of chunked tile layers outside a rect
+
+        :param rect: (x, y, width, height) in tiles
+        :return: number of chunks evicted
+        """
+        return sum(layer.evict_chunks(rect) for layer in self.layers if isinstance(layer, TiledTileLayer))
+
+    def warm(self, layers=None):
+        """Decode tile layers ahead of their first use
+
+        Only useful for maps loaded with lazy_layers.
+
+        :param layers: iterable of layer names, indexes or layers; all tile
+                       layers if None
+        :return: None
+        """
+        if layers is None:
+            layers = self.layers
+        for layer in layers:
+            if isinstance(layer, str):
+                layer = self.get_layer_by_name(layer)
+            elif isinstance(layer, int):
+                layer = self.layers[layer]
+            if isinstance(layer, TiledTileLayer):
+                layer.decode()
 
     def get_tile_image(self, x, y, layer):
         """
@@ -434,7 +1073,7 @@ class TiledMap(TiledElement):
         assert isinstance(layer, TiledTileLayer)
 
         try:
-            gid = layer.data[y][x]
+            gid = layer.get_gid(x, y)
         except (IndexError, ValueError):
             raise ValueError
         except TypeError:
@@ -445,16 +1084,26 @@ class TiledMap(TiledElement):
     def get_tile_image_by_gid(self, gid):
         """Return the tile image for this location
 
+        With lazy_tiles, images of tiles the map does not use are created
+        on the first request and counted in lazy_tile_count.  So are the
+        flipped and rotated tiles with lazy_variants.
+
         :param gid: GID of image
         :rtype: surface if found, otherwise ValueError
         """
         try:
             assert int(gid) >= 0
-            return self.images[gid]
+            image = self.images[gid]
         except TypeError:
             raise TypeError(f"GIDs must be expressed as a number.  Got: {gid}")
         except (AssertionError, IndexError):
-            raise ValueError(f"Invalid GID: {gid}")
+            if not (self.lazy_tiles and gid in self.tiledgidmap):
+                raise ValueError(f"Invalid GID: {gid}")
+            image = None
+
+        if image is None and (self.lazy_tiles or self.lazy_variants):
+            image = self._load_lazy_tile(gid)
+        return image
 
     def get_tile_gid(self, x, y, layer):
         """Return the tile image GID for this location
@@ -470,7 +1119,7 @@ class TiledMap(TiledElement):
             raise ValueError
 
         try:
-            return self.layers[int(layer)].data[int(y)][int(x)]
+            return self.layers[int(layer)].get_gid(int(x), int(y))
         except (IndexError, ValueError):
             raise ValueError(f"Coord: ({x},{y}) in layer {layer} is invalid")
 
@@ -488,7 +1137,7 @@ class TiledMap(TiledElement):
             raise ValueError
 
         try:
-            gid = self.layers[int(layer)].data[int(y)][int(x)]
+            gid = self.layers[int(layer)].get_gid(int(x), int(y))
         except (IndexError, ValueError):
             raise Exception(f"Coord: ({x},{y}) in layer {layer} is invalid.")
 
@@ -500,17 +1149,108 @@ class TiledMap(TiledElement):
             except KeyError:
                 return None
 
+    def build_gid_index(self):
+        """Build the index of tile positions by gid used by get_tile_locations_by_gid
+
+        For every gid the index holds (layer index, positions) pairs, where
+        positions is an array of y * width + x offsets in ascending order.
+        Lazy layers are decoded; chunked layers are not indexed.
+
+        :return: None
+        """
+        index = defaultdict(list)
+        for l, layer in enumerate(self.layers):
+            if not isinstance(layer, TiledTileLayer) or layer.chunks is not None:
+                continue
+
+            if np is not None and isinstance(layer.data, np.ndarray):
+                flat = layer.data.ravel()
+                order = np.argsort(flat, kind="stable").astype(np.uint32)
+                counts = np.bincount(flat)
+                ends = np.cumsum(counts)
+                for gid in (np.flatnonzero(counts[1:]) + 1).tolist():
+                    index[gid].append((l, order[ends[gid] - counts[gid] : ends[gid]]))
+            else:
+                positions = defaultdict(lambda: array.array("I"))
+                for y, row in enumerate(layer.data):
+                    offset = y * layer.width
+                    for x, gid in enumerate(row):
+                        if gid:
+                            positions[gid].append(offset + x)
+                for gid, value in positions.items():
+                    index[gid].append((l, value))
+
+        self.gid_index = dict(index)
+
+    def _reindex_tile(self, layer, position, old, new):
+        """Move a tile position of a layer from one gid to another in gid_index
+
+        :param layer: TiledTileLayer with rows, not chunks
+        :param position: y * width + x offset of the tile
+        :param old: gid the tile had
+        :param new: gid the tile has now
+        :return: None
+        """
+        l = self.layers.index(layer)
+        index = self.gid_index
+
+        # empty tiles are not indexed
+        if old:
+            entries = index.get(old, [])
+            for n, (i, positions) in enumerate(entries):
+                if i == l:
+                    p = bisect_left(positions, position)
+                    if np is not None and isinstance(positions, np.ndarray):
+                        positions = np.delete(positions, p)
+                        entries[n] = (l, positions)
+                    else:
+                        del positions[p]
+                    if not len(positions):
+                        del entries[n]
+                    if not entries:
+                        del index[old]
+                    break
+
+        if new:
+            entries = index.setdefault(new, [])
+            for n, (i, positions) in enumerate(entries):
+                if i == l:
+                    p = bisect_left(positions, position)
+                    if np is not None and isinstance(positions, np.ndarray):
+                        entries[n] = (l, np.insert(positions, p, position))
+                    else:
+                        positions.insert(p, position)
+                    break
+            else:
+                if np is not None and isinstance(layer.data, np.ndarray):
+                    positions = np.array([position], dtype=np.uint32)
+                else:
+                    positions = array.array("I", [position])
+                entries.append((l, positions))
+                entries.sort(key=lambda entry: entry[0])
+
     def get_tile_locations_by_gid(self, gid):
         """Search map for tile locations by the GID
 
         Return (int, int, int) tuples, where the layer is index of
         the visible tile layers.
 
-        Note: Not a fast operation.  Cache results if used often.
+        Note: Not a fast operation, unless the map was loaded with
+        index_gids.  Cache results if used often.
 
         :param gid: GID to be searched for
         :rtype: generator of tile locations
         """
+        # empty tiles are not indexed
+        if self.gid_index is not None and gid:
+            visible = set(self.visible_tile_layers)
+            for l, positions in self.gid_index.get(gid, ()):
+                if l in visible:
+                    width = self.layers[l].width
+                    for position in positions.tolist():
+                        yield position % width, position // width, l
+            return
+
         for l in self.visible_tile_layers:
             for x, y, _gid in [i for i in self.layers[l].iter_data() if i[2] == gid]:
                 yield x, y, l
@@ -546,15 +1286,27 @@ class TiledMap(TiledElement):
         except (TypeError, AssertionError):
             raise ValueError(f"Layer must be a positive integer.  Got {type(layer)} instead.")
 
-        p = product(range(self.width), range(self.height))
-        layergids = set(self.layers[layer].data[y][x] for x, y in p)
-
-        for gid in layergids:
+        for gid in self.layers[layer].get_used_gids():
             try:
                 yield gid, self.tile_properties[gid]
             except KeyError:
                 continue
 
+    def get_tileset_usage(self, layer):
+        """Count the tiles of a layer by tileset
+
+        :param layer: layer number
+        :rtype: dict of TiledTileset to number of tiles
+        """
+        usage = Counter()
+        for gid, count in self.layers[layer].gid_counts.items():
+            if gid:
+                try:
+                    usage[self.get_tileset_from_gid(gid)] += count
+                except ValueError:
+                    continue
+        return dict(usage)
+
     def add_layer(self, layer):
         """Add a layer (TileTileLayer, TiledImageLayer, or TiledObjectGroup)
 
@@ -563,6 +1315,7 @@ class TiledMap(TiledElement):
         assert isinstance(layer, (TiledTileLayer, TiledImageLayer, TiledObjectGroup))
         self.layers.append(layer)
         self.layernames[layer.name] = layer
+        self._object_index = None
 
     def add_tileset(self, tileset):
         """Add a tileset to the map
@@ -571,6 +1324,49 @@ class TiledMap(TiledElement):
         """
         assert isinstance(tileset, TiledTileset)
         self.tilesets.append(tileset)
+        self._tileset_firstgids = None
+
+    @property
+    def tilesets(self):
+        """TiledTileset objects of the map
+
+        Assigning a new list rebuilds the index get_tileset_from_gid uses.
+        """
+        return self._tilesets
+
+    @tilesets.setter
+    def tilesets(self, value):
+        self._tilesets = value
+        self._tileset_firstgids = None
+        self._tileset_ranges = None
+
+    def _get_tileset_index(self):
+        """Return the firstgids of the tilesets in ascending order, and the
+        (firstgid, lastgid, index in tilesets) of each tileset in that order
+
+        The index is rebuilt after add_tileset, when tilesets is assigned,
+        and if the tileset list was changed directly.  A tileset image owns
+        a tile for each cell of its grid; image collections own every gid up
+        to the next tileset.
+
+        :rtype: (list, list)
+        """
+        tilesets = self.tilesets
+        if self._tileset_firstgids is None or len(self._tileset_ranges) != len(tilesets):
+            order = sorted(range(len(tilesets)), key=lambda i: tilesets[i].firstgid)
+            firstgids = [tilesets[i].firstgid for i in order]
+            ranges = []
+            for n, i in enumerate(order):
+                tileset = tilesets[i]
+                lastgid = firstgids[n + 1] - 1 if n + 1 < len(order) else sys.maxsize
+                if tileset.source is not None:
+                    xs, ys = tileset._tile_grid()
+                    count = tileset.tilecount or len(xs) * len(ys)
+                    lastgid = min(lastgid, tileset.firstgid + count - 1)
+                ranges.append((tileset.firstgid, lastgid, i))
+            self._tileset_firstgids = firstgids
+            self._tileset_ranges = ranges
+        return self._tileset_firstgids, self._tileset_ranges
 
     def get_layer_by_name(self, name):
         """Return a layer by name
@@ -590,31 +1386,173 @@ class TiledMap(TiledElement):
         :param name: Name of object. Case-sensitive.
         :rtype: Object if found, otherwise ValueError
         """
-        for obj in self.objects:
-            if obj.name == name:
-                return obj
-        raise ValueError
+        try:
+            return self._get_object_index()["name"][name][0]
+        except KeyError:
+            raise ValueError
+
+    def get_object_by_id(self, obj_id):
+        """
+        Find an object by its Tiled object id
+
+        :param obj_id: id of object
+        :rtype: Object if found, otherwise ValueError
+        """
+        try:
+            return self._get_object_index()["id"][obj_id]
+        except KeyError:
+            raise ValueError
+
+    def get_objects_by_type(self, type):
+        """
+        Return the objects of a type, in map order
+
+        :param type: type of objects. Case-sensitive.
+        :rtype: list of objects
+        """
+        return list(self._get_object_index()["type"].get(type, ()))
+
+    def find_objects(self, names=(), types=()):
+        """
+        Return the objects with any of the names or any of the types
+
+        :param names: iterable of object names
+        :param types: iterable of object types
+        :rtype: list of objects in map order
+        """
+        index = self._get_object_index()
+        found = set()
+        for key, values in (("name", names), ("type", types)):
+            for value in values:
+                found.update(index[key].get(value, ()))
+        return sorted(found, key=index["order"].__getitem__)
+
+    def _get_object_index(self):
+        """Return the object indexes by name, type, id and map order
+
+        The indexes are built on first use and rebuilt when layers or objects
+        are added or removed.  Call reindex_objects after renaming objects or
+        changing their type.
+
+        :rtype: dict of index name to dict
+        """
+        count = sum(len(group) for group in self.objectgroups)
+        index = self._object_index
+        if index is None or index["count"] != count:
+            index = {"count": count, "name": {}, "type": {}, "id": {}, "order": {}}
+            for i, obj in enumerate(self.objects):
+                index["name"].setdefault(obj.name, []).append(obj)
+                index["type"].setdefault(obj.type, []).append(obj)
+                index["id"].setdefault(obj.id, obj)
+                index["order"][obj] = i
+            self._object_index = index
+        return index
+
+    def query_objects(self, rect, types=None):
+        """
+        Return the objects whose bounding boxes overlap a rect
+
+        Objects are found through a uniform grid of OBJECT_GRID_CELLS tiles
+        per cell, so a query only looks at objects near the rect.  Objects
+        without a size match when their position is inside the rect.  Call
+        reindex_objects after moving or resizing objects.
+
+        :param rect: (x, y, width, height) area in pixels, i.e. a pygame Rect
+        :param types: iterable of object types to keep; None keeps all
+        :rtype: list of objects in map order
+        """
+        index = self._get_object_index()
+        grid = index.get("grid")
+        if grid is None:
+            grid = index["grid"] = self._build_object_grid(index["order"])
+        cell_width, cell_height, cells = grid
+
+        x, y, width, height = rect
+        found = set()
+        for cx in range(int(x // cell_width), int((x + width) // cell_width) + 1):
+            for cy in range(int(y // cell_height), int((y + height) // cell_height) + 1):
+                found.update(cells.get((cx, cy), ()))
+
+        if types is not None:
+            types = set(types)
+            found = (obj for obj in found if obj.type in types)
+        x2 = x + width
+        y2 = y + height
+        found = [obj for obj in found if overlaps_bounds(obj.bounds, x, y, x2, y2)]
+        return sorted(found, key=index["order"].__getitem__)
+
+    def _build_object_grid(self, objects):
+        """Return (cell width, cell height, {(cx, cy): [objects]}) for objects
+
+        :param objects: iterable of TiledObjects
+        :rtype: tuple
+        """
+        cell_width = (self.tilewidth or 1) * OBJECT_GRID_CELLS
+        cell_height = (self.tileheight or 1) * OBJECT_GRID_CELLS
+        cells = defaultdict(list)
+        for obj in objects:
+            x, y, width, height = obj.bounds
+            for cx in range(int(x // cell_width), int((x + width) // cell_width) + 1):
+                for cy in range(int(y // cell_height), int((y + height) // cell_height) + 1):
+                    cells[cx, cy].append(obj)
+        return cell_width, cell_height, dict(cells)
+
+    def reindex_objects(self):
+        """Rebuild the object indexes on next use
+
+        :return: None
+        """
+        self._object_index = None
 
     def get_tileset_from_gid(self, gid):
         """
         Return tileset that owns the gid
 
-        Note: this is a slow operation, so if you are expecting to do this
-              often, it would be worthwhile to cache the results of this.
+        A tileset image owns the tiles of its grid only, so gids past it,
+        such as the gids registered for image layers, have no tileset.
 
         :param gid: gid of tile image
-        :rtype: TiledTileset if found, otherwise ValueError
+        :rtype: TiledTileset if found, otherwise ValueError; also raised for
+                image layer gids, which used to return the last tileset
         """
         try:
             tiled_gid = self.tiledgidmap[gid]
         except KeyError:
             raise ValueError
 
-        for tileset in sorted(self.tilesets, key=attrgetter("firstgid"), reverse=True):
-            if tiled_gid >= tileset.firstgid:
-                return tileset
+        firstgids, ranges = self._get_tileset_index()
+        i = bisect_right(firstgids, tiled_gid) - 1
+        if i < 0 or tiled_gid > ranges[i][1]:
+            raise ValueError
+        return self.tilesets[ranges[i][2]]
+
+    def get_tileset_indexes_from_gids(self, gids):
+        """
+        Return the index in tilesets of the tileset that owns each gid
+
+        Meant for classifying whole layers at once, for example
+        get_tileset_indexes_from_gids(layer.data), with either storage.
 
-        raise ValueError
+        :param gids: numpy array, rows of gids, or iterable of gids
+        :rtype: numpy int array of the same shape for numpy input, and for
+                rows when NumPy is installed; otherwise a list, of lists for
+                rows; -1 where the gid is empty or has no tileset
+        """
+        firstgids, ranges = self._get_tileset_index()
+        table = [-1] * self.maxgid
+        for gid, tiled_gid in self.tiledgidmap.items():
+            i = bisect_right(firstgids, tiled_gid) - 1
+            if i >= 0 and tiled_gid <= ranges[i][1] and gid < self.maxgid:
+                table[gid] = ranges[i][2]
+
+        if np is None or not isinstance(gids, np.ndarray):
+            gids = list(gids)
+            if not (gids and hasattr(gids[0], "__len__")):
+                return [table[gid] for gid in gids]
+            if np is None:
+                return [[table[gid] for gid in row] for row in gids]
+            gids = np.asarray(gids)
+        return np.array(table, dtype=np.intp)[gids]
 
     @property
     def objectgroups(self):
@@ -652,10 +1590,11 @@ class TiledMap(TiledElement):
         Used to manage the mapping of GIDs between the tmx and pytmx
 
         :param tiled_gid: GID that is found in TMX data
+        :param flags: TileFlags of the tile; None or 0 means no flags
         :rtype: GID that pytmx uses for the the GID passed
         """
-        if flags is None:
-            flags = TileFlags(0, 0, 0)
+        if not flags:
+            flags = NO_FLAGS
 
         if tiled_gid:
             try:
@@ -664,7 +1603,11 @@ class TiledMap(TiledElement):
                 gid = self.maxgid
                 self.maxgid += 1
                 self.imagemap[(tiled_gid, flags)] = (gid, flags)
-                self.gidmap[tiled_gid].append((gid, flags))
+                variants = self.gidmap[tiled_gid]
+                # tilesets are parsed already if the gid is registered late
+                if variants and variants[0][0] in self.tile_properties:
+                    self.tile_properties[gid] = self.tile_properties[variants[0][0]]
+                variants.append((gid, flags))
                 self.tiledgidmap[gid] = tiled_gid
                 return gid
         else:
@@ -677,10 +1620,9 @@ class TiledMap(TiledElement):
         :param tiled_gid: GID that is found in TMX data
         :rtype: (GID, flags) for the the GID passed, None if not found
         """
+        # gidmap is a default dict, so cannot trust to raise KeyError
         try:
-            return self.gidmap[int(tiled_gid)]
-        except KeyError:
-            return None
+            return self.gidmap.get(int(tiled_gid))
         except TypeError:
             raise TypeError("GIDs must be an integer")
 
@@ -747,7 +1689,7 @@ class TiledTileset(TiledElement):
         self.width = 0
         self.height = 0
 
-        self.parse_xml(node)
+        self.parse(node)
 
     def parse_xml(self, node):
         """
@@ -782,16 +1724,12 @@ class TiledTileset(TiledElement):
         # Since tile objects [probably] don't have a lot of metadata,
         # we store it separately in the parent (a TiledMap instance)
         register_gid = self.parent.register_gid
-        for child in node.getiterator("tile"):
+        for child in node.iter("tile"):
             tiled_gid = int(child.get("id"))
 
             p = {k: DEFAULT_ORM.convert_value(k, v) for k, v in child.items()}
             p.update(parse_properties(child))
 
-            # images are listed as relative to the .tsx file, not the .tmx file:
-            if source:
-                p["path"] = os.path.join(os.path.dirname(source), p["path"])
-
             # handle tiles that have their own image
             image = child.find("image")
             if image is None:
@@ -799,6 +1737,9 @@ class TiledTileset(TiledElement):
                 p["height"] = self.tileheight
             else:
                 p["source"] = image.get("source")
+                # images are listed as relative to the .tsx file, not the .tmx file:
+                if source:
+                    p["source"] = os.path.join(os.path.dirname(source), p["source"])
                 p["trans"] = image.get("trans", None)
                 p["width"] = image.get("width")
                 p["height"] = image.get("height")
@@ -838,19 +1779,129 @@ class TiledTileset(TiledElement):
 
         return self
 
+    def parse_json(self, data):
+        """
+        Parse a Tileset from a Tiled JSON map's tileset object
 
-class TiledTileLayer(TiledElement):
-    """
-    Represents a TileLayer
+        External tilesets may be TSJ or TSX files; TSX files are handed to
+        parse_xml.
 
-    To just get the tile images, use TiledTileLayer.tiles()
-    """
+        :param data: dict from a Tiled JSON file
+        :return: self
+        """
+        source = data.get("source", None)
+        if source:
+            if source[-4:].lower() == ".tsx":
+                return self.parse_xml(et.Element("tileset", firstgid=str(data["firstgid"]), source=source))
+            if not source.lower().endswith(JSON_TILESET_EXTENSIONS):
+                raise Exception(f"Found external tileset, but cannot handle type: {source}")
+
+            # External tilesets don't save this, store it for later
+            self.firstgid = int(data["firstgid"])
+            dirname = os.path.dirname(self.parent.filename)
+            path = os.path.abspath(os.path.join(dirname, source))
+            try:
+                data = load_json(path)
+            except IOError:
+                raise Exception(f"Cannot load external tileset: {path}")
 
-    __slots__ = (
-        "parent",
-        "data",
-        "name",
-        "width",
+        def relative(path):
+            # images are listed as relative to the .tsj file, not the .tmj file
+            return os.path.join(os.path.dirname(source), path) if source else path
+
+        self.set_json_properties(data)
+        self.set_json_attributes(data)
+
+        register_gid = self.parent.register_gid
+        for tile in data.get("tiles", ()):
+            tiled_gid = int(tile["id"])
+
+            p = {k: DEFAULT_ORM.convert_value(k, v) for k, v in tile.items() if not isinstance(v, (dict, list))}
+            p.update(parse_json_properties(tile.get("properties", ())))
+
+            # handle tiles that have their own image
+            image = p.pop("image", None)
+            if image is None:
+                p["width"] = self.tilewidth
+                p["height"] = self.tileheight
+            else:
+                p["source"] = relative(image)
+                p["trans"] = json_color(p.pop("transparentcolor", None))
+                p["width"] = p.pop("imagewidth", None)
+                p["height"] = p.pop("imageheight", None)
+
+            # handle tiles with animations
+            p["frames"] = [
+                AnimationFrame(register_gid(int(frame["tileid"]) + self.firstgid), int(frame["duration"]))
+                for frame in tile.get("animation", ())
+            ]
+
+            for gid, flags in self.parent.map_gid2(tiled_gid + self.firstgid):
+                self.parent.set_tile_properties(gid, p)
+
+        offset = data.get("tileoffset")
+        self.offset = (0, 0) if offset is None else (offset.get("x", 0), offset.get("y", 0))
+
+        image = data.get("image")
+        if image:
+            self.source = relative(image)
+            self.trans = json_color(data.get("transparentcolor"))
+            self.width = int(data["imagewidth"])
+            self.height = int(data["imageheight"])
+
+        return self
+
+    def _tile_grid(self):
+        """Return ranges of the x and y pixel offsets of tiles in the image."""
+        xs = range(self.margin, self.width + self.margin - self.tilewidth + 1, self.tilewidth + self.spacing)
+        ys = range(self.margin, self.height + self.margin - self.tileheight + 1, self.tileheight + self.spacing)
+        return xs, ys
+
+    def iter_tile_rects(self):
+        """Iterate over the tiles of the tileset image
+
+        :rtype: Generator
+        :return: (tiled gid, (x, y, width, height)) tuples
+        """
+        xs, ys = self._tile_grid()
+        for real_gid, (y, x) in enumerate(product(ys, xs), self.firstgid):
+            yield real_gid, (x, y, self.tilewidth, self.tileheight)
+
+    def get_tile_rect(self, tiled_gid):
+        """Return the rect of a tile in the tileset image
+
+        :param tiled_gid: GID that is found in TMX data
+        :rtype: (x, y, width, height) if found, otherwise None
+        """
+        xs, ys = self._tile_grid()
+        index = tiled_gid - self.firstgid
+        if not xs or not 0 <= index < len(xs) * len(ys):
+            return None
+        y, x = divmod(index, len(xs))
+        return xs[x], ys[y], self.tilewidth, self.tileheight
+
+
+class TiledTileLayer(TiledElement):
+    """
+    Represents a TileLayer
+
+    To just get the tile images, use TiledTileLayer.tiles()
+
+    Layers of infinite maps are stored as chunks instead of one block of
+    data.  Only resident chunks, see load_chunks, have decoded tiles.
+    """
+
+    __slots__ = (
+        "parent",
+        "_data",
+        "_raw",
+        "chunks",
+        "_chunk_raw",
+        "chunk_width",
+        "chunk_height",
+        "gid_counts",
+        "name",
+        "width",
         "height",
         "opacity",
         "visible",
@@ -862,7 +1913,13 @@ class TiledTileLayer(TiledElement):
     def __init__(self, parent, node):
         super().__init__()
         self.parent = parent
-        self.data = []
+        self._data = []
+        self._raw = None  # encoded layer data that is not decoded yet
+        self.chunks = None  # (x, y) of resident chunks -> rows, if chunked
+        self._chunk_raw = None  # (x, y) of all chunks -> encoded chunk data
+        self.chunk_width = 0
+        self.chunk_height = 0
+        self.gid_counts = {}  # gid -> number of tiles, of resident chunks if chunked
 
         # defaults from the specification
         self.id = -1
@@ -874,13 +1931,46 @@ class TiledTileLayer(TiledElement):
         self.offsetx = 0
         self.offsety = 0
 
-        self.parse_xml(node)
+        self.parse(node)
 
     def __iter__(self):
         return self.iter_data()
 
+    @property
+    def data(self):
+        """Rows of pytmx gids; decoded on first access with lazy_layers.
+
+        Chunked layers have no rows, see chunks.
+        """
+        if self._raw is not None:
+            self.decode()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._raw = None
+        self._data = value
+        self.gid_counts = self._count_gids(value)
+
+    @property
+    def decoded(self):
+        """True if the layer data, or every chunk, has been decoded."""
+        if self.chunks is not None:
+            return len(self.chunks) == len(self._chunk_raw)
+        return self._raw is None
+
     def iter_data(self):
-        """Iterate over layer data yielding X, Y, GID tuples."""
+        """Iterate over layer data yielding X, Y, GID tuples.
+
+        For chunked layers only tiles of resident chunks are yielded.
+        """
+        if self.chunks is not None:
+            for cx, cy, rows in self.iter_chunks():
+                for y, row in enumerate(rows, cy):
+                    for x, gid in enumerate(row, cx):
+                        yield (x, y, gid)
+            return
+
         for y, row in enumerate(self.data):
             for x, gid in enumerate(row):
                 yield (x, y, gid)
@@ -898,30 +1988,286 @@ class TiledTileLayer(TiledElement):
         for x, y, gid in [i for i in self.iter_data() if i[2]]:
             yield x, y, images[gid]
 
+    def get_gid(self, x, y):
+        """Return the pytmx gid at a tile position
+
+        :param x: x coordinate in tiles
+        :param y: y coordinate in tiles
+        :rtype: int; 0 for chunks that are not resident
+        """
+        if self.chunks is None:
+            return self.data[y][x]
+
+        key = (x - x % self.chunk_width, y - y % self.chunk_height)
+        try:
+            rows = self.chunks[key]
+        except KeyError:
+            if key in self._chunk_raw:
+                return 0
+            raise IndexError(f"No chunk at ({x}, {y})")
+        return rows[y - key[1]][x - key[0]]
+
+    def set_gid(self, x, y, gid):
+        """Set the pytmx gid at a tile position
+
+        Use this rather than changing data directly, so gid_counts stays
+        correct.  Chunks that are not resident are loaded first.
+
+        :param x: x coordinate in tiles
+        :param y: y coordinate in tiles
+        :param gid: pytmx gid, for example from register_gid
+        :return: None
+        """
+        if self.chunks is None:
+            rows = self.data
+        else:
+            key = (x - x % self.chunk_width, y - y % self.chunk_height)
+            if key not in self._chunk_raw:
+                raise IndexError(f"No chunk at ({x}, {y})")
+            if key not in self.chunks:
+                self.load_chunks((x, y, 1, 1))
+            rows = self.chunks[key]
+            x, y = x - key[0], y - key[1]
+
+        old = int(rows[y][x])
+        rows[y][x] = gid
+        self._add_counts({old: -1, gid: 1})
+
+        # chunked layers are not in the gid index
+        if self.chunks is None and self.parent.gid_index is not None and old != gid:
+            self.parent._reindex_tile(self, y * self.width + x, old, gid)
+
+        if self.parent.images:
+            self.parent._load_tile_images((gid,))
+
+    def get_used_gids(self):
+        """Return the set of pytmx GIDs used in this layer, including 0."""
+        if self._raw is not None:
+            self.decode()
+        return set(self.gid_counts)
+
+    def _add_counts(self, counts):
+        """Add a gid -> count dict, negative to subtract, to gid_counts."""
+        gid_counts = self.gid_counts
+        for gid, count in counts.items():
+            total = gid_counts.get(gid, 0) + count
+            if total:
+                gid_counts[gid] = total
+            else:
+                gid_counts.pop(gid, None)
+
+    @staticmethod
+    def _count_gids(rows):
+        """Return a gid -> count dict of array or numpy rows."""
+        if np is not None and isinstance(rows, np.ndarray):
+            counts = np.bincount(rows.ravel())
+            gids = np.flatnonzero(counts)
+            return dict(zip(gids.tolist(), counts[gids].tolist()))
+        counts = Counter()
+        for row in rows:
+            counts.update(row)
+        return dict(counts)
+
+    def iter_chunks(self, rect=None):
+        """Iterate over resident chunks yielding X, Y, rows tuples
+
+        :param rect: (x, y, width, height) in tiles; all chunks if None
+        """
+        for (cx, cy), rows in self.chunks.items():
+            if rect is None or self._chunk_overlaps(cx, cy, rect):
+                yield cx, cy, rows
+
+    def _chunk_overlaps(self, cx, cy, rect):
+        """Return True if the chunk at (cx, cy) overlaps an x, y, w, h rect."""
+        x, y, w, h = rect
+        width, height = self._chunk_raw[(cx, cy)][3:]
+        return cx < x + w and x < cx + width and cy < y + h and y < cy + height
+
+    def load_chunks(self, rect=None):
+        """Decode the chunks that overlap a rect
+
+        If the map images are loaded already, images of the tiles these
+        chunks use are created as well.
+
+        :param rect: (x, y, width, height) in tiles; all chunks if None
+        :return: number of chunks decoded
+        """
+        if self.chunks is None:
+            return 0
+
+        gids = set()
+        count = 0
+        for key, (encoding, compression, payload, width, height) in self._chunk_raw.items():
+            if key in self.chunks or (rect is not None and not self._chunk_overlaps(*key, rect)):
+                continue
+            rows = self._decode_payload(encoding, compression, payload, width, height)
+            self.chunks[key] = rows
+            counts = self._count_gids(rows)
+            self._add_counts(counts)
+            gids.update(counts)
+            count += 1
+
+        # images are loaded, so the chunks are decoded after the map was parsed
+        if gids and self.parent.images:
+            self.parent._load_tile_images(gids)
+        return count
+
+    def evict_chunks(self, rect):
+        """Drop the decoded chunks that do not overlap a rect
+
+        Evicted chunks keep their encoded data and can be loaded again.
+
+        :param rect: (x, y, width, height) in tiles
+        :return: number of chunks evicted
+        """
+        if self.chunks is None:
+            return 0
+
+        evicted = [key for key in self.chunks if not self._chunk_overlaps(*key, rect)]
+        for key in evicted:
+            counts = self._count_gids(self.chunks.pop(key))
+            self._add_counts({gid: -count for gid, count in counts.items()})
+        return len(evicted)
+
     def parse_xml(self, node):
         """
         Parse a Tile Layer from ElementTree xml node
 
+        The encoded data is kept and decoded by decode(), right away unless
+        the map was loaded with lazy_layers.
+
         :param node: ElementTree xml node
         :return: self
         """
         self.set_properties(node)
         self.set_attributes(node.items(), orm=HW_ORM)
-        data = None
-        next_gid = None
         data_node = node.find("data")
         encoding = data_node.get("encoding", None)
+        compression = data_node.get("compression", None)
+
+        chunk_nodes = data_node.findall("chunk")
+        if chunk_nodes:
+            chunks = [
+                (
+                    int(chunk.get("x")),
+                    int(chunk.get("y")),
+                    int(chunk.get("width")),
+                    int(chunk.get("height")),
+                    self._get_payload(chunk, encoding),
+                )
+                for chunk in chunk_nodes
+            ]
+            self._keep_chunks(encoding, compression, chunks)
+        else:
+            self._raw = (encoding, compression, self._get_payload(data_node, encoding))
+
+        if not self.parent.lazy_layers:
+            self.decode()
+        return self
+
+    def parse_json(self, data):
+        """
+        Parse a Tile Layer from a Tiled JSON map's layer object
+
+        CSV data is a JSON array of gids, which is decoded like the tile
+        elements of TMX files.  Base64 data may be zlib or gzip compressed.
+
+        :param data: dict from a Tiled JSON file
+        :return: self
+        """
+        self.set_json_properties(data)
+        self.set_json_attributes(data, orm=HW_ORM)
+        encoding = data.get("encoding", "csv")
+        if encoding == "csv":
+            encoding = None
+        compression = data.get("compression") or None
+
+        chunks = data.get("chunks")
+        if chunks:
+            chunks = [(int(c["x"]), int(c["y"]), int(c["width"]), int(c["height"]), c["data"]) for c in chunks]
+            self._keep_chunks(encoding, compression, chunks)
+        else:
+            self._raw = (encoding, compression, data["data"])
+
+        if not self.parent.lazy_layers:
+            self.decode()
+        return self
+
+    def _keep_chunks(self, encoding, compression, chunks):
+        """Keep the encoded chunks of an infinite map layer for load_chunks
+
+        :param encoding: encoding of the layer data
+        :param compression: compression of the layer data, if any
+        :param chunks: iterable of (x, y, width, height, payload) tuples
+        """
+        self.chunks = {}
+        self._chunk_raw = {}
+        for x, y, width, height, payload in chunks:
+            self._chunk_raw[x, y] = (encoding, compression, payload, width, height)
+            self.chunk_width = max(self.chunk_width, width)
+            self.chunk_height = max(self.chunk_height, height)
+
+    @staticmethod
+    def _get_payload(node, encoding):
+        """Return the encoded text, or the gids of the tile elements, of a node."""
+        if encoding is None:
+            # a bunch of tile elements
+            # TODO: this will/should raise an exception if there are no tiles
+            return [int(child.get("gid")) for child in node.findall("tile")]
+        return node.text
+
+    def decode(self):
+        """
+        Decode the layer data kept by parse_xml and register its gids
+
+        Chunked layers decode all of their chunks.  If the map images are
+        loaded already, images of the tiles this layer uses are created as
+        well.
+
+        :return: self
+        """
+        if self.chunks is not None:
+            self.load_chunks()
+            return self
+
+        if self._raw is None:
+            return self
+
+        self.data = self._decode_payload(*self._raw, self.width, self.height)
+
+        # images are loaded, so this layer is decoded after the map was parsed
+        if self.parent.images:
+            self.parent._load_tile_images(self.get_used_gids())
+        return self
+
+    def _decode_payload(self, encoding, compression, payload, width, height):
+        """
+        Decode a block of layer data and register its gids
+
+        :param encoding: encoding of the data element; None for tile elements
+        :param compression: compression of the data element, if any
+        :param payload: encoded text, or list of gids of the tile elements
+        :param width: width of the block in tiles
+        :param height: height of the block in tiles
+        :return: tuple of array rows, or 2D numpy array, of pytmx gids
+        """
+        data = None
+        next_gid = None
+        use_numpy = self.parent.use_numpy
 
         if encoding == "base64":
-            data = b64decode(data_node.text.strip())
+            data = b64decode(payload.strip())
 
         elif encoding == "csv":
-            next_gid = map(int, "".join(line.strip() for line in data_node.text.strip()).split(","))
+            if use_numpy:
+                data = np.fromstring(payload, dtype=np.uint32, sep=",")
+            else:
+                # int() ignores the whitespace around each gid
+                next_gid = map(int, payload.split(","))
 
         elif encoding:
             raise Exception(f"TMX encoding type: {encoding} is not supported.")
 
-        compression = data_node.get("compression", None)
         if compression == "gzip":
             with gzip.GzipFile(fileobj=BytesIO(data)) as fh:
                 data = fh.read()
@@ -933,15 +2279,15 @@ class TiledTileLayer(TiledElement):
             raise Exception(f"TMX compression type: {compression} is not supported.")
 
         # If data is None, then it was not decoded or decompressed, so
-        # we assume here that it is going to be a bunch of tile elements
-        # TODO: this will/should raise an exception if there are no tiles
-        if encoding == next_gid is None:
+        # the payload is the list of gids of the tile elements
+        if encoding is None:
+            next_gid = iter(payload)
+            if use_numpy:
+                data = np.fromiter(next_gid, dtype=np.uint32, count=width * height)
 
-            def get_children(parent):
-                for child in parent.findall("tile"):
-                    yield int(child.get("gid"))
-
-            next_gid = get_children(data_node)
+        elif use_numpy:
+            if isinstance(data, bytes):
+                data = np.frombuffer(data, dtype="<u4")
 
         elif data:
             if isinstance(data, bytes):
@@ -951,13 +2297,37 @@ class TiledTileLayer(TiledElement):
             else:
                 raise Exception(f"Layer data not in expected format. Got: ({type(data)})")
 
-        init = lambda: [0] * self.width
+        if use_numpy:
+            return self._remap_gids(data, width, height)
+
+        init = lambda: [0] * width
         reg = self.parent.register_gid
 
-        self.data = tuple(array.array("L", init()) for i in range(self.height))
-        for (y, x) in product(range(self.height), range(self.width)):
-            self.data[y][x] = reg(*decode_gid(next(next_gid)))
-        return self
+        rows = tuple(array.array("L", init()) for i in range(height))
+        for (y, x) in product(range(height), range(width)):
+            rows[y][x] = reg(*decode_gid(next(next_gid)))
+        return rows
+
+    def _remap_gids(self, raw, width, height):
+        """Register the raw Tiled gids of a block of data and return pytmx gids
+
+        Flag bits are split off the whole block at once and packed with the
+        gid into a small key, so only the unique keys go through register_gid
+        and the block is remapped with a single lookup table.
+
+        :param raw: 1D numpy array of 32-bit gids from TMX layer data
+        :param width: width of the block in tiles
+        :param height: height of the block in tiles
+        :return: 2D numpy uint32 array of shape (height, width)
+        """
+        raw = raw[: width * height]
+        keys = (raw & GID_BITS) << 3 | raw >> GID_FLAGS_SHIFT
+        counts = np.bincount(keys)
+        lookup = np.zeros(len(counts), dtype=np.uint32)
+        reg = self.parent.register_gid
+        for key in np.flatnonzero(counts).tolist():
+            lookup[key] = reg(key >> 3, TILE_FLAGS[key & 7])
+        return lookup[keys].reshape(height, width)
 
 
 class TiledObjectGroup(TiledElement, MutableSequence):
@@ -979,7 +2349,7 @@ class TiledObjectGroup(TiledElement, MutableSequence):
     def __init__(self, parent, node):
         super().__init__()
         self.parent = parent
-        self.sequence_data = []
+        self.sequence_data = CompactObjects(parent) if parent.compact_objects else []
 
         # defaults from the specification
         self.name = None
@@ -990,7 +2360,7 @@ class TiledObjectGroup(TiledElement, MutableSequence):
         self.offsety = 0
         self.draworder = "topdown"
         self.id = -1
-        self.parse_xml(node)
+        self.parse(node)
 
     def __lt__(self, other):
         return self.sequence_data < self.__cast(other)
@@ -1105,6 +2475,18 @@ class TiledObjectGroup(TiledElement, MutableSequence):
         self.extend(TiledObject(self.parent, child) for child in node.findall("object"))
         return self
 
+    def parse_json(self, data):
+        """
+        Parse an Object Group from a Tiled JSON map's layer object
+
+        :param data: dict from a Tiled JSON file
+        :return: self
+        """
+        self.set_json_properties(data)
+        self.set_json_attributes(data)
+        self.extend(TiledObject(self.parent, obj) for obj in data.get("objects", ()))
+        return self
+
 
 class TiledObject(TiledElement):
     """
@@ -1126,11 +2508,15 @@ class TiledObject(TiledElement):
         "gid",
         "visible",
         "template",
+        "points",
+        "closed",
+        "extent_offset",
     )
 
     def __init__(self, parent, node):
         super().__init__()
         self.parent = parent
+        self.extent_offset = (0, 0)  # top left of the points, relative to x, y
 
         # Defaults from the specification
         self.id = 0
@@ -1145,14 +2531,25 @@ class TiledObject(TiledElement):
         self.visible = 1
         self.template = None
 
-        self.parse_xml(node)
+        self.parse(node)
 
     @property
     def image(self):
         if self.gid:
-            return self.parent.images[self.gid]
+            return self.parent.get_tile_image_by_gid(self.gid)
         return None
 
+    @property
+    def bounds(self):
+        """Return the (x, y, width, height) bounding box of the object
+
+        Polygon and polyline extents are included; rotation is not.
+
+        :rtype: tuple
+        """
+        offset_x, offset_y = self.extent_offset
+        return self.x + offset_x, self.y + offset_y, self.width, self.height
+
     def parse_xml(self, node):
         """
         Parse an Object from ElementTree xml node
@@ -1161,28 +2558,81 @@ class TiledObject(TiledElement):
         :return: self
         """
 
-        def read_points(text):
-            """Parse a text string of float tuples and return [(x,...),...]."""
-            return tuple(tuple(map(float, i.split(","))) for i in text.split())
-
-        self.set_properties(node)
+        template = self._apply_template(node.get("template"), parse_properties(node))
         self.set_attributes(node.items())
 
         # correctly handle "tile objects" (object with gid set)
         if self.gid:
             self.gid = self.parent.register_gid(self.gid)
 
-        points = None
         polygon = node.find("polygon")
+        polyline = node.find("polyline")
         if polygon is not None:
-            points = read_points(polygon.get("points"))
-            self.closed = True
+            self._set_points(read_points(polygon.get("points")), True)
+        elif polyline is not None:
+            self._set_points(read_points(polyline.get("points")), False)
+        elif template is not None and template.points:
+            self._set_points(template.points, template.closed)
 
-        polyline = node.find("polyline")
-        if polyline is not None:
-            points = read_points(polyline.get("points"))
-            self.closed = False
+        return self
+
+    def parse_json(self, data):
+        """
+        Parse an Object from a Tiled JSON object
 
+        :param data: dict from a Tiled JSON file
+        :return: self
+        """
+        template = self._apply_template(data.get("template"), parse_json_properties(data.get("properties", ())))
+        self.set_json_attributes(data)
+
+        # correctly handle "tile objects" (object with gid set)
+        if self.gid:
+            self.gid = self.parent.register_gid(self.gid)
+
+        points, closed = json_points(data)
+        if points is None and template is not None:
+            points, closed = template.points, template.closed
+        if points:
+            self._set_points(points, closed)
+
+        return self
+
+    def _apply_template(self, source, properties):
+        """Set the properties and the attributes an object gets from its template
+
+        Properties of the object are layered over the template's with a
+        ChainMap, so objects share the template's dict and changes only go
+        to the object's own layer.  Attributes of the object itself are set
+        afterwards and win over the template's.
+
+        :param source: template path from the map, or None
+        :param properties: dict of the object's own properties
+        :return: the TiledTemplate, or None
+        """
+        if not source:
+            self._apply_properties(properties)
+            return None
+
+        template = self.parent.get_template(source)
+        self._apply_properties(ChainMap(properties, template.properties))
+        self.set_attributes(template.attributes)
+        if template.gid:
+            firstgid = self.parent._tileset_sources.get(template.tileset_source)
+            if firstgid is None:
+                LOG.warning("Tileset %s of template %s is not used by the map", template.tileset_source, source)
+                self.gid = 0
+            else:
+                self.gid = template.gid - template.firstgid + firstgid
+        return template
+
+    def _set_points(self, points, closed):
+        """Set the points of a polygon or polyline, and the object size
+
+        :param points: ((x, y), ...) relative to the object position
+        :param closed: True for polygons, False for polylines
+        """
+        self.closed = closed
         if points:
             x1 = x2 = y1 = y2 = 0
             for x, y in points:
@@ -1196,10 +2646,388 @@ class TiledObject(TiledElement):
                     y2 = y
             self.width = abs(x1) + abs(x2)
             self.height = abs(y1) + abs(y2)
+            self.extent_offset = (x1, y1)
             self.points = tuple([(i[0] + self.x, i[1] + self.y) for i in points])
 
+
+class CompactObject:
+    """
+    View of one object of a CompactObjects store
+
+    Views read and write the columns of their store, so they have the
+    attributes of a TiledObject without holding any of them.  A view is
+    tied to a position: after objects are inserted or removed before it,
+    get the object from the group again.
+    """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __eq__(self, other):
+        return isinstance(other, CompactObject) and self.store is other.store and self.row == other.row
+
+    def __hash__(self):
+        return hash((id(self.store), self.row))
+
+    def __repr__(self):
+        return f'<TiledObject: "{self.name}">'
+
+    def __getattr__(self, item):
+        # Custom properties are attributes, as with TiledElement
+        try:
+            return self.store.properties[self.row][item]
+        except KeyError:
+            raise AttributeError(item)
+
+    @property
+    def parent(self):
+        return self.store.parent
+
+    @property
+    def properties(self):
+        """Properties of the object; objects without any get a dict on first use."""
+        return self.store.properties.setdefault(self.row, {})
+
+    @properties.setter
+    def properties(self, value):
+        self.store.properties[self.row] = value
+
+    @property
+    def extent_offset(self):
+        return 0, 0
+
+    @property
+    def image(self):
+        if self.gid:
+            return self.parent.get_tile_image_by_gid(self.gid)
+        return None
+
+    bounds = TiledObject.bounds
+
+
+def _column_property(name):
+    """Return a property for a numeric column of CompactObject views."""
+
+    def fget(self):
+        return self.store.columns[name][self.row]
+
+    def fset(self, value):
+        self.store.columns[name][self.row] = value
+
+    return property(fget, fset)
+
+
+def _string_property(name):
+    """Return a property for an interned string column of CompactObject views."""
+
+    def fget(self):
+        return self.store.strings[self.store.columns[name][self.row]]
+
+    def fset(self, value):
+        self.store.columns[name][self.row] = self.store.intern(value)
+
+    return property(fget, fset)
+
+
+class CompactObjects(MutableSequence):
+    """
+    Struct-of-arrays storage of the objects of a TiledObjectGroup
+
+    Numeric attributes are kept in parallel arrays, and names, types and
+    templates as indexes into a table of interned strings.  Properties are
+    only kept for objects that have any.  Items are CompactObject views.
+
+    Polygons and polylines keep their TiledObject, which is returned
+    instead of a view; their columns hold the values they were added with.
+
+    Use column() to filter objects without creating views.
+    """
+
+    NUMERIC_COLUMNS = (
+        ("id", "l"),
+        ("x", "d"),
+        ("y", "d"),
+        ("width", "d"),
+        ("height", "d"),
+        ("rotation", "d"),
+        ("gid", "L"),
+        ("visible", "b"),
+    )
+    STRING_COLUMNS = ("name", "type", "template")
+
+    def __init__(self, parent, objects=()):
+        self.parent = parent
+        self.columns = {name: array.array(code) for name, code in self.NUMERIC_COLUMNS}
+        for name in self.STRING_COLUMNS:
+            self.columns[name] = array.array("l")
+        self.strings = [None]  # index 0 stands for None
+        self._string_ids = {None: 0}
+        self.properties = {}  # row -> properties of objects that have any
+        self.shapes = {}  # row -> TiledObject of polygons and polylines
+        self.extend(objects)
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[row] for row in range(*i.indices(len(self)))]
+        row = self._normalize(i)
+        shape = self.shapes.get(row)
+        return CompactObject(self, row) if shape is None else shape
+
+    def __setitem__(self, i, obj):
+        self._put_row(self._normalize(i), self._get_row_of(obj))
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            for row in sorted(range(*i.indices(len(self))), reverse=True):
+                del self[row]
+            return
+        row = self._normalize(i)
+        for column in self.columns.values():
+            del column[row]
+        self.properties.pop(row, None)
+        self.shapes.pop(row, None)
+        self.properties = self._shift(self.properties, row, -1)
+        self.shapes = self._shift(self.shapes, row, -1)
+
+    def insert(self, i, obj):
+        row = min(max(i + len(self) if i < 0 else i, 0), len(self))
+        values = self._get_row_of(obj)
+        if row < len(self):
+            self.properties = self._shift(self.properties, row, 1)
+            self.shapes = self._shift(self.shapes, row, 1)
+        for column in self.columns.values():
+            column.insert(row, 0)
+        self._put_row(row, values)
+
+    def append(self, obj):
+        self.insert(len(self), obj)
+
+    def clear(self):
+        for column in self.columns.values():
+            del column[:]
+        self.properties.clear()
+        self.shapes.clear()
+
+    def reverse(self):
+        self._reorder(range(len(self) - 1, -1, -1))
+
+    def sort(self, key=None, reverse=False):
+        keys = [obj if key is None else key(obj) for obj in self]
+        self._reorder(sorted(range(len(self)), key=keys.__getitem__, reverse=reverse))
+
+    def intern(self, value):
+        """Return the index of a string in the string table, adding it if needed."""
+        try:
+            return self._string_ids[value]
+        except KeyError:
+            self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+            return self._string_ids[value]
+
+    def column(self, name):
+        """Return a column as a numpy array, or an array if numpy is missing
+
+        The numpy array shares memory with the column; it is only valid
+        until objects are added or removed.  String columns hold indexes into
+        strings, see intern.
+
+        :param name: attribute name, like "x" or "type"
+        """
+        column = self.columns[name]
+        if np is None:
+            return column
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode)
+
+    def _normalize(self, i):
+        length = len(self)
+        row = i + length if i < 0 else i
+        if not 0 <= row < length:
+            raise IndexError("object index out of range")
+        return row
+
+    def _get_row_of(self, obj):
+        """Return the column values, properties and shape of an object."""
+        values = {name: getattr(obj, name) for name, _ in self.NUMERIC_COLUMNS}
+        for name in self.STRING_COLUMNS:
+            values[name] = self.intern(getattr(obj, name))
+        if isinstance(obj, CompactObject):
+            properties = obj.store.properties.get(obj.row) or None
+        else:
+            properties = obj.properties or None
+        shape = obj if isinstance(obj, TiledObject) and hasattr(obj, "points") else None
+        return values, properties, shape
+
+    def _put_row(self, row, values):
+        values, properties, shape = values
+        columns = self.columns
+        for name, value in values.items():
+            columns[name][row] = value
+        for sparse, value in ((self.properties, properties), (self.shapes, shape)):
+            if value is None:
+                sparse.pop(row, None)
+            else:
+                sparse[row] = value
+
+    def _reorder(self, order):
+        rows = [self._get_row_of(obj) for obj in [self[row] for row in order]]
+        for row, values in enumerate(rows):
+            self._put_row(row, values)
+
+    @staticmethod
+    def _shift(sparse, start, step):
+        """Return a row -> value dict with the rows from start moved by step."""
+        return {row + step if row >= start else row: value for row, value in sparse.items()}
+
+
+for _name, _ in CompactObjects.NUMERIC_COLUMNS:
+    setattr(CompactObject, _name, _column_property(_name))
+for _name in CompactObjects.STRING_COLUMNS:
+    setattr(CompactObject, _name, _string_property(_name))
+
+
+class TiledTemplate:
+    """
+    An object template, from a .tx (XML) or .tj (JSON) file
+
+    Templates are shared by every object, and every map, that uses them;
+    treat them as read only.  Attributes are stored converted, and the gid
+    of tile objects is relative to the template's own tileset.
+    """
+
+    __slots__ = (
+        "source",
+        "attributes",
+        "properties",
+        "points",
+        "closed",
+        "gid",
+        "firstgid",
+        "tileset_source",
+    )
+
+    def __init__(self, source):
+        self.source = source
+        self.attributes = ()  # (name, value) pairs of the template object
+        self.properties = {}
+        self.points = None  # polygon or polyline points, relative to x, y
+        self.closed = None
+        self.gid = 0
+        self.firstgid = 0
+        self.tileset_source = None  # absolute path of the tileset of gid
+
+        if source.lower().endswith(".tx"):
+            self.parse_xml(et.parse(source).getroot())
+        else:
+            self.parse_json(load_json(source))
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: "{self.source}">'
+
+    def parse_xml(self, node):
+        """
+        Parse a template from ElementTree xml node
+
+        :param node: ElementTree xml node of the template element
+        :return: self
+        """
+        obj = node.find("object")
+        self.properties = parse_properties(obj)
+        converters = DEFAULT_ORM.get_converters()
+        self.attributes = tuple((k, converters.get(k, str)(v)) for k, v in obj.items())
+
+        for tag, closed in (("polygon", True), ("polyline", False)):
+            points = obj.find(tag)
+            if points is not None:
+                self.points, self.closed = read_points(points.get("points")), closed
+
+        tileset = node.find("tileset")
+        if tileset is not None:
+            self._set_tileset(tileset.attrib)
         return self
 
+    def parse_json(self, data):
+        """
+        Parse a template from a decoded Tiled JSON template
+
+        :param data: dict from a .tj file
+        :return: self
+        """
+        obj = data["object"]
+        self.properties = parse_json_properties(obj.get("properties", ()))
+        converters = DEFAULT_ORM.get_converters()
+        self.attributes = tuple(
+            (k, converters.get(k, str)(v)) for k, v in obj.items() if not isinstance(v, (dict, list))
+        )
+        self.points, self.closed = json_points(obj)
+
+        tileset = data.get("tileset")
+        if tileset is not None:
+            self._set_tileset(tileset)
+        return self
+
+    def _set_tileset(self, tileset):
+        """Move the gid out of the attributes; it needs the map's firstgid."""
+        attributes = dict(self.attributes)
+        self.gid = attributes.pop("gid", 0)
+        self.attributes = tuple(attributes.items())
+        self.firstgid = int(tileset["firstgid"])
+        self.tileset_source = os.path.abspath(os.path.join(os.path.dirname(self.source), tileset["source"]))
+
+
+class TemplateCache:
+    """
+    Process-wide cache of parsed object templates
+
+    Each template file is parsed once, and parsed again only when its
+    modification time or size changes.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # absolute path -> ((mtime, size), TiledTemplate)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path):
+        """Return the template of a file, parsing it if needed
+
+        :param path: absolute path of a .tx or .tj file
+        :rtype: TiledTemplate
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise Exception(f"Cannot load object template: {path}")
+
+        stat = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == stat:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        template = TiledTemplate(path)
+        self._entries[path] = (stat, template)
+        return template
+
+    def clear(self):
+        """Remove every template."""
+        self._entries.clear()
+
+
+TEMPLATE_CACHE = TemplateCache()
+
 
 class TiledImageLayer(TiledElement):
     """
@@ -1230,12 +3058,12 @@ class TiledImageLayer(TiledElement):
         self.opacity = 1
         self.visible = 1
 
-        self.parse_xml(node)
+        self.parse(node)
 
     @property
     def image(self):
         if self.gid:
-            return self.parent.images[self.gid]
+            return self.parent.get_tile_image_by_gid(self.gid)
         return None
 
     def parse_xml(self, node):
@@ -1254,6 +3082,18 @@ class TiledImageLayer(TiledElement):
         self.trans = image_node.get("trans", None)
         return self
 
+    def parse_json(self, data):
+        """Parse an Image Layer from a Tiled JSON map's layer object
+
+        :param data: dict from a Tiled JSON file
+        :return: self
+        """
+        self.set_json_properties(data)
+        self.set_json_attributes(data)
+        self.source = data.get("image") or None
+        self.trans = json_color(data.get("transparentcolor"))
+        return self
+
 
 class TiledProperty(TiledElement):
     """Represents Tiled Property."""
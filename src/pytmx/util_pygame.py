@@ -19,7 +19,13 @@ along with pytmx.  If not, see <http://www.gnu.org/licenses/>.
 """
 # Standard
 import logging
-from itertools import product
+import os
+import weakref
+from collections import OrderedDict
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+from typing import NamedTuple
 
 # Third Party
 from pygame.transform import flip, rotate
@@ -29,49 +35,278 @@ from pygame import (
     mask as pygame_mask,
     Rect as pygame_Rect,
     RLEACCEL as pygame_RLEACCEL,
+    SRCALPHA as pygame_SRCALPHA,
+    Surface as pygame_Surface,
 )
 
+try:
+    import numpy as np
+    from pygame import surfarray
+except ImportError:
+    np = None
+
 # Project
 from .pytmx import TiledMap
 
 
 LOG = logging.getLogger(__name__)
-__all__ = ("load_pygame", "pygame_image_loader", "simplify", "build_rects")
+__all__ = (
+    "load_pygame",
+    "pygame_image_loader",
+    "simplify",
+    "build_rects",
+    "greedy_rects",
+    "SurfaceCache",
+    "AtlasTile",
+    "HeadlessTile",
+    "convert_images",
+    "TILE_CACHE",
+    "TILE_OPAQUE",
+    "TILE_COLORKEY",
+    "TILE_ALPHA",
+)
+
+# transparency classes of tiles, which pick the conversion smart_convert does
+TILE_OPAQUE = "opaque"
+TILE_COLORKEY = "colorkey"
+TILE_ALPHA = "alpha"
+
+# pixels with this alpha or less count as transparent
+ALPHA_THRESHOLD = 127
 
 
-def smart_convert(original, colorkey, pixelalpha):
+class AtlasTile(NamedTuple):
+    """Image of a tile loaded in atlas mode: an area of a converted sheet
+
+    Blit it with ``surface.blit(tile.surface, position, tile.area)``.
     """
-    this method does several tests on a surface to determine the optimal
-    flags and pixel format for each tile surface.
 
-    this is done for the best rendering speeds and removes the need to
-    convert() the images on your own
+    surface: pygame_Surface
+    area: pygame_Rect
+
+
+class HeadlessTile(NamedTuple):
+    """Image of a tile loaded with headless=True: decoded, but not converted
+
+    The fields are the arguments of smart_convert; see convert_images.
     """
-    tile_size = original.get_size()
-    threshold = 127  # the default
 
+    surface: pygame_Surface
+    colorkey: pygame_Color
+    pixelalpha: bool
+    transparency: str
+
+
+class SurfaceCache:
+    """
+    Process-wide cache of decoded tileset images and converted tile surfaces
+
+    Maps that use the same tileset share the same tile Surface objects, so
+    moving between maps does not decode and convert the same PNG again.
+
+    Entries are reference counted per TiledMap: a map holds a reference to
+    every entry it used until it is garbage collected.  When the cache grows
+    past max_bytes, the least recently used entries that no map references
+    are evicted.
+
+    Cached surfaces are shared; draw on a copy rather than on a tile.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> [value, reference count, size]
+        self._owners = weakref.WeakKeyDictionary()  # owner -> set of keys
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, factory, owner=None):
+        """Return the cached value for a key, creating it with factory if needed
+
+        :param key: hashable cache key
+        :param factory: callable that creates the value
+        :param owner: object that holds a reference until it is collected
+        :return: the cached value
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            value = factory()
+            entry = self._entries[key] = [value, 0, surface_bytes(value)]
+            self.nbytes += entry[2]
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        if owner is not None:
+            keys = self._owners.get(owner)
+            if keys is None:
+                keys = self._owners[owner] = set()
+                weakref.finalize(owner, self.release, keys)
+            if key not in keys:
+                keys.add(key)
+                entry[1] += 1
+
+        self.evict()
+        return entry[0]
+
+    def release(self, keys):
+        """Drop one reference to each key, then evict if over budget."""
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > 0:
+                entry[1] -= 1
+        self.evict()
+
+    def evict(self):
+        """Evict unreferenced entries, oldest first, until within budget."""
+        if self.nbytes <= self.max_bytes:
+            return
+        for key in [k for k, entry in self._entries.items() if not entry[1]]:
+            self.nbytes -= self._entries.pop(key)[2]
+            if self.nbytes <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Remove every entry, i.e. after the display format has changed."""
+        self._entries.clear()
+        self._owners = weakref.WeakKeyDictionary()
+        self.nbytes = 0
+
+
+def surface_bytes(surface):
+    """Return the size of a surface's pixel buffer in bytes."""
+    try:
+        return surface.get_pitch() * surface.get_height()
+    except AttributeError:
+        return 0
+
+
+TILE_CACHE = SurfaceCache()
+
+
+def tile_class(transparent, colorkey, pixelalpha):
+    """Return the transparency class of a tile
+
+    :param transparent: True if the tile has transparent pixels
+    :param colorkey: colorkey of the tileset image, if any
+    :param pixelalpha: True to keep per-pixel alpha
+    :return: TILE_OPAQUE, TILE_COLORKEY or TILE_ALPHA
+    """
+    # there are transparent pixels, and tiled set a colorkey
+    if transparent and colorkey:
+        return TILE_COLORKEY
+
+    # there are transparent pixels, and set for perpixel alpha
+    if transparent and pixelalpha:
+        return TILE_ALPHA
+
+    # there are no transparent pixels, or we won't handle them
+    return TILE_OPAQUE
+
+
+def transparent_pixels(image, colorkey):
+    """
+    Return which pixels of an image are transparent
+
+    The alpha plane, and the colors if there is a colorkey, are read in one
+    pass over the whole image, through views of the pixels where pygame
+    allows it, so nothing but the result is copied.
+
+    :param image: pygame Surface of a tileset image
+    :param colorkey: pygame Color that is transparent, or None
+    :return: 2D numpy bool array, indexed [x, y]
+    """
+    if image.get_flags() & pygame_SRCALPHA:
+        # the view locks the image only until the comparison is done
+        transparent = surfarray.pixels_alpha(image) <= ALPHA_THRESHOLD
+    else:
+        transparent = surfarray.array_alpha(image) <= ALPHA_THRESHOLD
+    if colorkey:
+        try:
+            colors = surfarray.pixels3d(image)
+        except ValueError:
+            # palette images have no pixel view
+            colors = surfarray.array3d(image)
+        transparent |= (colors == tuple(colorkey)[:3]).all(axis=2)
+        del colors
+    return transparent
+
+
+def transparent_tiles(transparent, origin, size, step):
+    """
+    Return which tiles of a grid over an image have transparent pixels
+
+    The tiles are reduced together by reshaping the image into the grid, so
+    classifying every tile of a tileset is one NumPy operation.
+
+    :param transparent: 2D numpy bool array from transparent_pixels
+    :param origin: (x, y) of the first tile in pixels
+    :param size: (width, height) of a tile in pixels
+    :param step: (x, y) distance between tiles, the tile size plus spacing
+    :return: 2D numpy bool array, indexed [column, row]
+    """
+    x, y = origin
+    width, height = size
+    step_x, step_y = step
+    columns = max(0, (transparent.shape[0] - x - width) // step_x + 1)
+    rows = max(0, (transparent.shape[1] - y - height) // step_y + 1)
+    region = transparent[x : x + columns * step_x, y : y + rows * step_y]
+    if region.shape != (columns * step_x, rows * step_y):
+        # the spacing after the last tile may be cut off by the image edge
+        padded = np.zeros((columns * step_x, rows * step_y), dtype=bool)
+        padded[: region.shape[0], : region.shape[1]] = region
+        region = padded
+    return region.reshape(columns, step_x, rows, step_y)[:, :width, :, :height].any(axis=(1, 3))
+
+
+def surface_class(original, colorkey, pixelalpha):
+    """Return the transparency class of a tile by testing it with a pygame mask
+
+    :param original: pygame Surface of the tile
+    :param colorkey: pygame Color that is transparent, or None
+    :param pixelalpha: True to keep per-pixel alpha
+    :return: TILE_OPAQUE, TILE_COLORKEY or TILE_ALPHA
+    """
+    tile_size = original.get_size()
     try:
         # count the number of pixels in the tile that are not transparent
-        px = pygame_mask.from_surface(original, threshold).count()
+        mask = pygame_mask.from_surface(original, ALPHA_THRESHOLD)
+        if colorkey:
+            mask.erase(pygame_mask.from_threshold(original, colorkey, (1, 1, 1, 255)), (0, 0))
+        px = mask.count()
     except:
         # pygame_sdl2 will fail because the mask module is not included
-        # in this case, just convert_alpha and return it
-        return original.convert_alpha()
+        # in this case, just convert_alpha
+        return TILE_ALPHA
+    return tile_class(px < tile_size[0] * tile_size[1], colorkey, pixelalpha)
 
-    # there are no transparent pixels in the image
-    if px == tile_size[0] * tile_size[1]:
-        tile = original.convert()
 
-    # there are transparent pixels, and tiled set a colorkey
-    elif colorkey:
+def smart_convert(original, colorkey, pixelalpha, transparency=None):
+    """
+    this method does several tests on a surface to determine the optimal
+    flags and pixel format for each tile surface.
+
+    this is done for the best rendering speeds and removes the need to
+    convert() the images on your own
+
+    a transparency class from tile_class skips the tests; pygame_image_loader
+    classifies the tiles of a tileset image in one pass instead.
+    """
+    if transparency is None:
+        transparency = surface_class(original, colorkey, pixelalpha)
+
+    if transparency == TILE_COLORKEY:
         tile = original.convert()
         tile.set_colorkey(colorkey, pygame_RLEACCEL)
-
-    # there are transparent pixels, and set for perpixel alpha
-    elif pixelalpha:
+    elif transparency == TILE_ALPHA:
         tile = original.convert_alpha()
-
-    # there are transparent pixels, and we won't handle them
     else:
         tile = original.convert()
 
@@ -81,26 +316,116 @@ def smart_convert(original, colorkey, pixelalpha):
 def pygame_image_loader(filename, colorkey, **kwargs):
     """pytmx image loader for pygame
 
+    Decoded images and converted tiles are shared through a SurfaceCache,
+    TILE_CACHE unless a 'cache' keyword argument is passed.  Passing
+    cache=None disables sharing.
+
+    The returned loader has a 'prefetch' function that decodes the image
+    without touching the display, so TiledMap can call it from a thread pool.
+
+    With NumPy, the transparency of every tile of the image is found in one
+    pass over the image, and one reduction over its tile grid (see
+    transparent_pixels and transparent_tiles).  The classes are kept in
+    the tile_transparency of the TiledMap, which the compiled map cache
+    stores, so maps loaded from the cache skip the analysis.
+
+    With atlas=True, tiles are returned as AtlasTile handles into the image
+    converted once per transparency class, rather than as a Surface each.
+    Flipped and rotated tiles are still converted one by one.
+
+    With headless=True, nothing is converted, so no display is needed:
+    tiles are returned as HeadlessTile with the decoded pixels, a
+    subsurface of the tileset image unless flipped or rotated.  Decoded
+    images are still shared through the cache, tiles are not.
+
     :param filename:
     :param colorkey:
     :param kwargs:
     :return:
     """
+    trans = colorkey
     if colorkey:
         colorkey = pygame_Color(f"#{colorkey}")
 
     pixelalpha = kwargs.get("pixelalpha", True)
-    image = pygame_image.load(filename)
-
-    def load_image(rect=None, flags=None):
+    cache = kwargs.get("cache", TILE_CACHE)
+    owner = kwargs.get("tiledmap")
+    spacing = getattr(kwargs.get("tileset"), "spacing", 0)
+    atlas = kwargs.get("atlas", False)
+    headless = kwargs.get("headless", False)
+    image = None
+    decoded = None
+    transparent = None
+    grids = {}  # (origin, size) of a tile grid -> transparent_tiles of it
+
+    # transparency classes of the tiles of this image, by rect
+    classes = None
+    if owner is not None and owner.filename:
+        relpath = os.path.relpath(os.path.abspath(filename), os.path.dirname(os.path.abspath(owner.filename)))
+        classes = owner.tile_transparency.setdefault((relpath, trans, pixelalpha), {})
+
+    if cache is not None:
+        path = os.path.abspath(filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        cache_key = (path, mtime, tuple(colorkey) if colorkey else None, pixelalpha)
+
+    def decode():
+        return pygame_image.load(filename) if decoded is None else decoded
+
+    def prefetch():
+        # runs in a worker thread: only read and decode, the cache and any
+        # conversion are left to the thread that calls the loader
+        nonlocal decoded
+        if image is None and decoded is None and (cache is None or cache_key[:2] not in cache):
+            decoded = pygame_image.load(filename)
+
+    def get_image():
+        nonlocal image, decoded
+        if image is None:
+            if cache is None:
+                image = decode()
+            else:
+                image = cache.get(cache_key[:2], decode, owner)
+            decoded = None
+        return image
+
+    def classify(rect):
+        nonlocal transparent
+        key = tuple(rect) if rect else None
+        transparency = classes.get(key) if classes is not None else None
+        if transparency is None and np is not None:
+            if transparent is None:
+                transparent = transparent_pixels(get_image(), colorkey)
+            x, y, width, height = rect or (0, 0, *get_image().get_size())
+            step = (width + spacing, height + spacing)
+            grid_key = ((x % step[0], y % step[1]), (width, height))
+            grid = grids.get(grid_key)
+            if grid is None:
+                grid = grids[grid_key] = transparent_tiles(transparent, *grid_key, step)
+            column, row = x // step[0], y // step[1]
+            if column < grid.shape[0] and row < grid.shape[1]:
+                found = grid[column, row]
+            else:
+                # the tile is not inside the image; make_tile reports it
+                found = transparent[x : x + width, y : y + height].any()
+            transparency = tile_class(found, colorkey, pixelalpha)
+            if classes is not None:
+                classes[key] = transparency
+        return transparency
+
+    def make_tile(rect, flags):
+        transparency = classify(rect)
         if rect:
             try:
-                tile = image.subsurface(rect)
+                tile = get_image().subsurface(rect)
             except ValueError:
                 LOG.error("Tile bounds outside bounds of tileset image")
                 raise
         else:
-            tile = image.copy()
+            tile = get_image().copy()
 
         if flags:
             if flags.flipped_diagonally:
@@ -108,9 +433,51 @@ def pygame_image_loader(filename, colorkey, **kwargs):
             if flags.flipped_horizontally or flags.flipped_vertically:
                 tile = flip(tile, flags.flipped_horizontally, flags.flipped_vertically)
 
-        tile = smart_convert(tile, colorkey, pixelalpha)
-        return tile
+        if headless:
+            return HeadlessTile(tile, colorkey, pixelalpha, transparency)
+        return smart_convert(tile, colorkey, pixelalpha, transparency)
+
+    # the image converted for each transparency class, used in atlas mode
+    sheets = {}
+
+    def get_sheet(transparency):
+        sheet = sheets.get(transparency)
+        if sheet is None:
+            if cache is None:
+                sheet = smart_convert(get_image(), colorkey, pixelalpha, transparency)
+            else:
+                key = cache_key + ("atlas", transparency)
+                sheet = cache.get(key, lambda: smart_convert(get_image(), colorkey, pixelalpha, transparency), owner)
+            sheets[transparency] = sheet
+        return sheet
+
+    def atlas_tile(rect):
+        area = pygame_Rect(rect) if rect else get_image().get_rect()
+        if not get_image().get_rect().contains(area):
+            LOG.error("Tile bounds outside bounds of tileset image")
+            raise ValueError(f"Tile {tuple(area)} outside of {filename}")
+        transparency = classify(rect)
+        if transparency is None:
+            transparency = surface_class(get_image().subsurface(area), colorkey, pixelalpha)
+        return AtlasTile(get_sheet(transparency), area)
 
+    def load_image(rect=None, flags=None):
+        if headless:
+            return make_tile(rect, flags)
+        if atlas:
+            if not (flags and any(flags)):
+                return atlas_tile(rect)
+            tile = load_tile(rect, flags)
+            return AtlasTile(tile, tile.get_rect())
+        return load_tile(rect, flags)
+
+    def load_tile(rect, flags):
+        if cache is None:
+            return make_tile(rect, flags)
+        key = cache_key + (tuple(rect) if rect else None, flags)
+        return cache.get(key, lambda: make_tile(rect, flags), owner)
+
+    load_image.prefetch = prefetch
     return load_image
 
 
@@ -129,14 +496,49 @@ def load_pygame(filename, *args, **kwargs):
     transparency set in Tiled, the util_pygam will return images that have their
     transparency already set.
 
+    tiles are shared with other maps through TILE_CACHE.  pass a SurfaceCache
+    as 'tile_cache' to use another cache, or None to disable sharing.
+
+    pass atlas=True to load tiles as AtlasTile handles, (surface, area) pairs
+    that share a few converted tileset images instead of a Surface per tile.
+    pyscroll's renderer blits them with area rects.
+
+    pass headless=True to load the map without a display, i.e. for tooling
+    or with SDL's dummy video driver.  tiles are HeadlessTiles until
+    convert_images is called, once a display mode is set.
+
     TL;DR:
     Don't attempt to convert() or convert_alpha() the individual tiles.  It is
     already done for you.
     """
-    kwargs["image_loader"] = pygame_image_loader
+    tile_cache = kwargs.pop("tile_cache", TILE_CACHE)
+    atlas = kwargs.setdefault("atlas", False)
+    headless = kwargs.pop("headless", False)
+    if tile_cache is TILE_CACHE and not atlas and not headless:
+        kwargs["image_loader"] = pygame_image_loader
+    else:
+        kwargs["image_loader"] = partial(pygame_image_loader, cache=tile_cache, atlas=atlas, headless=headless)
     return TiledMap(filename, *args, **kwargs)
 
 
+def convert_images(tmxmap):
+    """Convert the HeadlessTiles of a map loaded with headless=True
+
+    The tiles are converted in one pass, with the transparency classes
+    found while loading.  Tiles created later, i.e. lazy tiles, are
+    converted as they are loaded.  A display mode must be set.
+
+    :param tmxmap: TiledMap loaded by load_pygame
+    :return: None
+    """
+    tmxmap.images = [smart_convert(*i) if isinstance(i, HeadlessTile) else i for i in tmxmap.images]
+
+    loader = tmxmap.image_loader
+    if isinstance(loader, partial) and loader.keywords.get("headless"):
+        tmxmap.image_loader = partial(loader.func, *loader.args, **dict(loader.keywords, headless=False))
+        tmxmap._tile_loaders = {}
+
+
 def build_rects(tmxmap, layer, tileset=None, real_gid=None):
     """generate a set of non-overlapping rects that represents the distribution
        of the specified gid.
@@ -172,11 +574,11 @@ def build_rects(tmxmap, layer, tileset=None, real_gid=None):
     if real_gid:
         try:
             gid, flags = tmxmap.map_gid(real_gid)[0]
-        except IndexError:
+        except (IndexError, TypeError):
             raise ValueError(f"GID #{real_gid} not found")
 
     if isinstance(layer, int):
-        layer_data = tmxmap.get_layer_data(layer)
+        layer_data = tmxmap.layers[layer].data
     elif isinstance(layer, str):
         try:
             layer = [l for l in tmxmap.layers if l.name == layer].pop()
@@ -184,25 +586,89 @@ def build_rects(tmxmap, layer, tileset=None, real_gid=None):
         except IndexError:
             raise ValueError(f"Layer '{layer}' not found in map {tmxmap}")
 
-    p = product(range(tmxmap.width), range(tmxmap.height))
+    return greedy_rects(occupancy_grid(layer_data, gid), tmxmap.tilewidth, tmxmap.tileheight)
+
+
+def occupancy_grid(layer_data, gid=None):
+    """Return which tiles of layer data are set, or are the given gid
+
+    :param layer_data: rows of pytmx gids, as stored by TiledTileLayer
+    :param gid: pytmx gid to look for; None for any tile
+    :return: 2D bool numpy array, or list of lists without NumPy; indexed [y][x]
+    """
+    if np is not None:
+        data = np.asarray(layer_data)
+        return data == gid if gid else data != 0
     if gid:
-        points = [(x, y) for (x, y) in p if layer_data[y][x] == gid]
-    else:
-        points = [(x, y) for (x, y) in p if layer_data[y][x]]
+        return [[i == gid for i in row] for row in layer_data]
+    return [[bool(i) for i in row] for row in layer_data]
 
-    rects = simplify(points, tmxmap.tilewidth, tmxmap.tileheight)
+
+def row_spans(grid):
+    """Yield (y, x1, x2) for each run of set tiles, row by row
+
+    x2 is exclusive.  The runs of the whole grid are found in one NumPy pass.
+
+    :param grid: occupancy grid from occupancy_grid
+    """
+    if np is not None:
+        grid = np.asarray(grid, dtype=bool)
+        if not grid.size:
+            return
+        padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = grid
+        edges = np.diff(padded, axis=1)
+        starts_y, starts_x = np.nonzero(edges == 1)
+        ends_x = np.nonzero(edges == -1)[1]
+        yield from zip(starts_y.tolist(), starts_x.tolist(), ends_x.tolist())
+        return
+
+    for y, row in enumerate(grid):
+        x = 0
+        for value, run in groupby(row):
+            width = len(list(run))
+            if value:
+                yield y, x, x + width
+            x += width
+
+
+def greedy_rects(grid, tilewidth, tileheight):
+    """Return non-overlapping rects that cover the set tiles of a grid
+
+    Runs of set tiles are found row by row, and a run that spans the same
+    columns as a run in the row above extends that rect downwards.  Each
+    tile is visited once, so this is linear in the size of the grid.
+
+    :param grid: occupancy grid, indexed [y][x]; see occupancy_grid
+    :param tilewidth: pixel width of a tile
+    :param tileheight: pixel height of a tile
+    :return: List of pygame Rect objects, in pixels
+    """
+    rects = []
+    open_rects = {}  # (x1, x2) -> top row of a rect that may still grow down
+    previous = None
+
+    def close(span, bottom):
+        top = open_rects.pop(span)
+        x1, x2 = span
+        rects.append(pygame_Rect(x1 * tilewidth, top * tileheight, (x2 - x1) * tilewidth, (bottom - top) * tileheight))
+
+    for y, runs in groupby(row_spans(grid), itemgetter(0)):
+        spans = dict.fromkeys((x1, x2) for _, x1, x2 in runs)
+        continued = previous is not None and y == previous + 1
+        for span in [i for i in open_rects if not continued or i not in spans]:
+            close(span, previous + 1)
+        for span in spans:
+            open_rects.setdefault(span, y)
+        previous = y
+
+    for span in list(open_rects):
+        close(span, previous + 1)
     return rects
 
 
 def simplify(all_points, tilewidth, tileheight):
     """Given a list of points, return list of rects that represent them
-    kludge:
-
-    "A kludge (or kluge) is a workaround, a quick-and-dirty solution,
-    a clumsy or inelegant, yet effective, solution to a problem, typically
-    using parts that are cobbled together."
-
-    -- wikipedia
 
     turn a list of points into a rects
     adjacent rects will be combined.
@@ -230,51 +696,25 @@ def simplify(all_points, tilewidth, tileheight):
         ..............
         ....##########
 
-        pretty cool, right?
-
+    The points are put on an occupancy grid and merged with greedy_rects.
     There may be cases where the number of rectangles is not as low as
-    possible, but I haven't found that it is excessively bad. Certainly much
-    better than making a list of rects, one for each tile on the map!
-    """
-
-    def pick_rect(points, rects):
-        ox, oy = sorted([(sum(p), p) for p in points])[0][1]
-        x = ox
-        y = oy
-        ex = None
-
-        while 1:
-            x += 1
-            if not (x, y) in points:
-                if ex is None:
-                    ex = x - 1
-
-                if (ox, y + 1) in points:
-                    if x == ex + 1:
-                        y += 1
-                        x = ox
-
-                    else:
-                        y -= 1
-                        break
-                else:
-                    if x <= ex:
-                        y -= 1
-                    break
-
-        c_rect = pygame_Rect(ox * tilewidth, oy * tileheight, (ex - ox + 1) * tilewidth, (y - oy + 1) * tileheight)
+    possible, but it is much better than one rect for each tile of the map.
 
-        rects.append(c_rect)
-
-        rect = pygame_Rect(ox, oy, ex - ox + 1, y - oy + 1)
-        kill = [p for p in points if rect.collidepoint(p)]
-        [points.remove(i) for i in kill]
-
-        if points:
-            pick_rect(points, rects)
-
-    rect_list = []
-    while all_points:
-        pick_rect(all_points, rect_list)
-
-    return rect_list
+    :param all_points: (x, y) tile positions; must not be negative
+    :param tilewidth: pixel width of a tile
+    :param tileheight: pixel height of a tile
+    :return: List of pygame Rect objects, in pixels
+    """
+    if not all_points:
+        return []
+    width = max(x for x, y in all_points) + 1
+    height = max(y for x, y in all_points) + 1
+    if np is not None:
+        grid = np.zeros((height, width), dtype=bool)
+        xs, ys = zip(*all_points)
+        grid[list(ys), list(xs)] = True
+    else:
+        grid = [[False] * width for _ in range(height)]
+        for x, y in all_points:
+            grid[y][x] = True
+    return greedy_rects(grid, tilewidth, tileheight)
@@ -0,0 +1,122 @@
+# Standard
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+# Project
+from pytmx import TiledMap, TiledTileLayer, cache
+
+MAP_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="3" height="2"
+     tilewidth="16" tileheight="16" infinite="0">
+ <properties>
+  <property name="music" value="title_theme.ogg"/>
+ </properties>
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16" tilecount="4" columns="2">
+  <image source="tiles.png" width="32" height="32"/>
+ </tileset>
+ <layer id="1" name="ground" width="3" height="2">
+  <data encoding="csv">1,2,3,4,1,2147483650</data>
+ </layer>
+ <objectgroup id="2" name="objects">
+  <object id="1" name="start_point" x="16" y="16" width="16" height="16"/>
+ </objectgroup>
+</map>
+"""
+
+
+class TestMapCache(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.folder, "cache")
+        self.map_path = os.path.join(self.folder, "test.tmx")
+        self.image_path = os.path.join(self.folder, "tiles.png")
+        with open(self.map_path, "w") as f:
+            f.write(MAP_XML)
+        with open(self.image_path, "wb") as f:
+            f.write(b"not really a png")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, **kwargs):
+        return TiledMap(self.map_path, use_cache=True, cache_dir=self.cache_dir, **kwargs)
+
+    def test_round_trip(self):
+        """A map loaded from the cache matches the parsed map."""
+        parsed = self.load()
+        self.assertTrue(os.path.exists(cache.cache_path(parsed)))
+        cached = self.load()
+        self.assertTrue(cache.load_cached_map(cached))
+        self.assertEqual(parsed.maxgid, cached.maxgid)
+        self.assertEqual(dict(parsed.gidmap), dict(cached.gidmap))
+        self.assertEqual(parsed.properties, cached.properties)
+        self.assertEqual([o.name for o in parsed.objects], [o.name for o in cached.objects])
+        for parsed_layer, cached_layer in zip(parsed.layers, cached.layers):
+            self.assertIs(cached_layer.parent, cached)
+            if isinstance(parsed_layer, TiledTileLayer):
+                self.assertEqual(list(parsed_layer.iter_data()), list(cached_layer.iter_data()))
+
+    def test_compact_objects(self):
+        """Compact object stores round trip through the cache."""
+        parsed = self.load(compact_objects=True)
+        cached = self.load(compact_objects=True)
+        self.assertTrue(cache.load_cached_map(cached))
+        obj = next(cached.objects)
+        self.assertIs(obj.parent, cached)
+        self.assertEqual((obj.name, obj.x, obj.y), ("start_point", 16, 16))
+        self.assertNotEqual(cache.cache_path(parsed), cache.cache_path(self.load()))
+
+    def test_map_change_invalidates(self):
+        """Editing the TMX file makes the cache stale."""
+        tmxmap = self.load()
+        with open(self.map_path, "a") as f:
+            f.write("\n")
+        self.assertFalse(cache.load_cached_map(tmxmap))
+
+    def test_dependency_change_invalidates(self):
+        """Changing a referenced image makes the cache stale."""
+        tmxmap = self.load()
+        self.assertEqual([dep[0] for dep in cache.map_dependencies(tmxmap)], [self.image_path])
+        self.assertTrue(cache.load_cached_map(tmxmap))
+        with open(self.image_path, "ab") as f:
+            f.write(b"more bytes")
+        self.assertFalse(cache.load_cached_map(tmxmap))
+
+    def test_json_tileset_dependency(self):
+        """External tilesets of Tiled JSON maps are dependencies."""
+        tileset_path = os.path.join(self.folder, "tiles.tsj")
+        with open(tileset_path, "w") as f:
+            json.dump({"name": "tiles", "tilewidth": 16, "tileheight": 16, "tilecount": 0, "columns": 0}, f)
+        self.map_path = os.path.join(self.folder, "test.tmj")
+        with open(self.map_path, "w") as f:
+            json.dump({"width": 1, "height": 1, "tilesets": [{"firstgid": 1, "source": "tiles.tsj"}], "layers": []}, f)
+        tmxmap = self.load()
+        self.assertEqual([dep[0] for dep in cache.map_dependencies(tmxmap)], [tileset_path])
+        self.assertTrue(cache.load_cached_map(tmxmap))
+
+    def test_tsx_in_other_folder(self):
+        """Images of external tilesets are resolved against the TSX file's folder."""
+        os.makedirs(os.path.join(self.folder, "tilesets", "images"))
+        tileset_path = os.path.join(self.folder, "tilesets", "tiles.tsx")
+        image_path = os.path.join(self.folder, "tilesets", "images", "tiles.png")
+        with open(tileset_path, "w") as f:
+            f.write(
+                '<tileset name="tiles" tilewidth="16" tileheight="16" tilecount="4" columns="2">'
+                '<image source="images/tiles.png" width="32" height="32"/></tileset>'
+            )
+        with open(image_path, "wb") as f:
+            f.write(b"not really a png")
+        os.makedirs(os.path.join(self.folder, "maps"))
+        self.map_path = os.path.join(self.folder, "maps", "test.tmx")
+        with open(self.map_path, "w") as f:
+            f.write(MAP_XML.replace('name="tiles" tilewidth="16"', 'source="../tilesets/tiles.tsx" tilewidth="16"'))
+
+        tmxmap = self.load()
+        self.assertEqual([dep[0] for dep in cache.map_dependencies(tmxmap)], [image_path, tileset_path])
+        self.assertTrue(cache.load_cached_map(tmxmap))
+        with open(image_path, "ab") as f:
+            f.write(b"more bytes")
+        self.assertFalse(cache.load_cached_map(tmxmap))
@@ -23,3 +23,17 @@ class TestLib(TestCase):
         for value, expected in data:
             result = lib.convert_to_bool(value)
             self.assertEqual(result, expected, msg=f"Expected '{value}' to be '{expected}'")
+
+    def test_converter_tables(self):
+        """Converter tables are built per class and include inherited entries."""
+        converters = lib.HWIntORM.get_converters()
+        self.assertIs(converters, lib.HWIntORM.get_converters())
+        self.assertIs(converters["width"], int)
+        self.assertIs(converters["visible"], lib.convert_to_bool)
+        self.assertIs(lib.DefaultORM.get_converters()["width"], float)
+
+        # converters are plain functions from the class, not methods bound to the instance
+        orm = lib.DefaultORM()
+        self.assertIs(orm.convert_value("visible", "0"), False)
+        self.assertIs(orm.convert_value("infinite", "1"), True)
+        self.assertEqual(orm.convert_value("width", "3"), 3.0)
@@ -0,0 +1,1121 @@
+# Standard
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from unittest import TestCase, mock, skipIf
+from xml.etree import ElementTree
+
+# Third Party
+import pygame
+
+# Project
+from harren import resources
+from pyscroll.data import TiledMapData
+from pyscroll.orthographic import BufferedRenderer
+from pytmx import pytmx
+from pytmx.lib import TILE_FLAGS
+from pytmx.util_pygame import load_pygame
+
+INFINITE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="8" height="4"
+     tilewidth="16" tileheight="16" infinite="1">
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16" tilecount="4" columns="2">
+  <image source="tiles.png" width="32" height="32"/>
+ </tileset>
+ <layer id="1" name="ground" width="8" height="4">
+  <data encoding="csv">
+   <chunk x="-4" y="0" width="4" height="2">1,1,1,1,1,1,1,1</chunk>
+   <chunk x="0" y="0" width="4" height="2">1,2,0,0,3,4,0,0</chunk>
+   <chunk x="4" y="2" width="4" height="2">0,0,0,2,0,0,0,2147483652</chunk>
+  </data>
+ </layer>
+</map>
+"""
+
+ANIMATED_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="3" height="2"
+     tilewidth="16" tileheight="16" infinite="0">
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16" tilecount="4" columns="2">
+  <image source="tiles.png" width="32" height="32"/>
+  <tile id="0">
+   <animation>
+    <frame tileid="0" duration="100"/>
+    <frame tileid="1" duration="100"/>
+   </animation>
+  </tile>
+ </tileset>
+ <layer id="1" name="water" width="3" height="2">
+  <data encoding="csv">1,2,1,0,1,3</data>
+ </layer>
+ <layer id="2" name="top" width="3" height="2">
+  <data encoding="csv">0,0,0,1,0,0</data>
+ </layer>
+</map>
+"""
+
+JSON_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="3" height="2"
+     tilewidth="16" tileheight="16" infinite="0">
+ <properties>
+  <property name="music" value="title_theme.ogg"/>
+  <property name="level" type="int" value="3"/>
+ </properties>
+ <tileset firstgid="1" source="tiles.tsx"/>
+ <layer id="1" name="ground" width="3" height="2">
+  <data encoding="csv">1,2,3,4,1,2147483650</data>
+ </layer>
+ <layer id="2" name="top" width="3" height="2">
+  <data encoding="base64" compression="zlib">{top}</data>
+ </layer>
+ <objectgroup id="3" name="objects">
+  <object id="1" name="start_point" type="start" x="16" y="16" width="16" height="16">
+   <properties>
+    <property name="solid" type="bool" value="true"/>
+   </properties>
+  </object>
+  <object id="2" name="zone" x="32" y="8">
+   <polygon points="0,0 -8,4 6,-3"/>
+  </object>
+  <object id="3" name="sign" gid="4" x="0" y="32" width="16" height="16"/>
+ </objectgroup>
+</map>
+"""
+
+JSON_TSX = """<?xml version="1.0" encoding="UTF-8"?>
+<tileset name="tiles" tilewidth="16" tileheight="16" tilecount="4" columns="2">
+ <image source="tiles.png" width="32" height="32" trans="ff00ff"/>
+ <tile id="0">
+  <properties>
+   <property name="water" type="bool" value="true"/>
+  </properties>
+  <animation>
+   <frame tileid="0" duration="100"/>
+   <frame tileid="1" duration="100"/>
+  </animation>
+ </tile>
+</tileset>
+"""
+
+# zlib compressed base64 data of the "top" layer
+JSON_TOP = base64.b64encode(zlib.compress(b"".join(gid.to_bytes(4, "little") for gid in (0, 0, 3, 0, 2, 0)))).decode()
+
+
+def json_map(tileset_source):
+    """Return the Tiled JSON version of JSON_XML."""
+    return {
+        "type": "map",
+        "version": "1.2",
+        "orientation": "orthogonal",
+        "renderorder": "right-down",
+        "width": 3,
+        "height": 2,
+        "tilewidth": 16,
+        "tileheight": 16,
+        "infinite": False,
+        "properties": [
+            {"name": "music", "type": "string", "value": "title_theme.ogg"},
+            {"name": "level", "type": "int", "value": 3},
+        ],
+        "tilesets": [{"firstgid": 1, "source": tileset_source}],
+        "layers": [
+            {
+                "type": "objectgroup",
+                "id": 3,
+                "name": "objects",
+                "x": 0,
+                "y": 0,
+                "objects": [
+                    {
+                        "id": 1,
+                        "name": "start_point",
+                        "type": "start",
+                        "x": 16,
+                        "y": 16,
+                        "width": 16,
+                        "height": 16,
+                        "properties": [{"name": "solid", "type": "bool", "value": True}],
+                    },
+                    {
+                        "id": 2,
+                        "name": "zone",
+                        "x": 32,
+                        "y": 8,
+                        "polygon": [{"x": 0, "y": 0}, {"x": -8, "y": 4}, {"x": 6, "y": -3}],
+                    },
+                    {"id": 3, "name": "sign", "gid": 4, "x": 0, "y": 32, "width": 16, "height": 16},
+                ],
+            },
+            {
+                "type": "tilelayer",
+                "id": 1,
+                "name": "ground",
+                "width": 3,
+                "height": 2,
+                "data": [1, 2, 3, 4, 1, 2147483650],
+            },
+            {
+                "type": "tilelayer",
+                "id": 2,
+                "name": "top",
+                "width": 3,
+                "height": 2,
+                "encoding": "base64",
+                "compression": "zlib",
+                "data": JSON_TOP,
+            },
+        ],
+    }
+
+
+JSON_TSJ = {
+    "type": "tileset",
+    "name": "tiles",
+    "tilewidth": 16,
+    "tileheight": 16,
+    "tilecount": 4,
+    "columns": 2,
+    "image": "tiles.png",
+    "imagewidth": 32,
+    "imageheight": 32,
+    "transparentcolor": "#ff00ff",
+    "tiles": [
+        {
+            "id": 0,
+            "properties": [{"name": "water", "type": "bool", "value": True}],
+            "animation": [{"tileid": 0, "duration": 100}, {"tileid": 1, "duration": 100}],
+        }
+    ],
+}
+
+TEMPLATE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="4" height="4"
+     tilewidth="16" tileheight="16" infinite="0">
+ <tileset firstgid="5" source="tiles.tsx"/>
+ <objectgroup id="1" name="objects">
+  <object id="1" template="blocker.tx" x="0" y="0"/>
+  <object id="2" template="blocker.tx" x="16" y="0"/>
+  <object id="3" template="blocker.tx" name="wall" x="32" y="0">
+   <properties>
+    <property name="hp" type="int" value="5"/>
+   </properties>
+  </object>
+  <object id="4" template="zone.tj" x="32" y="32"/>
+  <object id="5" template="sign.tx" x="0" y="48"/>
+ </objectgroup>
+</map>
+"""
+
+BLOCKER_TX = """<?xml version="1.0" encoding="UTF-8"?>
+<template>
+ <object name="blocker" type="blocker" width="16" height="16">
+  <properties>
+   <property name="hp" type="int" value="1"/>
+   <property name="solid" type="bool" value="true"/>
+  </properties>
+ </object>
+</template>
+"""
+
+SIGN_TX = """<?xml version="1.0" encoding="UTF-8"?>
+<template>
+ <tileset firstgid="1" source="tiles.tsx"/>
+ <object name="sign" gid="3" width="16" height="16"/>
+</template>
+"""
+
+ZONE_TJ = {
+    "type": "template",
+    "object": {"name": "zone", "type": "zone", "polygon": [{"x": 0, "y": 0}, {"x": -8, "y": 4}, {"x": 6, "y": -3}]},
+}
+
+
+def tmx_path(filename):
+    return os.path.join(resources.TMX_FOLDER, filename)
+
+
+def tile_keys(tmx, layer):
+    """Return the (tiled gid, flags) pair of every cell in a layer."""
+    flags = {gid: flag for pairs in tmx.gidmap.values() for gid, flag in pairs}
+    return [(tmx.tiledgidmap.get(gid), flags.get(gid)) for row in layer.data for gid in row]
+
+
+class FakeImageLoader:
+    """TiledMap image_loader that returns (rect, flags) instead of images
+
+    Records the tiles it creates in created, and the source images its
+    loaders prefetch, with the thread they ran on, in prefetched.
+    """
+
+    def __init__(self):
+        self.created = []
+        self.prefetched = []
+
+    def __call__(self, filename, colorkey, **kwargs):
+        def load(rect=None, flags=None):
+            self.created.append((filename, rect))
+            return rect, flags
+
+        def prefetch():
+            self.prefetched.append((filename, threading.current_thread()))
+
+        load.prefetch = prefetch
+        return load
+
+
+class TempMapTestCase(TestCase):
+    """Writes xml to a map in a temporary folder, loaded with a FakeImageLoader"""
+
+    xml = None
+    filename = "map.tmx"
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.map_path = os.path.join(self.folder, self.filename)
+        with open(self.map_path, "w") as f:
+            f.write(self.xml)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, **kwargs):
+        return pytmx.TiledMap(self.map_path, image_loader=FakeImageLoader(), **kwargs)
+
+
+class TestParseProperties(TestCase):
+    def test_types(self):
+        """Every Tiled property type is converted."""
+        node = pytmx.et.fromstring(
+            """<object>
+             <properties>
+              <property name="name" value="chest"/>
+              <property name="count" type="int" value="3"/>
+              <property name="weight" type="float" value="1.5"/>
+              <property name="locked" type="bool" value="false"/>
+              <property name="tint" type="color" value="#ff102030"/>
+              <property name="sound" type="file" value="open.ogg"/>
+              <property name="key" type="object" value="12"/>
+              <property name="text">line one
+line two</property>
+              <property name="loot" type="class" propertytype="Loot">
+               <properties>
+                <property name="gold" type="int" value="20"/>
+               </properties>
+              </property>
+             </properties>
+            </object>"""
+        )
+        self.assertEqual(
+            pytmx.parse_properties(node),
+            {
+                "name": "chest",
+                "count": 3,
+                "weight": 1.5,
+                "locked": False,
+                "tint": "#ff102030",
+                "sound": "open.ogg",
+                "key": 12,
+                "text": "line one\nline two",
+                "loot": {"gold": 20},
+            },
+        )
+
+
+class TestDecodeGid(TestCase):
+    def test_flags_are_interned(self):
+        """Decoding the same flag bits must return the same flag instance."""
+        raw_gid = 42 | pytmx.GID_TRANS_FLIPX | pytmx.GID_TRANS_ROT
+        gid_a, flags_a = pytmx.decode_gid(raw_gid)
+        gid_b, flags_b = pytmx.decode_gid(raw_gid)
+        self.assertEqual(gid_a, 42)
+        self.assertEqual(gid_b, 42)
+        self.assertIs(flags_a, flags_b)
+        self.assertTrue(flags_a.flipped_horizontally)
+        self.assertFalse(flags_a.flipped_vertically)
+        self.assertTrue(flags_a.flipped_diagonally)
+
+    def test_flag_bits_round_trip(self):
+        """Every flag combination maps back onto its own table slot."""
+        for bits, flags in enumerate(TILE_FLAGS):
+            self.assertEqual(flags.bits, bits)
+            raw_gid = 7 | bits << pytmx.GID_FLAGS_SHIFT
+            self.assertIs(pytmx.decode_gid(raw_gid)[1], flags)
+
+
+class TestRegisterGid(TestCase):
+    def test_register_gid_deduplicates(self):
+        """Registering a gid twice with equal flags returns the same gid."""
+        tmx = pytmx.TiledMap()
+        first = tmx.register_gid(*pytmx.decode_gid(5 | pytmx.GID_TRANS_FLIPY))
+        second = tmx.register_gid(*pytmx.decode_gid(5 | pytmx.GID_TRANS_FLIPY))
+        plain = tmx.register_gid(5)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, plain)
+        self.assertEqual(tmx.register_gid(5, flags=0), plain)
+        self.assertEqual(len(tmx.gidmap[5]), 2)
+
+    def test_overworld_images_bounded(self):
+        """The overworld should only register each tile/flag combination once."""
+        tmx = pytmx.TiledMap(tmx_path("harren_map.tmx"))
+        tile_count = sum(ts.tilecount for ts in tmx.tilesets)
+        self.assertLessEqual(len(tmx.images), tile_count * len(TILE_FLAGS) + 1)
+
+
+@skipIf(pytmx.np is None, "NumPy is not installed")
+class TestNumpyStorage(TestCase):
+    def assert_same_layers(self, filename):
+        array_map = pytmx.TiledMap(tmx_path(filename))
+        numpy_map = pytmx.TiledMap(tmx_path(filename), use_numpy=True)
+        for array_layer, numpy_layer in zip(array_map.layers, numpy_map.layers):
+            if not isinstance(array_layer, pytmx.TiledTileLayer):
+                continue
+            self.assertEqual(numpy_layer.data.shape, (array_layer.height, array_layer.width))
+            self.assertEqual(tile_keys(array_map, array_layer), tile_keys(numpy_map, numpy_layer))
+        self.assertEqual(array_map.maxgid, numpy_map.maxgid)
+
+    def test_base64_zlib_layers(self):
+        """zlib compressed base64 layers decode the same with either storage."""
+        self.assert_same_layers("nohnaim.tmx")
+
+    def test_csv_layers(self):
+        """CSV layers decode the same with either storage."""
+        self.assert_same_layers("auria.tmx")
+
+    def test_flags_are_registered(self):
+        """Flipped tiles in numpy layers go through gid registration."""
+        tmx = pytmx.TiledMap(use_numpy=True)
+        node = pytmx.et.fromstring(
+            '<layer name="test" width="2" height="2"><data encoding="csv">'
+            f"1,{1 | pytmx.GID_TRANS_FLIPX},0,1</data></layer>"
+        )
+        layer = pytmx.TiledTileLayer(tmx, node)
+        self.assertEqual(layer.data[0][0], layer.data[1][1])
+        self.assertNotEqual(layer.data[0][0], layer.data[0][1])
+        self.assertEqual(layer.data[1][0], 0)
+        self.assertEqual(tmx.map_gid(1)[1][1], pytmx.decode_gid(pytmx.GID_TRANS_FLIPX)[1])
+
+
+class TestLazyTiles(TestCase):
+    def load(self, **kwargs):
+        loader = FakeImageLoader()
+        tmx = pytmx.TiledMap(tmx_path("nohnaim_house_1.tmx"), image_loader=loader, **kwargs)
+        return tmx, loader.created
+
+    def test_only_used_tiles_are_loaded(self):
+        """Lazy maps create images for used tiles only."""
+        eager, eager_created = self.load(lazy_tiles=False)
+        lazy, lazy_created = self.load(lazy_tiles=True)
+        self.assertLess(len(lazy_created), len(eager_created))
+        for gid in lazy.get_used_gids():
+            self.assertIsNotNone(lazy.images[gid])
+
+    def test_unused_tiles_load_on_demand(self):
+        """Unused tiles are created by get_tile_image_by_gid and counted."""
+        eager, _ = self.load(lazy_tiles=False)
+        lazy, created = self.load(lazy_tiles=True)
+        unused = next(gid for gid, image in enumerate(lazy.images) if gid and image is None)
+        count = len(created)
+        self.assertEqual(lazy.get_tile_image_by_gid(unused), eager.images[unused])
+        self.assertEqual(lazy.lazy_tile_count, 1)
+        self.assertEqual(len(created), count + 1)
+
+    def test_imageless_tiles_are_not_retried(self):
+        """A gid found to have no image is not looked up again on every request."""
+        lazy, _ = self.load(lazy_tiles=True)
+        gid = lazy.register_gid(lazy.maxgid + 100)
+        with mock.patch.object(pytmx.TiledMap, "get_tileset_from_gid", side_effect=ValueError) as lookup:
+            self.assertIsNone(lazy.get_tile_image_by_gid(gid))
+            self.assertIsNone(lazy.get_tile_image_by_gid(gid))
+        lookup.assert_called_once_with(gid)
+        self.assertEqual(lazy.lazy_tile_count, 0)
+
+    def test_eager_by_default(self):
+        """Every tile image is created up front unless lazy_tiles is passed."""
+        tmx, _ = self.load()
+        self.assertFalse(tmx.lazy_tiles)
+        self.assertTrue(all(image is not None for gid, image in enumerate(tmx.images) if gid))
+
+
+class TestLoadThreads(TestCase):
+    def load(self, **kwargs):
+        loader = FakeImageLoader()
+        tmx = pytmx.TiledMap(tmx_path("harren_map.tmx"), image_loader=loader, **kwargs)
+        return tmx, loader.prefetched
+
+    def test_prefetch_runs_in_workers(self):
+        """Each source image is prefetched once, off the calling thread."""
+        tmx, prefetched = self.load(load_threads=4)
+        filenames = [filename for filename, _ in prefetched]
+        self.assertEqual(len(filenames), len(set(filenames)))
+        self.assertEqual(len(filenames), len([ts for ts in tmx.tilesets if ts.source]))
+        for _, thread in prefetched:
+            self.assertIsNot(thread, threading.current_thread())
+
+    def test_same_images(self):
+        """Threaded loading produces the same images as sequential loading."""
+        sequential, prefetched = self.load()
+        threaded, _ = self.load(load_threads=4)
+        self.assertEqual(prefetched, [])
+        self.assertEqual(sequential.images, threaded.images)
+
+
+class TestStreaming(TestCase):
+    def assert_same_map(self, filename):
+        dom_map = pytmx.TiledMap(tmx_path(filename))
+        stream_map = pytmx.TiledMap(tmx_path(filename), streaming=True)
+        self.assertEqual([l.name for l in dom_map.layers], [l.name for l in stream_map.layers])
+        self.assertEqual(dom_map.properties, stream_map.properties)
+        self.assertEqual((dom_map.width, dom_map.height), (stream_map.width, stream_map.height))
+        for dom_layer, stream_layer in zip(dom_map.layers, stream_map.layers):
+            if isinstance(dom_layer, pytmx.TiledTileLayer):
+                self.assertEqual(tile_keys(dom_map, dom_layer), tile_keys(stream_map, stream_layer))
+        for dom_obj, stream_obj in zip(dom_map.objects, stream_map.objects):
+            self.assertEqual(
+                (dom_obj.id, dom_obj.name, dom_obj.x, dom_obj.y, dom_obj.properties),
+                (stream_obj.id, stream_obj.name, stream_obj.x, stream_obj.y, stream_obj.properties),
+            )
+        self.assertEqual(len(dom_map.tile_properties), len(stream_map.tile_properties))
+
+    def test_library(self):
+        """Streaming parses library.tmx the same as the DOM parser."""
+        self.assert_same_map("library.tmx")
+
+    def test_nohnaim(self):
+        """Streaming parses nohnaim.tmx the same as the DOM parser."""
+        self.assert_same_map("nohnaim.tmx")
+
+
+class TestLazyLayers(TestCase):
+    def load(self, **kwargs):
+        return pytmx.TiledMap(tmx_path("nohnaim.tmx"), image_loader=FakeImageLoader(), **kwargs)
+
+    def test_layers_not_decoded(self):
+        """Lazy layers are decoded on first access of their data."""
+        tmx = self.load(lazy_layers=True)
+        layers = list(tmx.visible_tile_layers)
+        self.assertFalse(any(tmx.layers[i].decoded for i in layers))
+        tmx.layers[layers[0]].data
+        self.assertTrue(tmx.layers[layers[0]].decoded)
+        self.assertFalse(tmx.layers[layers[-1]].decoded)
+
+    def test_warm(self):
+        """Warmed layers have the same tile images as eagerly decoded ones."""
+        eager = self.load()
+        lazy = self.load(lazy_layers=True)
+        lazy.warm([eager.layers[i].name for i in eager.visible_tile_layers])
+        for i in eager.visible_tile_layers:
+            self.assertTrue(lazy.layers[i].decoded)
+            self.assertEqual(list(eager.layers[i].tiles()), list(lazy.layers[i].tiles()))
+
+
+class TestChunkedLayers(TempMapTestCase):
+    xml = INFINITE_XML
+    filename = "infinite.tmx"
+
+    def test_eager(self):
+        """Without lazy_layers every chunk is decoded while parsing."""
+        tmx = self.load()
+        layer = tmx.layers[0]
+        self.assertTrue(tmx.infinite)
+        self.assertEqual(sorted(layer.chunks), [(-4, 0), (0, 0), (4, 2)])
+        self.assertEqual(tmx.get_tile_image(1, 0, 0), ((16, 0, 16, 16), pytmx.NO_FLAGS))
+        self.assertEqual(tmx.get_tile_image(7, 3, 0)[1], TILE_FLAGS[4])
+        self.assertEqual(len(list(layer.tiles())), 14)
+
+    def test_load_and_evict(self):
+        """Chunks are decoded and evicted around a rect."""
+        tmx = self.load(lazy_layers=True)
+        layer = tmx.layers[0]
+        self.assertEqual(layer.chunks, {})
+        self.assertEqual(tmx.get_tile_gid(1, 0, 0), 0)
+
+        self.assertEqual(tmx.load_chunks((0, 0, 2, 2)), 1)
+        self.assertEqual(tmx.get_tile_image(1, 0, 0), ((16, 0, 16, 16), pytmx.NO_FLAGS))
+        self.assertEqual(tmx.load_chunks((-8, 0, 16, 4)), 2)
+        self.assertEqual(tmx.get_tile_image(7, 3, 0)[1], TILE_FLAGS[4])
+
+        self.assertEqual(tmx.evict_chunks((4, 2, 1, 1)), 2)
+        self.assertEqual(list(layer.chunks), [(4, 2)])
+        self.assertEqual(tmx.get_tile_gid(1, 0, 0), 0)
+        with self.assertRaises(ValueError):
+            tmx.get_tile_gid(1, 3, 0)
+
+    def test_pyscroll_resident_chunks(self):
+        """pyscroll only draws tiles of resident chunks."""
+        tmx = self.load(lazy_layers=True)
+        data = TiledMapData(tmx)
+        self.assertEqual(list(data.get_tile_images_by_rect((0, 0, 8, 4))), [])
+
+        tmx.load_chunks((0, 0, 1, 1))
+        tiles = list(data.get_tile_images_by_rect((1, 0, 7, 4)))
+        self.assertEqual([(x, y) for x, y, _, _ in tiles], [(1, 0), (1, 1)])
+        self.assertEqual(tiles[0][3], ((16, 0, 16, 16), pytmx.NO_FLAGS))
+
+
+class TestGidIndex(TempMapTestCase):
+    xml = ANIMATED_XML
+    filename = "animated.tmx"
+
+    def test_same_locations(self):
+        """Indexed lookups match the scan of every layer, for both storages."""
+        for use_numpy in (False, True) if pytmx.np is not None else (False,):
+            scanned = self.load(use_numpy=use_numpy)
+            indexed = self.load(use_numpy=use_numpy, index_gids=True)
+            self.assertIsNone(scanned.gid_index)
+            for gid in range(scanned.maxgid):
+                self.assertEqual(
+                    list(scanned.get_tile_locations_by_gid(gid)), list(indexed.get_tile_locations_by_gid(gid))
+                )
+
+    def test_set_gid(self):
+        """set_gid moves tiles in the index, for both storages."""
+        for use_numpy in (False, True) if pytmx.np is not None else (False,):
+            scanned = self.load(use_numpy=use_numpy)
+            indexed = self.load(use_numpy=use_numpy, index_gids=True)
+            for tmx in (scanned, indexed):
+                new = tmx.register_gid(4)
+                tmx.layers[0].set_gid(0, 0, tmx.map_gid(3)[0][0])
+                tmx.layers[0].set_gid(2, 1, 0)
+                tmx.layers[0].set_gid(0, 1, tmx.map_gid(1)[0][0])
+                tmx.layers[1].set_gid(0, 1, new)
+                tmx.layers[1].set_gid(2, 0, new)
+            for gid in range(scanned.maxgid):
+                self.assertEqual(
+                    list(scanned.get_tile_locations_by_gid(gid)), list(indexed.get_tile_locations_by_gid(gid))
+                )
+            self.assertEqual(list(indexed.get_tile_locations_by_gid(new)), [(2, 0, 1), (0, 1, 1)])
+
+    def test_animation_positions_seeded(self):
+        """pyscroll animation tokens start with every position of the map."""
+        tmx = self.load(index_gids=True)
+        data = TiledMapData(tmx)
+        gid = tmx.map_gid(1)[0][0]
+        self.assertEqual(data._animation_map[gid].positions, {(0, 0, 0), (2, 0, 0), (1, 1, 0), (0, 1, 1)})
+
+        untracked = TiledMapData(self.load())
+        self.assertEqual(untracked._animation_map[gid].positions, set())
+
+    def test_animation_rows_in_view(self):
+        """Seeded tokens only visit the rows in view, and keep the others."""
+        tmx = self.load(index_gids=True)
+        data = TiledMapData(tmx)
+        gid = tmx.map_gid(1)[0][0]
+        token = data._animation_map[gid]
+        self.assertEqual(sorted(token.rows), [0, 1])
+        for queued in data._animation_queue:
+            queued.next = 0
+
+        new_tiles = data.process_animation_queue(pygame.Rect(0, 0, 3, 1))
+        self.assertEqual({(x, y, l) for x, y, l, _ in new_tiles}, {(0, 0, 0), (2, 0, 0)})
+        self.assertEqual(len(token.positions), 4)
+
+    def test_animation_positions_before_drawn(self):
+        """After the first frame, tokens hold animated tiles that were never on screen."""
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        if pygame.display.get_surface() is None:
+            pygame.display.init()
+            pygame.display.set_mode((1, 1))
+        pygame.image.save(pygame.Surface((32, 32)), os.path.join(self.folder, "tiles.png"))
+        rows = [[2] * 40 for _ in range(40)]
+        rows[0][0] = rows[35][35] = 1
+        data = ",".join(str(gid) for row in rows for gid in row)
+        xml = ANIMATED_XML.replace('width="3" height="2"', 'width="40" height="40"')
+        with open(self.map_path, "w") as f:
+            f.write(xml.replace("1,2,1,0,1,3", data).replace("0,0,0,1,0,0", ",".join(["0"] * 1600)))
+
+        for index_gids in (True, False):
+            tmx = load_pygame(self.map_path, tile_cache=None, index_gids=index_gids)
+            data = TiledMapData(tmx)
+            renderer = BufferedRenderer(data, (64, 64), clamp_camera=False, alpha=True)
+            renderer.center((32, 32))
+            screen = pygame.Surface((64, 64))
+            renderer.draw(screen, screen.get_rect())
+            positions = data._animation_map[tmx.map_gid(1)[0][0]].positions
+            self.assertIn((0, 0, 0), positions)
+            self.assertEqual((35, 35, 0) in positions, index_gids)
+
+    def test_animation_positions_in_chunks(self):
+        """Gids the index does not cover are still found while drawing."""
+        animation = '<tile id="0"><animation><frame tileid="0" duration="100"/></animation></tile>'
+        with open(self.map_path, "w") as f:
+            f.write(INFINITE_XML.replace("</tileset>", animation + "</tileset>"))
+        tmx = self.load(index_gids=True)
+        data = TiledMapData(tmx)
+        gid = tmx.map_gid(1)[0][0]
+        token = data._animation_map[gid]
+        self.assertIsNone(token.rows)
+
+        list(data.get_tile_images_by_rect((0, 0, 2, 1)))
+        self.assertEqual(token.positions, {(0, 0, 0)})
+
+
+class TestTilesetIndex(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmx = pytmx.TiledMap(tmx_path("nohnaim.tmx"))
+
+    def owner(self, gid):
+        """Find the owning tileset the slow way."""
+        tiled_gid = self.tmx.tiledgidmap[gid]
+        return max((ts for ts in self.tmx.tilesets if ts.firstgid <= tiled_gid), key=lambda ts: ts.firstgid)
+
+    def test_get_tileset_from_gid(self):
+        """Bisect lookups find the tileset with the closest lower firstgid."""
+        self.assertGreater(len(self.tmx.tilesets), 1)
+        for gid in self.tmx.tiledgidmap:
+            self.assertIs(self.tmx.get_tileset_from_gid(gid), self.owner(gid))
+        with self.assertRaises(ValueError):
+            self.tmx.get_tileset_from_gid(self.tmx.maxgid + 1)
+
+    def test_batch(self):
+        """The batch variant returns tileset indexes, and -1 for empty tiles."""
+        gids = [0] + sorted(self.tmx.tiledgidmap)
+        expected = [-1] + [self.tmx.tilesets.index(self.owner(gid)) for gid in gids[1:]]
+        self.assertEqual(self.tmx.get_tileset_indexes_from_gids(gids), expected)
+        if pytmx.np is not None:
+            result = self.tmx.get_tileset_indexes_from_gids(pytmx.np.array(gids))
+            self.assertEqual(result.tolist(), expected)
+
+    def test_batch_rows(self):
+        """Rows of a layer with the default array storage are classified row by row."""
+        layer = self.tmx.layers[0]
+        expected = [[self.tmx.tilesets.index(self.owner(gid)) if gid else -1 for gid in row] for row in layer.data]
+        with mock.patch.object(pytmx, "np", None):
+            self.assertEqual(self.tmx.get_tileset_indexes_from_gids(layer.data), expected)
+        if pytmx.np is not None:
+            self.assertEqual(self.tmx.get_tileset_indexes_from_gids(layer.data).tolist(), expected)
+
+    def test_index_rebuilt(self):
+        """add_tileset and assigning tilesets rebuild the index."""
+        tmx = pytmx.TiledMap(tmx_path("nohnaim.tmx"))
+        gid = next(iter(tmx.tiledgidmap))
+        owner = tmx.get_tileset_from_gid(gid)
+        tmx.tilesets = list(reversed(tmx.tilesets))
+        self.assertIs(tmx.get_tileset_from_gid(gid), owner)
+
+        firstgid = max(tmx.tiledgidmap.values()) + 100
+        node = ElementTree.Element("tileset", firstgid=str(firstgid), name="extra", tilewidth="16", tileheight="16")
+        extra = pytmx.TiledTileset(tmx, node)
+        tmx.add_tileset(extra)
+        self.assertIs(tmx.get_tileset_from_gid(tmx.register_gid(firstgid)), extra)
+
+    def test_last_gid(self):
+        """Gids past the grid of a tileset image have no tileset."""
+        tmx = pytmx.TiledMap(tmx_path("nohnaim.tmx"))
+        last = max(tmx.tilesets, key=lambda ts: ts.firstgid)
+        self.assertIsNotNone(last.source)
+        self.assertIs(tmx.get_tileset_from_gid(tmx.register_gid(last.firstgid + last.tilecount - 1)), last)
+        gid = tmx.register_gid(last.firstgid + last.tilecount)
+        with self.assertRaises(ValueError):
+            tmx.get_tileset_from_gid(gid)
+        self.assertEqual(tmx.get_tileset_indexes_from_gids([gid]), [-1])
+
+
+class TestImageLayerGids(TempMapTestCase):
+    xml = ANIMATED_XML.replace(
+        "</map>", '<imagelayer id="3" name="back"><image source="back.png" width="48" height="32"/></imagelayer></map>'
+    )
+
+    def test_no_tileset(self):
+        """Image layer gids are past the tileset grid, so they have no tileset."""
+        tmx = self.load()
+        layer = tmx.layers[2]
+        self.assertIsInstance(layer, pytmx.TiledImageLayer)
+        self.assertEqual(tmx.images[layer.gid], (None, None))
+        with self.assertRaises(ValueError):
+            tmx.get_tileset_from_gid(layer.gid)
+        self.assertEqual(tmx.get_tileset_indexes_from_gids([layer.gid]), [-1])
+        self.assertIs(tmx.get_tileset_from_gid(tmx.map_gid(4)[0][0]), tmx.tilesets[0])
+
+
+class TestObjectIndex(TestCase):
+    def setUp(self):
+        self.tmx = pytmx.TiledMap(tmx_path("nohnaim.tmx"))
+        self.objects = list(self.tmx.objects)
+
+    def test_lookups(self):
+        """Index lookups match a linear scan of the objects."""
+        for obj in self.objects[:50]:
+            self.assertIs(self.tmx.get_object_by_id(obj.id), obj)
+            self.assertIs(self.tmx.get_object_by_name(obj.name), next(o for o in self.objects if o.name == obj.name))
+        expected = [obj for obj in self.objects if obj.type == "npc"]
+        self.assertTrue(expected)
+        self.assertEqual(self.tmx.get_objects_by_type("npc"), expected)
+        self.assertEqual(self.tmx.get_objects_by_type("no such type"), [])
+        with self.assertRaises(ValueError):
+            self.tmx.get_object_by_name("no such name")
+
+    def test_find_objects(self):
+        """find_objects merges name and type matches in map order."""
+        expected = [obj for obj in self.objects if obj.name == "blocker" or obj.type in ("npc", "portal")]
+        self.assertEqual(self.tmx.find_objects(("blocker",), ("npc", "portal")), expected)
+
+    def test_added_objects(self):
+        """Objects added to a group are indexed on the next lookup."""
+        self.tmx.get_objects_by_type("npc")
+        group = next(self.tmx.objectgroups)
+        obj = pytmx.TiledObject(self.tmx, pytmx.et.fromstring('<object id="99999" name="added" type="npc"/>'))
+        group.append(obj)
+        self.assertIs(self.tmx.get_object_by_id(99999), obj)
+        self.assertIn(obj, self.tmx.get_objects_by_type("npc"))
+
+
+class TestObjectQuery(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmx = pytmx.TiledMap(tmx_path("nohnaim.tmx"))
+        cls.objects = list(cls.tmx.objects)
+
+    def scan(self, rect, types=None):
+        """Query the objects the slow way."""
+        x, y, width, height = rect
+        return [
+            obj
+            for obj in self.objects
+            if pytmx.overlaps_bounds(obj.bounds, x, y, x + width, y + height) and (types is None or obj.type in types)
+        ]
+
+    def test_query_objects(self):
+        """Grid queries match a scan of every object."""
+        for rect in ((0, 0, 64, 64), (200, 150, 300, 120), (-40, -40, 30, 30), (8, 8, 0, 0)):
+            self.assertEqual(self.tmx.query_objects(rect), self.scan(rect))
+        rect = (0, 0, self.tmx.width * self.tmx.tilewidth, self.tmx.height * self.tmx.tileheight)
+        self.assertEqual(self.tmx.query_objects(rect, types=("portal",)), self.scan(rect, ("portal",)))
+
+    def test_polygon_bounds(self):
+        """Polygon extents can reach left of and above the object position."""
+        node = pytmx.et.fromstring('<object id="1" x="10" y="10"><polygon points="0,0 -5,4 6,-3"/></object>')
+        obj = pytmx.TiledObject(self.tmx, node)
+        self.assertTrue(obj.closed)
+        self.assertEqual(obj.bounds, (5, 7, 11, 7))
+
+
+class TestJsonMaps(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.write("map.tmx", JSON_XML.format(top=JSON_TOP))
+        self.write("tiles.tsx", JSON_TSX)
+        self.write("tiles.tsj", json.dumps(JSON_TSJ))
+        self.write("tsj.tmj", json.dumps(json_map("tiles.tsj")))
+        self.write("tsx.json", json.dumps(json_map("tiles.tsx")))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, text):
+        with open(os.path.join(self.folder, name), "w") as f:
+            f.write(text)
+
+    def load(self, name, **kwargs):
+        return pytmx.TiledMap(os.path.join(self.folder, name), **kwargs)
+
+    @staticmethod
+    def tile_properties(tmx):
+        """Return tile_properties with animation frames as tuples."""
+        return {
+            gid: dict(props, frames=[(frame.gid, frame.duration) for frame in props["frames"]])
+            for gid, props in tmx.tile_properties.items()
+        }
+
+    def assert_same_map(self, xml_map, json_map):
+        self.assertEqual(xml_map.properties, json_map.properties)
+        self.assertEqual((xml_map.width, xml_map.tilewidth), (json_map.width, json_map.tilewidth))
+        self.assertEqual(dict(xml_map.gidmap), dict(json_map.gidmap))
+        self.assertEqual(self.tile_properties(xml_map), self.tile_properties(json_map))
+        self.assertEqual([layer.name for layer in xml_map.layers], [layer.name for layer in json_map.layers])
+        for xml_layer, json_layer in zip(xml_map.layers, json_map.layers):
+            if isinstance(xml_layer, pytmx.TiledTileLayer):
+                self.assertEqual(list(xml_layer.iter_data()), list(json_layer.iter_data()))
+        for xml_obj, json_obj in zip(xml_map.objects, json_map.objects):
+            for name in ("id", "name", "type", "x", "y", "width", "height", "gid", "properties", "bounds"):
+                self.assertEqual(getattr(xml_obj, name), getattr(json_obj, name))
+        self.assertEqual(xml_map.get_object_by_name("zone").points, json_map.get_object_by_name("zone").points)
+        xml_tileset, json_tileset = xml_map.tilesets[0], json_map.tilesets[0]
+        for name in ("firstgid", "name", "tilecount", "columns", "source", "trans", "width", "height"):
+            self.assertEqual(getattr(xml_tileset, name), getattr(json_tileset, name))
+
+    def test_tsj_tileset(self):
+        """A TMJ map with a TSJ tileset loads the same as the TMX map."""
+        self.assert_same_map(self.load("map.tmx"), self.load("tsj.tmj"))
+
+    def test_tsx_tileset(self):
+        """JSON maps may use TSX tilesets."""
+        self.assert_same_map(self.load("map.tmx"), self.load("tsx.json"))
+
+    def test_lazy_layers(self):
+        """JSON layers decode on first access with lazy_layers."""
+        tmx = self.load("tsj.tmj", lazy_layers=True)
+        self.assertFalse(tmx.layers[0].decoded)
+        self.assert_same_map(self.load("map.tmx", lazy_layers=True), tmx)
+
+    def test_chunks(self):
+        """Chunked layers of infinite JSON maps are kept for load_chunks."""
+        data = json_map("tiles.tsj")
+        layer = data["layers"][1]
+        layer["chunks"] = [{"x": -3, "y": 0, "width": 3, "height": 2, "data": layer.pop("data")}]
+        data["infinite"] = True
+        self.write("infinite.tmj", json.dumps(data))
+        tmx = self.load("infinite.tmj", lazy_layers=True)
+        layer = tmx.get_layer_by_name("ground")
+        self.assertEqual(tmx.load_chunks((-3, 0, 1, 1)), 1)
+        self.assertEqual(layer.get_gid(-3, 0), tmx.map_gid(1)[0][0])
+
+
+PROPERTIES_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="2" height="1"
+     tilewidth="16" tileheight="16" infinite="0">
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16" tilecount="4" columns="2">
+  <image source="tiles.png" width="32" height="32"/>
+ </tileset>
+ <layer id="1" name="ground" width="2" height="1">
+  <data>
+   <tile gid="2"/>
+   <tile gid="1073741825"/>
+  </data>
+ </layer>
+ <group id="2" name="ignored">
+  <layer id="3" name="nested" width="2" height="1">
+   <data encoding="csv">1,1</data>
+  </layer>
+ </group>
+ <objectgroup id="4" name="objects">
+  <object id="1" name="chest" x="0" y="0">
+   <properties>
+    <property name="count" type="int" value="3"/>
+    <property name="locked" type="bool" value="false"/>
+    <property name="text">line one
+line two</property>
+    <property name="loot" type="class" propertytype="Loot">
+     <properties>
+      <property name="gold" type="int" value="20"/>
+     </properties>
+    </property>
+   </properties>
+  </object>
+ </objectgroup>
+</map>
+"""
+
+
+class TestXmlParsers(TestCase):
+    assert_same_map = TestJsonMaps.assert_same_map
+    tile_properties = staticmethod(TestJsonMaps.tile_properties)
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.write("map.tmx", JSON_XML.format(top=JSON_TOP))
+        self.write("tiles.tsx", JSON_TSX)
+        self.write("infinite.tmx", INFINITE_XML)
+        self.write("properties.tmx", PROPERTIES_XML)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, name, text):
+        with open(os.path.join(self.folder, name), "w") as f:
+            f.write(text)
+
+    def load(self, name, **kwargs):
+        return pytmx.TiledMap(os.path.join(self.folder, name), **kwargs)
+
+    def test_expat(self):
+        """expat loads a map the same as the element tree parser."""
+        self.assert_same_map(self.load("map.tmx", xml_parser="etree"), self.load("map.tmx", xml_parser="expat"))
+
+    def test_expat_library(self):
+        """expat parses library.tmx the same as the element tree parser."""
+        dom_map = pytmx.TiledMap(tmx_path("library.tmx"), xml_parser="etree")
+        expat_map = pytmx.TiledMap(tmx_path("library.tmx"), xml_parser="expat")
+        self.assertEqual(dict(dom_map.gidmap), dict(expat_map.gidmap))
+        for dom_layer, expat_layer in zip(dom_map.layers, expat_map.layers):
+            if isinstance(dom_layer, pytmx.TiledTileLayer):
+                self.assertEqual(list(dom_layer.iter_data()), list(expat_layer.iter_data()))
+        self.assertEqual(
+            [(obj.id, obj.name, obj.type, obj.bounds, obj.properties) for obj in dom_map.objects],
+            [(obj.id, obj.name, obj.type, obj.bounds, obj.properties) for obj in expat_map.objects],
+        )
+
+    def test_expat_properties_and_tile_elements(self):
+        """expat reads typed, text and class properties, tile elements, and skips group layers."""
+        tmx = self.load("properties.tmx", xml_parser="expat")
+        self.assertEqual(
+            tmx.get_object_by_name("chest").properties,
+            {"count": 3, "locked": False, "text": "line one\nline two", "loot": {"gold": 20}},
+        )
+        self.assertEqual([layer.name for layer in tmx.layers], ["ground", "objects"])
+        self.assertEqual(list(tmx.layers[0].iter_data()), list(self.load("properties.tmx").layers[0].iter_data()))
+
+    def test_expat_chunks(self):
+        """expat keeps the chunks of infinite maps."""
+        tmx = self.load("infinite.tmx", xml_parser="expat", lazy_layers=True)
+        self.assertEqual(tmx.load_chunks((-8, 0, 16, 4)), 3)
+        self.assertEqual(tmx.get_tile_gid(7, 3, 0), self.load("infinite.tmx").get_tile_gid(7, 3, 0))
+
+    def test_unknown_parser(self):
+        """Unknown parser names are rejected."""
+        with self.assertRaises(ValueError):
+            self.load("map.tmx", xml_parser="sax")
+
+    @skipIf(pytmx.lxml_etree is not None, "lxml is installed")
+    def test_lxml_fallback(self):
+        """Without lxml, asking for it falls back to xml.etree."""
+        with self.assertLogs("pytmx.pytmx", "WARNING"):
+            tmx = self.load("map.tmx", xml_parser="lxml")
+        self.assertEqual(tmx.xml_parser, "etree")
+
+
+class TestTemplates(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name, text in (
+            ("map.tmx", TEMPLATE_XML),
+            ("tiles.tsx", JSON_TSX),
+            ("blocker.tx", BLOCKER_TX),
+            ("sign.tx", SIGN_TX),
+            ("zone.tj", json.dumps(ZONE_TJ)),
+        ):
+            with open(os.path.join(self.folder, name), "w") as f:
+                f.write(text)
+        self.cache = pytmx.TemplateCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self):
+        return pytmx.TiledMap(os.path.join(self.folder, "map.tmx"), template_cache=self.cache)
+
+    def test_attributes(self):
+        """Objects get the template's attributes unless they set their own."""
+        tmx = self.load()
+        first, second, wall, zone, sign = tmx.objects
+        self.assertEqual((first.name, first.type, first.width, second.x), ("blocker", "blocker", 16, 16))
+        self.assertEqual((wall.name, wall.type), ("wall", "blocker"))
+        self.assertEqual(zone.type, "zone")
+        self.assertEqual(zone.bounds, (24, 29, 14, 7))
+        self.assertEqual(tmx.tiledgidmap[sign.gid], 7)
+        self.assertEqual(tmx.get_objects_by_type("blocker"), [first, second, wall])
+
+    def test_shared_properties(self):
+        """Template properties are shared, and changes stay with one object."""
+        first, second, wall, _, _ = self.load().objects
+        self.assertEqual(dict(first.properties), {"hp": 1, "solid": True})
+        self.assertEqual(dict(wall.properties), {"hp": 5, "solid": True})
+        self.assertIs(first.properties.maps[1], second.properties.maps[1])
+        first.properties["hp"] = 2
+        self.assertEqual(second.properties["hp"], 1)
+
+    def test_parsed_once(self):
+        """Each template file is parsed once per cache."""
+        self.load()
+        self.load()
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.misses, 3)
+
+
+class TestCompactObjects(TestCase):
+    ATTRIBUTES = ("id", "name", "type", "x", "y", "width", "height", "rotation", "gid", "visible", "properties")
+
+    def setUp(self):
+        self.plain = pytmx.TiledMap(tmx_path("library.tmx"))
+        self.compact = pytmx.TiledMap(tmx_path("library.tmx"), compact_objects=True)
+        self.group = next(self.compact.objectgroups)
+
+    def values(self, objects):
+        return [tuple(getattr(obj, name) for name in self.ATTRIBUTES) for obj in objects]
+
+    def test_same_objects(self):
+        """Views have the attributes of the TiledObjects they replace."""
+        self.assertIsInstance(self.group.sequence_data, pytmx.CompactObjects)
+        self.assertEqual(self.values(self.plain.objects), self.values(self.compact.objects))
+        portal = self.compact.get_objects_by_type("portal")[0]
+        self.assertEqual(portal.destination, "nohnaim")
+        self.assertEqual(self.compact.find_objects(("library_target_1",)), [self.group[0]])
+
+    def test_changes(self):
+        """Writes through a view go to the columns and stay with their row."""
+        view = self.group[5]
+        view.x = 8
+        view.type = "moved"
+        view.properties["hp"] = 3
+        self.group.insert(0, self.group[1])
+        self.assertEqual((self.group[6].x, self.group[6].type, self.group[6].hp), (8, "moved", 3))
+        del self.group[0]
+        self.assertEqual(self.group[5].properties, {"hp": 3})
+        self.assertEqual(self.group[4].properties, next(self.plain.objectgroups)[4].properties)
+
+    def test_reorder(self):
+        """sort and reverse move properties with their objects."""
+        expected = self.values(reversed(self.group))
+        self.group.reverse()
+        self.assertEqual(self.values(self.group), expected)
+        self.group.sort(key=lambda obj: (obj.y, obj.x))
+        self.assertEqual(self.values(self.group), sorted(expected, key=lambda values: (values[4], values[3])))
+
+    def test_column(self):
+        """Columns can be filtered without views."""
+        store = self.group.sequence_data
+        xs = store.column("x")
+        self.assertEqual(list(xs), [obj.x for obj in self.group])
+        portal = store.intern("portal")
+        rows = [row for row, type_id in enumerate(store.column("type")) if type_id == portal]
+        self.assertEqual([self.group[row] for row in rows], self.compact.get_objects_by_type("portal"))
+
+
+class TestGidCounts(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name, xml in (("animated.tmx", ANIMATED_XML), ("infinite.tmx", INFINITE_XML)):
+            with open(os.path.join(self.folder, name), "w") as f:
+                f.write(xml)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, name, **kwargs):
+        return pytmx.TiledMap(os.path.join(self.folder, name), **kwargs)
+
+    @staticmethod
+    def count(layer):
+        counts = {}
+        for _, _, gid in layer.iter_data():
+            counts[gid] = counts.get(gid, 0) + 1
+        return counts
+
+    def test_decode(self):
+        """Decoded layers count their gids, for both storages."""
+        for use_numpy in (False, True) if pytmx.np is not None else (False,):
+            tmx = self.load("animated.tmx", use_numpy=use_numpy)
+            for layer in tmx.layers:
+                self.assertEqual(layer.gid_counts, self.count(layer))
+
+    def test_set_gid(self):
+        """set_gid keeps the counts up to date."""
+        tmx = self.load("animated.tmx")
+        layer = tmx.layers[0]
+        gid = tmx.register_gid(4)
+        layer.set_gid(1, 0, gid)
+        layer.set_gid(1, 1, 0)
+        self.assertEqual(tmx.get_tile_gid(1, 0, 0), gid)
+        self.assertEqual(layer.gid_counts, self.count(layer))
+
+    def test_chunks(self):
+        """Only resident chunks are counted."""
+        tmx = self.load("infinite.tmx", lazy_layers=True)
+        layer = tmx.layers[0]
+        self.assertEqual(layer.gid_counts, {})
+        tmx.load_chunks((-8, 0, 16, 4))
+        self.assertEqual(layer.gid_counts, self.count(layer))
+        tmx.evict_chunks((0, 0, 1, 1))
+        self.assertEqual(layer.gid_counts, self.count(layer))
+        layer.set_gid(7, 3, 0)
+        self.assertEqual(layer.gid_counts, self.count(layer))
+
+    def test_properties_and_usage(self):
+        """Properties and tileset usage come from the counts."""
+        tmx = self.load("animated.tmx")
+        animated = tmx.map_gid(1)[0][0]
+        self.assertEqual([gid for gid, _ in tmx.get_tile_properties_by_layer(0)], [animated])
+        self.assertEqual(tmx.get_tileset_usage(0), {tmx.tilesets[0]: 5})
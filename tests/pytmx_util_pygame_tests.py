@@ -0,0 +1,449 @@
+# Standard
+import gc
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase, mock, skipIf
+
+# Third Party
+import pygame
+
+# Project
+from pyscroll.data import TiledMapData
+from pyscroll.orthographic import BufferedRenderer
+from pytmx import TiledMap, util_pygame
+from pytmx.cache import save_cached_map
+from pytmx.util_pygame import (
+    TILE_ALPHA,
+    TILE_COLORKEY,
+    TILE_OPAQUE,
+    AtlasTile,
+    HeadlessTile,
+    SurfaceCache,
+    build_rects,
+    convert_images,
+    greedy_rects,
+    load_pygame,
+    simplify,
+    smart_convert,
+)
+
+TRANSPARENCY_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" orientation="orthogonal" renderorder="right-down" width="3" height="1"
+     tilewidth="16" tileheight="16" infinite="0">
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16" tilecount="3" columns="3">
+  <image source="tiles.png" width="48" height="16"/>
+ </tileset>
+ <tileset firstgid="4" name="keyed" tilewidth="16" tileheight="16" tilecount="2" columns="2">
+  <image source="keyed.png" width="32" height="16" trans="ff00ff"/>
+ </tileset>
+ <layer id="1" name="ground" width="3" height="1">
+  <data encoding="csv">1,2,3</data>
+ </layer>
+ <layer id="2" name="top" width="3" height="1">
+  <data encoding="csv">4,5,0</data>
+ </layer>
+</map>
+"""
+
+
+class FakeSurface:
+    """Stand in for a pygame Surface with a 1 KB pixel buffer."""
+
+    def get_pitch(self):
+        return 64
+
+    def get_height(self):
+        return 16
+
+
+class Owner:
+    """Weak referenceable stand in for a TiledMap."""
+
+
+class TestSurfaceCache(TestCase):
+    def test_values_are_shared(self):
+        """A second request for the same key returns the same object."""
+        cache = SurfaceCache()
+        first = cache.get("tile", FakeSurface, Owner())
+        second = cache.get("tile", FakeSurface, Owner())
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.nbytes, 1024)
+
+    def test_referenced_entries_are_kept(self):
+        """Entries used by a live owner survive eviction; others do not."""
+        cache = SurfaceCache(max_bytes=1024)
+        owner = Owner()
+        cache.get("kept", FakeSurface, owner)
+        cache.get("dropped", FakeSurface)
+        cache.get("newest", FakeSurface)
+        self.assertIn("kept", cache)
+        self.assertNotIn("dropped", cache)
+        self.assertEqual(cache.nbytes, 1024)
+
+    def test_released_when_owner_collected(self):
+        """Collecting the owner releases its entries for eviction."""
+        cache = SurfaceCache(max_bytes=0)
+        owner = Owner()
+        cache.get("tile", FakeSurface, owner)
+        self.assertIn("tile", cache)
+        del owner
+        gc.collect()
+        self.assertNotIn("tile", cache)
+        self.assertEqual(cache.nbytes, 0)
+
+
+def display_surface():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if pygame.display.get_surface() is None:
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+
+def write_map(folder, xml):
+    """Write a map and the tileset images of TRANSPARENCY_XML to a folder."""
+    map_path = os.path.join(folder, "map.tmx")
+    with open(map_path, "w") as f:
+        f.write(xml)
+
+    # opaque, half transparent, and fully transparent tiles
+    tiles = pygame.Surface((48, 16), pygame.SRCALPHA)
+    tiles.fill((10, 20, 30, 255))
+    tiles.fill((0, 0, 0, 0), (20, 0, 4, 16))
+    tiles.fill((0, 0, 0, 0), (32, 0, 16, 16))
+    pygame.image.save(tiles, os.path.join(folder, "tiles.png"))
+
+    # a keyed tile and an opaque one, without an alpha channel
+    keyed = pygame.Surface((32, 16))
+    keyed.fill((10, 20, 30))
+    keyed.fill((255, 0, 255), (0, 0, 4, 4))
+    pygame.image.save(keyed, os.path.join(folder, "keyed.png"))
+    return map_path
+
+
+@skipIf(util_pygame.np is None, "NumPy is not installed")
+class TestTileTransparency(TestCase):
+    def setUp(self):
+        display_surface()
+        self.folder = tempfile.mkdtemp()
+        self.map_path = write_map(self.folder, TRANSPARENCY_XML)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self):
+        return load_pygame(self.map_path, tile_cache=None, use_cache=True, cache_dir=self.folder)
+
+    def test_transparent_pixels(self):
+        """Transparent pixels are found by alpha, and by colorkey if there is one."""
+        image = pygame.image.load(os.path.join(self.folder, "tiles.png"))
+        transparent = util_pygame.transparent_pixels(image, None)
+        self.assertEqual(transparent.shape, (48, 16))
+        self.assertEqual(int(transparent[:16].sum()), 0)
+        self.assertEqual(int(transparent[16:32].sum()), 64)
+        keyed = pygame.image.load(os.path.join(self.folder, "keyed.png"))
+        self.assertEqual(int(util_pygame.transparent_pixels(keyed, None).sum()), 0)
+        self.assertEqual(int(util_pygame.transparent_pixels(keyed, pygame.Color("#ff00ff")).sum()), 16)
+
+    def test_transparent_tiles(self):
+        """Tiles of a grid with margin and spacing are reduced together."""
+        transparent = util_pygame.np.zeros((11, 7), dtype=bool)
+        transparent[4, 1] = True  # second column, first row
+        transparent[3, 1] = True  # spacing between the first two columns
+        transparent[8, 5] = True  # third column, second row
+        tiles = util_pygame.transparent_tiles(transparent, (1, 1), (2, 2), (3, 4))
+        self.assertEqual(tiles.tolist(), [[False, False], [True, False], [False, True]])
+
+    def test_classes(self):
+        """Tiles are classified per tileset image and converted by class."""
+        tmx = self.load()
+        self.assertEqual(
+            tmx.tile_transparency,
+            {
+                ("tiles.png", None, True): {
+                    (0, 0, 16, 16): TILE_OPAQUE,
+                    (16, 0, 16, 16): TILE_ALPHA,
+                    (32, 0, 16, 16): TILE_ALPHA,
+                },
+                ("keyed.png", "ff00ff", True): {(0, 0, 16, 16): TILE_COLORKEY, (16, 0, 16, 16): TILE_OPAQUE},
+            },
+        )
+        self.assertFalse(tmx.get_tile_image(0, 0, 0).get_flags() & pygame.SRCALPHA)
+        self.assertTrue(tmx.get_tile_image(1, 0, 0).get_flags() & pygame.SRCALPHA)
+        self.assertEqual(tmx.get_tile_image(0, 0, 1).get_colorkey()[:3], (255, 0, 255))
+        self.assertIsNone(tmx.get_tile_image(1, 0, 1).get_colorkey())
+
+    def test_cached_classes(self):
+        """Maps loaded from the compiled cache skip the analysis."""
+        classes = self.load().tile_transparency
+        with mock.patch.object(util_pygame, "transparent_pixels") as table:
+            tmx = self.load()
+        table.assert_not_called()
+        self.assertEqual(tmx.tile_transparency, classes)
+        self.assertTrue(tmx.get_tile_image(1, 0, 0).get_flags() & pygame.SRCALPHA)
+
+    def test_classes_saved_explicitly(self):
+        """Classes found for a map cached without images are written by save_cached_map only."""
+        TiledMap(self.map_path, use_cache=True, cache_dir=self.folder)
+        with mock.patch.object(util_pygame, "transparent_pixels", wraps=util_pygame.transparent_pixels) as table:
+            tmx = self.load()
+            self.load()
+        self.assertEqual(table.call_count, 4)
+
+        save_cached_map(tmx)
+        with mock.patch.object(util_pygame, "transparent_pixels") as table:
+            self.assertEqual(self.load().tile_transparency, tmx.tile_transparency)
+        table.assert_not_called()
+
+
+class TestRendererSharing(TestCase):
+    def setUp(self):
+        display_surface()
+        self.folder = tempfile.mkdtemp()
+        self.map_path = write_map(self.folder, TRANSPARENCY_XML)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_tiles_still_shared(self):
+        """A pyscroll renderer keeps the tiles maps share through a tile cache."""
+        cache = SurfaceCache()
+        maps = [load_pygame(self.map_path, tile_cache=cache) for _ in range(2)]
+        tiles = list(maps[0].images)
+        self.assertEqual(sum(1 for i in tiles if i is not None), 5)
+        for tmx in maps:
+            BufferedRenderer(TiledMapData(tmx), (48, 32), clamp_camera=False, alpha=True)
+        for tmx in maps:
+            self.assertEqual([id(i) for i in tmx.images], [id(i) for i in tiles])
+
+    def test_other_formats_converted(self):
+        """Images without the pixel format of the buffer are still converted."""
+        tmx = load_pygame(self.map_path, tile_cache=None)
+        gid = tmx.get_tile_gid(0, 0, 0)
+        tmx.images[gid] = pygame.Surface((16, 16), depth=16)
+        BufferedRenderer(TiledMapData(tmx), (48, 32), clamp_camera=False, alpha=True)
+        self.assertEqual(tmx.images[gid].get_bitsize(), 32)
+        self.assertTrue(tmx.images[gid].get_flags() & pygame.SRCALPHA)
+
+
+class TestAtlas(TestCase):
+    def setUp(self):
+        display_surface()
+        self.folder = tempfile.mkdtemp()
+        # the last ground tile is the half transparent one, flipped horizontally
+        self.map_path = write_map(self.folder, TRANSPARENCY_XML.replace("1,2,3", "1,2,2147483650"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_tiles_share_sheets(self):
+        """Tiles are areas of a sheet converted once per transparency class."""
+        tmx = load_pygame(self.map_path, tile_cache=None, atlas=True)
+        opaque, alpha, flipped = (tmx.get_tile_image(x, 0, 0) for x in range(3))
+        keyed, plain = (tmx.get_tile_image(x, 0, 1) for x in range(2))
+        for tile in (opaque, alpha, flipped, keyed, plain):
+            self.assertIsInstance(tile, AtlasTile)
+
+        self.assertEqual(tuple(opaque.area), (0, 0, 16, 16))
+        self.assertEqual(tuple(alpha.area), (16, 0, 16, 16))
+        self.assertEqual(opaque.surface.get_size(), (48, 16))
+        self.assertFalse(opaque.surface.get_flags() & pygame.SRCALPHA)
+        self.assertTrue(alpha.surface.get_flags() & pygame.SRCALPHA)
+        self.assertEqual(keyed.surface.get_colorkey()[:3], (255, 0, 255))
+        self.assertIsNone(plain.surface.get_colorkey())
+
+        # flipped tiles cannot be an area of the sheet, so they are their own surface
+        self.assertEqual(flipped.surface.get_size(), (16, 16))
+        self.assertEqual(tuple(flipped.area), (0, 0, 16, 16))
+
+    def test_mode_recorded_on_map(self):
+        """The map records atlas mode, also when loaded from the compiled cache."""
+        for use_cache in (False, True):
+            tmx = load_pygame(self.map_path, tile_cache=None, atlas=True, use_cache=use_cache, cache_dir=self.folder)
+            self.assertTrue(tmx.atlas)
+            self.assertTrue(TiledMapData(tmx).atlas)
+            tiles = load_pygame(self.map_path, tile_cache=None, use_cache=use_cache, cache_dir=self.folder)
+            self.assertFalse(tiles.atlas)
+            self.assertFalse(TiledMapData(tiles).atlas)
+
+    def test_sheets_are_cached(self):
+        """Maps sharing a tile cache share the converted sheets."""
+        cache = SurfaceCache()
+        first = load_pygame(self.map_path, tile_cache=cache, atlas=True)
+        second = load_pygame(self.map_path, tile_cache=cache, atlas=True)
+        self.assertIs(first.get_tile_image(0, 0, 0).surface, second.get_tile_image(0, 0, 0).surface)
+        # two decoded images, four sheets and the flipped tile
+        self.assertEqual(len(cache), 7)
+
+    def test_blits_match_tiles(self):
+        """Blitting the areas draws the same pixels as the tile surfaces do."""
+        tiles = load_pygame(self.map_path, tile_cache=None)
+        atlas = load_pygame(self.map_path, tile_cache=None, atlas=True)
+        expected = pygame.Surface((48, 32), pygame.SRCALPHA)
+        result = pygame.Surface((48, 32), pygame.SRCALPHA)
+        for x, y, layer in ((0, 0, 0), (1, 0, 0), (2, 0, 0), (0, 0, 1), (1, 0, 1)):
+            position = (x * 16, layer * 16)
+            expected.blit(tiles.get_tile_image(x, y, layer), position)
+            tile = atlas.get_tile_image(x, y, layer)
+            result.blit(tile.surface, position, tile.area)
+        self.assertEqual(pygame.image.tobytes(result, "RGBA"), pygame.image.tobytes(expected, "RGBA"))
+
+
+class TestLazyVariants(TestCase):
+    def setUp(self):
+        display_surface()
+        self.folder = tempfile.mkdtemp()
+        self.map_path = write_map(self.folder, TRANSPARENCY_XML.replace("1,2,3", "1,2,2147483650"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def load(self, **kwargs):
+        return load_pygame(self.map_path, lazy_variants=True, **kwargs)
+
+    def test_created_on_first_use(self):
+        """Flipped tiles are left out until they are asked for."""
+        tmx = self.load(tile_cache=None)
+        gid = tmx.get_tile_gid(2, 0, 0)
+        self.assertIsNone(tmx.images[gid])
+        self.assertIsNotNone(tmx.images[tmx.get_tile_gid(1, 0, 0)])
+
+        tile = tmx.get_tile_image(2, 0, 0)
+        self.assertIs(tmx.images[gid], tile)
+        self.assertIs(tmx.get_tile_image(2, 0, 0), tile)
+        self.assertEqual(tmx.lazy_tile_count, 1)
+
+        eager = load_pygame(self.map_path, tile_cache=None).get_tile_image(2, 0, 0)
+        self.assertEqual(pygame.image.tobytes(tile, "RGBA"), pygame.image.tobytes(eager, "RGBA"))
+
+    def test_shared_between_maps(self):
+        """A variant made for one map is reused by the next."""
+        cache = SurfaceCache()
+        first = self.load(tile_cache=cache).get_tile_image(2, 0, 0)
+        self.assertIs(self.load(tile_cache=cache).get_tile_image(2, 0, 0), first)
+
+    @skipIf(util_pygame.np is None, "NumPy is not installed")
+    def test_cached_class(self):
+        """Variants use the class of their source tile from the compiled cache."""
+        self.load(tile_cache=None, use_cache=True, cache_dir=self.folder)
+        with mock.patch.object(util_pygame, "transparent_pixels") as table:
+            tile = self.load(tile_cache=None, use_cache=True, cache_dir=self.folder).get_tile_image(2, 0, 0)
+        table.assert_not_called()
+        self.assertTrue(tile.get_flags() & pygame.SRCALPHA)
+
+
+class TestHeadless(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.map_path = write_map(self.folder, TRANSPARENCY_XML.replace("1,2,3", "1,2,2147483650"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_not_converted(self):
+        """Tiles keep the decoded pixels and are not converted."""
+        with mock.patch.object(util_pygame, "smart_convert") as convert:
+            tmx = load_pygame(self.map_path, headless=True)
+        convert.assert_not_called()
+
+        tiles = [tmx.get_tile_image(x, 0, 0) for x in range(3)]
+        for tile in tiles:
+            self.assertIsInstance(tile, HeadlessTile)
+            self.assertEqual(tile.surface.get_size(), (16, 16))
+        self.assertEqual(tiles[0].surface.get_offset(), (0, 0))
+        self.assertEqual(tiles[1].surface.get_offset(), (16, 0))
+        self.assertEqual(tiles[1].surface.get_at((0, 0)), tiles[2].surface.get_at((15, 0)))
+        self.assertEqual(tmx.get_tile_image(0, 0, 1).colorkey, pygame.Color("#ff00ff"))
+
+    def test_convert_images(self):
+        """Converting later gives the tiles a normal load would."""
+        tmx = load_pygame(self.map_path, headless=True, lazy_variants=True)
+        display_surface()
+        convert_images(tmx)
+        expected = load_pygame(self.map_path, tile_cache=None)
+        for x, y, layer in ((0, 0, 0), (1, 0, 0), (2, 0, 0), (0, 0, 1), (1, 0, 1)):
+            tile = tmx.get_tile_image(x, y, layer)
+            self.assertIsInstance(tile, pygame.Surface)
+            other = expected.get_tile_image(x, y, layer)
+            self.assertEqual(tile.get_flags() & pygame.SRCALPHA, other.get_flags() & pygame.SRCALPHA)
+            self.assertEqual(tile.get_colorkey(), other.get_colorkey())
+            self.assertEqual(pygame.image.tobytes(tile, "RGBA"), pygame.image.tobytes(other, "RGBA"))
+
+
+class TestSmartConvert(TestCase):
+    def setUp(self):
+        display_surface()
+
+    def test_mask_fallback(self):
+        """Without a class, tiles are tested one by one, colorkey pixels included."""
+        tile = pygame.Surface((4, 4))
+        tile.fill((10, 20, 30))
+        self.assertIsNone(smart_convert(tile, pygame.Color("#ff00ff"), True).get_colorkey())
+        tile.set_at((0, 0), (255, 0, 255))
+        self.assertEqual(smart_convert(tile, pygame.Color("#ff00ff"), True).get_colorkey()[:3], (255, 0, 255))
+
+        alpha = pygame.Surface((4, 4), pygame.SRCALPHA)
+        alpha.fill((0, 0, 0, 0))
+        self.assertTrue(smart_convert(alpha, None, True).get_flags() & pygame.SRCALPHA)
+        self.assertFalse(smart_convert(alpha, None, False).get_flags() & pygame.SRCALPHA)
+
+    def test_class(self):
+        """A class picks the conversion without testing the pixels."""
+        tile = pygame.Surface((4, 4), pygame.SRCALPHA)
+        with mock.patch.object(util_pygame, "pygame_mask") as mask:
+            self.assertFalse(smart_convert(tile, None, True, TILE_OPAQUE).get_flags() & pygame.SRCALPHA)
+            self.assertTrue(smart_convert(tile, None, True, TILE_ALPHA).get_flags() & pygame.SRCALPHA)
+        mask.from_surface.assert_not_called()
+
+
+class TestGreedyRects(TestCase):
+    def covered(self, rects, tilewidth=1, tileheight=1):
+        """Return the tiles covered by rects, failing if any tile is covered twice."""
+        tiles = []
+        for rect in rects:
+            self.assertGreater(rect.width, 0)
+            self.assertGreater(rect.height, 0)
+            for y in range(rect.top // tileheight, rect.bottom // tileheight):
+                tiles.extend((x, y) for x in range(rect.left // tilewidth, rect.right // tilewidth))
+        self.assertEqual(len(tiles), len(set(tiles)))
+        return set(tiles)
+
+    def test_exact_coverage(self):
+        """Random grids are covered exactly, with and without NumPy."""
+        rng = random.Random(1)
+        for _ in range(200):
+            width, height, density = rng.randint(1, 24), rng.randint(1, 24), rng.random()
+            grid = [[rng.random() < density for _ in range(width)] for _ in range(height)]
+            expected = {(x, y) for y, row in enumerate(grid) for x, value in enumerate(row) if value}
+            for numpy in (util_pygame.np, None):
+                with mock.patch.object(util_pygame, "np", numpy):
+                    self.assertEqual(self.covered(greedy_rects(grid, 1, 1)), expected)
+
+    def test_merges_runs(self):
+        """Runs spanning the same columns in adjacent rows become one rect."""
+        points = [(1, 0), (2, 0), (3, 0), (1, 1), (2, 1), (5, 2), (5, 3)] + [(x, 5) for x in range(2, 7)]
+        rects = simplify(points, 16, 8)
+        self.assertEqual(self.covered(rects, 16, 8), set(points))
+        self.assertEqual(len(rects), 4)
+        self.assertIn(pygame.Rect(80, 16, 16, 16), rects)
+        self.assertIn(pygame.Rect(32, 40, 80, 8), rects)
+        self.assertEqual(simplify([], 16, 16), [])
+
+    def test_large_layer(self):
+        """A layer far beyond the recursion limit of the old kludge is handled."""
+        grid = [[(x // 3 + y // 5) % 2 == 0 for x in range(600)] for y in range(400)]
+        expected = {(x, y) for y, row in enumerate(grid) for x, value in enumerate(row) if value}
+        self.assertEqual(self.covered(greedy_rects(grid, 1, 1)), expected)
+
+    def test_build_rects(self):
+        """Rects are built from the tiles of a layer, or of one gid."""
+        folder = tempfile.mkdtemp()
+        try:
+            tmx = TiledMap(write_map(folder, TRANSPARENCY_XML))
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual(build_rects(tmx, "ground"), [pygame.Rect(0, 0, 48, 16)])
+        self.assertEqual(build_rects(tmx, 1), [pygame.Rect(0, 0, 32, 16)])
+        self.assertEqual(build_rects(tmx, "top", "keyed", 5), [pygame.Rect(16, 0, 16, 16)])